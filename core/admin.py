@@ -1,3 +1,86 @@
 from django.contrib import admin
 
+from .models import (
+    Student, Subject, ReportCard, Mark, StudentYearOverview, RankingCohort, Ranking, GradingScale, GradeBand,
+    ArchivedYear,
+)
+
+
 # Register your models here.
+@admin.register(Student)
+class StudentAdmin(admin.ModelAdmin):
+    list_display = ["id", "name", "email", "date_of_birth"]
+    search_fields = ["name", "email"]
+
+
+@admin.register(Subject)
+class SubjectAdmin(admin.ModelAdmin):
+    list_display = ["id", "name", "code"]
+    search_fields = ["name", "code"]
+
+
+@admin.register(ReportCard)
+class ReportCardAdmin(admin.ModelAdmin):
+    list_display = ["id", "student", "term", "year"]
+    list_select_related = ["student"]
+    list_filter = ["year"]
+    search_fields = ["student__name", "student__email", "term"]
+    # A raw id widget instead of a select that would load every student
+    raw_id_fields = ["student"]
+
+
+@admin.register(Mark)
+class MarkAdmin(admin.ModelAdmin):
+    list_display = ["id", "report_card", "subject", "score"]
+    list_select_related = ["report_card__student", "subject"]
+    list_filter = ["report_card__year"]
+    search_fields = ["report_card__student__name", "subject__code"]
+    raw_id_fields = ["report_card", "subject"]
+
+
+@admin.register(StudentYearOverview)
+class StudentYearOverviewAdmin(admin.ModelAdmin):
+    list_display = ["id", "student", "year", "subject", "score_sum", "mark_count"]
+    list_select_related = ["student", "subject"]
+    list_filter = ["year"]
+    raw_id_fields = ["student", "subject"]
+
+
+@admin.register(RankingCohort)
+class RankingCohortAdmin(admin.ModelAdmin):
+    list_display = ["id", "term", "year", "stale", "refreshed_at"]
+    list_filter = ["year", "stale"]
+
+
+@admin.register(Ranking)
+class RankingAdmin(admin.ModelAdmin):
+    list_display = ["id", "cohort", "report_card", "subject", "score", "rank", "dense_rank", "percentile"]
+    list_select_related = ["cohort", "report_card__student", "subject"]
+    list_filter = ["cohort__year"]
+    raw_id_fields = ["cohort", "report_card", "subject"]
+
+
+class GradeBandInline(admin.TabularInline):
+    model = GradeBand
+    ordering = ["-min_score"]
+
+
+@admin.register(GradingScale)
+class GradingScaleAdmin(admin.ModelAdmin):
+    list_display = ["id", "name", "is_default"]
+    inlines = [GradeBandInline]
+
+
+@admin.register(ArchivedYear)
+class ArchivedYearAdmin(admin.ModelAdmin):
+    # Years are archived and restored with the archive_year command
+    list_display = ["year", "report_card_count", "mark_count", "archived_at"]
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,115 @@
+"""
+Archival of closed academic years. archive_year moves the report cards and
+marks of a year into ArchivedReportCard and ArchivedMark, keeping their ids,
+so the hot tables only hold the years still in use. Reads of an archived
+year are routed to the archive tables by year (see ArchiveRoutingMixin and
+student_overview). The overview totals of the year are kept as they are.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import transaction
+
+from .cache import stats_cache
+from .models import ArchivedMark, ArchivedReportCard, ArchivedYear, Mark, RankingCohort, ReportCard
+from .rankings import invalidate_cohorts
+
+_tracking_suspended = ContextVar("tracking_suspended", default=False)
+
+
+class ArchiveError(Exception):
+    pass
+
+
+@contextmanager
+def suspended_tracking():
+    """
+    Make the signal handlers skip the overview, statistics and ranking
+    bookkeeping of mark and report card writes. Used while moving a year,
+    which leaves its overview totals as they are.
+    """
+    token = _tracking_suspended.set(True)
+    try:
+        yield
+    finally:
+        _tracking_suspended.reset(token)
+
+
+def tracking_suspended():
+    return _tracking_suspended.get()
+
+
+def archived_years():
+    """
+    The set of archived years, read from the database so every worker sees
+    a year as archived as soon as archive_year commits.
+    """
+    return set(ArchivedYear.objects.values_list("year", flat=True))
+
+
+def is_archived(year):
+    return year is not None and ArchivedYear.objects.filter(year=int(year)).exists()
+
+
+def mark_model(year):
+    return ArchivedMark if is_archived(year) else Mark
+
+
+def _move(source_cards, source_marks, target_cards, target_marks, card_ids, batch_size):
+    # Rows are copied with their ids, marks after the cards they reference
+    moved_marks = 0
+    for start in range(0, len(card_ids), batch_size):
+        batch = card_ids[start:start + batch_size]
+        target_cards.objects.bulk_create(
+            target_cards(**row)
+            for row in source_cards.objects.filter(pk__in=batch).values("id", "student_id", "term", "year")
+        )
+        marks = [
+            target_marks(**row)
+            for row in source_marks.objects.filter(report_card_id__in=batch).values(
+                "id", "report_card_id", "subject_id", "score"
+            )
+        ]
+        target_marks.objects.bulk_create(marks, batch_size=batch_size)
+        moved_marks += len(marks)
+        source_marks.objects.filter(report_card_id__in=batch).delete()
+        source_cards.objects.filter(pk__in=batch).delete()
+    return moved_marks
+
+
+def archive_year(year, batch_size=1000):
+    """
+    Move the report cards and marks of ``year`` to the archive tables in one
+    transaction. Returns the ArchivedYear.
+    """
+    with transaction.atomic(), suspended_tracking():
+        if ArchivedYear.objects.filter(year=year).exists():
+            raise ArchiveError(f"Year {year} is already archived.")
+        # Read in the transaction, so cards created meanwhile are not left behind
+        card_ids = list(ReportCard.objects.filter(year=year).order_by("id").values_list("id", flat=True))
+        # Rankings of archived years are not kept
+        RankingCohort.objects.filter(year=year).delete()
+        mark_count = _move(ReportCard, Mark, ArchivedReportCard, ArchivedMark, card_ids, batch_size)
+        archived = ArchivedYear.objects.create(year=year, report_card_count=len(card_ids), mark_count=mark_count)
+    _archive_changed(year)
+    return archived
+
+
+def restore_year(year, batch_size=1000):
+    """
+    Move an archived year back to the hot tables. Returns the number of report cards restored.
+    """
+    with transaction.atomic(), suspended_tracking():
+        if not ArchivedYear.objects.filter(year=year).exists():
+            raise ArchiveError(f"Year {year} is not archived.")
+        card_ids = list(ArchivedReportCard.objects.filter(year=year).order_by("id").values_list("id", flat=True))
+        _move(ArchivedReportCard, ArchivedMark, ReportCard, Mark, card_ids, batch_size)
+        ArchivedYear.objects.filter(year=year).delete()
+        # Ranked again by the next run of refresh_stale_rankings
+        invalidate_cohorts(ReportCard.objects.filter(year=year).values_list("year", "term").distinct())
+    _archive_changed(year)
+    return len(card_ids)
+
+
+def _archive_changed(year):
+    stats_cache.invalidate(year)
@@ -0,0 +1,144 @@
+"""
+Async read endpoints for dashboards, served under /api/async/ when the
+project runs on ASGI. DRF views are synchronous, so these are plain Django
+async views that render the same JSON as the DRF endpoints they mirror.
+While one request waits on the database the worker keeps serving others.
+"""
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import JsonResponse
+from rest_framework.authtoken.models import Token
+from rest_framework.request import Request
+from rest_framework.utils.encoders import JSONEncoder
+
+from .archive import is_archived
+from .authentication import lookup_token
+from .cache import overview_cache
+from .db import RoutingState, choose_replica, routing_state
+from .fast_serializers import ArchivedReportCardSerializer, FastMarkSerializer, FastReportCardSerializer
+from .filters import ArchivedMarkFilter, MarkFilter
+from .grading import default_grader
+from .models import ArchivedMark, Mark, Student
+from .overview import astudent_overview
+from .pagination import LimitOffsetPagination
+
+
+def json_response(data, status=200, **kwargs):
+    # DRF's encoder, so decimals and dates are rendered like the DRF endpoints do
+    return JsonResponse(data, status=status, encoder=JSONEncoder, safe=False, **kwargs)
+
+
+async def authenticate(request):
+    """
+    Async counterpart of CachingTokenAuthentication. Returns the user or an error message.
+    """
+    header = request.headers.get("Authorization", "").split()
+    if not header or header[0].lower() != "token":
+        return None, "Authentication credentials were not provided."
+    if len(header) != 2:
+        return None, "Invalid token header."
+    try:
+        token = await sync_to_async(lookup_token)(header[1])
+    except Token.DoesNotExist:
+        return None, "Invalid token."
+    if not token.user.is_active:
+        return None, "User inactive or deleted."
+    return token.user, None
+
+
+def token_required(view):
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if request.method != "GET":
+            return json_response({"detail": f'Method "{request.method}" not allowed.'}, status=405)
+        user, error = await authenticate(request)
+        if user is None:
+            return json_response({"detail": error}, status=401, headers={"WWW-Authenticate": "Token"})
+        request.user = user
+        # Every async endpoint is a read, served from a replica when there is one
+        token = routing_state.set(RoutingState(await sync_to_async(choose_replica)(request)))
+        try:
+            return await view(request, *args, **kwargs)
+        finally:
+            routing_state.reset(token)
+    return wrapper
+
+
+@token_required
+async def report_card_detail(request, pk):
+    """
+    A report card in the shape of ReportCardSerializer, read from the
+    archive tables when its id is not in the hot table, like the DRF retrieve.
+    """
+    for serializer in (FastReportCardSerializer(), ArchivedReportCardSerializer()):
+        cards = await serializer.ato_representation(serializer.rows(serializer.card_model.objects.filter(pk=pk)))
+        if cards:
+            return json_response(cards[0])
+    return json_response({"detail": "No ReportCard matches the given query."}, status=404)
+
+
+def _mark_queryset(request):
+    """
+    The marks matching the filters of ``request``, from the archive for an
+    archived ?year=, or the filter errors. Validating the filters looks up
+    the related rows they name, so this runs in a thread.
+    """
+    try:
+        archived = is_archived(request.query_params.get("year"))
+    except ValueError:
+        archived = False  # rejected by the year filter
+    filterset_class, model = (ArchivedMarkFilter, ArchivedMark) if archived else (MarkFilter, Mark)
+    filterset = filterset_class(request.query_params, queryset=model.objects.order_by("id"))
+    if not filterset.is_valid():
+        return None, filterset.errors
+    return filterset.qs, None
+
+
+@token_required
+async def mark_list(request):
+    """
+    Marks in the shape of MarkSerializer, filtered with MarkFilter and
+    paginated like the mark list, ASYNC_PAGE_SIZE marks per page unless
+    ?limit= is passed. The marks of an archived ?year= are read from the archive.
+    ?report_card=<id>&subject=<id>&year=<year>&limit=<n>&offset=<n>&count=<true|false>
+    """
+    request = Request(request)
+    marks, errors = await sync_to_async(_mark_queryset)(request)
+    if errors:
+        return json_response(errors, status=400)
+    paginator = LimitOffsetPagination()
+    paginator.default_limit = settings.ASYNC_PAGE_SIZE
+    serializer = FastMarkSerializer()
+    rows = await paginator.apaginate_queryset(serializer.rows(marks), request)
+    grader = await sync_to_async(default_grader)()
+    return json_response(paginator.get_paginated_response(serializer.build(rows, grader)).data)
+
+
+@token_required
+async def avg_overview(request, pk):
+    """
+    Async counterpart of avg-overview that always answers inline: a cached
+    overview is returned as is, otherwise the report cards and the
+    overview totals are queried concurrently.
+    ?year=<year>
+    """
+    year = request.GET.get("year")
+    if not year:
+        return json_response({"message": "Year is required to filter data!!"}, status=400)
+    try:
+        year = int(year)
+    except ValueError:
+        return json_response({"message": "Year must be a number!!"}, status=400)
+    if not await Student.objects.filter(pk=pk).aexists():
+        return json_response({"detail": "No Student matches the given query."}, status=404)
+
+    overview = await sync_to_async(overview_cache.get)(pk, year)
+    if overview is not None:
+        return json_response(overview)
+
+    generation = await sync_to_async(overview_cache.generation)(pk)
+    overview = await astudent_overview(pk, year)
+    await sync_to_async(overview_cache.set)(pk, year, overview, generation)
+    return json_response(overview)
@@ -0,0 +1,184 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from .cache import bump_generation, current_generation
+
+
+class TokenCache:
+    """
+    Bounded TTL cache of validated tokens, with their users loaded.
+
+    Tokens are kept in process memory in LRU order for ``timeout`` seconds
+    and, when ``alias`` names a cache backend, also shared through it so a
+    token validated by one worker is a hit in the others. Each token then
+    has a generation in the shared backend, bumped when the token is
+    deleted or its user saved, and an entry is only used while its
+    generation is current, so revocations reach the memory of every
+    process on their next lookup. Without a shared backend nothing tells
+    other processes about revocations, and entries are kept for at most
+    TOKEN_CACHE_LOCAL_TIMEOUT seconds instead.
+    """
+
+    key_prefix = "token"
+
+    def __init__(self, alias=None, timeout=None, max_entries=None):
+        self._alias = alias
+        self._timeout = timeout
+        self._max_entries = max_entries
+        self._tokens = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def backend(self):
+        alias = self._alias or settings.TOKEN_CACHE_ALIAS
+        return caches[alias] if alias else None
+
+    @property
+    def timeout(self):
+        timeout = self._timeout if self._timeout is not None else settings.TOKEN_CACHE_TIMEOUT
+        if self.backend is None:
+            return min(timeout, settings.TOKEN_CACHE_LOCAL_TIMEOUT)
+        return timeout
+
+    @property
+    def max_entries(self):
+        return self._max_entries if self._max_entries is not None else settings.TOKEN_CACHE_MAX_ENTRIES
+
+    def _key(self, key):
+        return f"{self.key_prefix}:{key}"
+
+    def _generation_key(self, key):
+        return f"{self.key_prefix}:gen:{key}"
+
+    def generation(self, key):
+        """
+        Current generation of the token ``key``, None without a shared backend.
+        Read it before loading the token, so a revocation meanwhile is not missed.
+        """
+        backend = self.backend
+        return current_generation(backend, self._generation_key(key)) if backend else None
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._tokens.get(key)
+            if entry is not None and entry[1] <= now:
+                self._tokens.pop(key)
+                entry = None
+        local = entry is not None
+        if not local and self.backend:
+            entry = self.backend.get(self._key(key))
+        # Local entries are (token, expires, generation), shared ones (token, generation)
+        if entry is not None and entry[-1] != self.generation(key):
+            entry = None
+        with self._lock:
+            if entry is None:
+                self._tokens.pop(key, None)
+                self.misses += 1
+                return None
+            self.hits += 1
+            if local and key in self._tokens:
+                self._tokens.move_to_end(key)
+        if not local:
+            self._remember(key, *entry)
+        return entry[0]
+
+    def set(self, token, generation=None):
+        """
+        Cache ``token`` as of ``generation``, read before the token was loaded (now by default).
+        """
+        if generation is None:
+            generation = self.generation(token.key)
+        self._remember(token.key, token, generation)
+        if self.backend:
+            self.backend.set(self._key(token.key), (token, generation), self.timeout)
+
+    def _remember(self, key, token, generation):
+        with self._lock:
+            self._tokens[key] = (token, time.monotonic() + self.timeout, generation)
+            self._tokens.move_to_end(key)
+            while len(self._tokens) > self.max_entries:
+                self._tokens.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._tokens.pop(key, None)
+        if self.backend and keys:
+            self.backend.delete_many([self._key(key) for key in keys])
+            for key in keys:
+                bump_generation(self.backend, self._generation_key(key))
+
+    def invalidate_user(self, user_id):
+        """
+        Revoke the cached tokens of a user, so a deactivated user is refused straight away.
+        """
+        with self._lock:
+            keys = [key for key, (token, *_rest) in self._tokens.items() if token.user_id == user_id]
+        if self.backend:
+            keys += list(Token.objects.filter(user_id=user_id).values_list("key", flat=True))
+        self.invalidate(*set(keys))
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else None,
+                "evictions": self.evictions,
+                "size": len(self._tokens),
+                "max_entries": self.max_entries,
+            }
+
+    def clear(self):
+        with self._lock:
+            keys = list(self._tokens)
+            self._tokens.clear()
+            self.hits = self.misses = self.evictions = 0
+        if self.backend and keys:
+            self.backend.delete_many([self._key(key) for key in keys])
+
+
+token_cache = TokenCache()
+
+
+def lookup_token(key):
+    """
+    Return the token of ``key`` with its user, from the cache when possible.
+    Raises Token.DoesNotExist for unknown keys, which are not cached.
+    """
+    token = token_cache.get(key)
+    if token is None:
+        generation = token_cache.generation(key)
+        token = Token.objects.select_related("user").get(key=key)
+        token_cache.set(token, generation)
+    return token
+
+
+class CachingTokenAuthentication(TokenAuthentication):
+    """
+    TokenAuthentication that skips the token and user query for tokens
+    validated within the last TOKEN_CACHE_TIMEOUT seconds.
+    """
+
+    def authenticate_credentials(self, key):
+        try:
+            token = lookup_token(key)
+        except Token.DoesNotExist:
+            raise exceptions.AuthenticationFailed(_("Invalid token."))
+        if not token.user.is_active:
+            raise exceptions.AuthenticationFailed(_("User inactive or deleted."))
+        return (token.user, token)
@@ -0,0 +1,187 @@
+from django.db import IntegrityError, transaction
+
+from .cache import overview_cache, stats_cache
+from .conditional import touch_report_cards
+from .models import Mark, ReportCard, Student, Subject
+from .overview import rebuild_student_years
+from .rankings import invalidate_card_cohorts
+from .serializers import BulkMarkSerializer, BulkReportCardSerializer
+from .tasks import request_precompute, request_rankings_refresh
+
+
+DUPLICATE_MARK_MESSAGE = "The fields subject, report_card must make a unique set."
+# Inserts retried after losing a race with another request
+CREATE_REPORT_CARD_ATTEMPTS = 3
+INGEST_MARKS_ATTEMPTS = 2
+
+
+class BulkMarkResult:
+    def __init__(self, created=0, updated=0, errors=None):
+        self.created = created
+        self.updated = updated
+        self.errors = errors or []
+
+    @property
+    def is_valid(self):
+        return not any(self.errors)
+
+
+class BulkReportCardResult:
+    def __init__(self, created=0, existing=0, report_cards=None, errors=None):
+        self.created = created
+        self.existing = existing
+        self.report_cards = report_cards or []
+        self.errors = errors or {}
+
+    @property
+    def is_valid(self):
+        return not self.errors
+
+
+def ingest_marks(rows, upsert=False, batch_size=1000):
+    """
+    Validate and write a batch of ``{report_card, subject, score}`` rows.
+
+    Report cards, subjects and existing marks are looked up with one query
+    each for the whole batch. Nothing is written unless every row is valid;
+    ``errors`` then holds one entry per row (empty for valid rows). With
+    ``upsert`` existing marks get their score replaced instead of being
+    reported as duplicates. If another request inserts one of the marks
+    after the lookup, the insert fails and the batch is checked again, so
+    that mark is reported as a duplicate (or updated, with ``upsert``).
+    """
+    serializer = BulkMarkSerializer(data=rows, many=True)
+    if not serializer.is_valid():
+        return BulkMarkResult(errors=serializer.errors)
+    data = serializer.validated_data
+
+    for attempt in range(1, INGEST_MARKS_ATTEMPTS + 1):
+        cards, existing, errors = _check_marks(data, upsert)
+        if any(errors):
+            return BulkMarkResult(errors=errors)
+        marks = [
+            Mark(report_card_id=row["report_card"], subject_id=row["subject"], score=row["score"])
+            for row in data
+        ]
+        updated = sum(1 for mark in marks if (mark.report_card_id, mark.subject_id) in existing)
+        touched = {cards[row["report_card"]] for row in data}
+        try:
+            save_marks(marks, touched, upsert=bool(updated), batch_size=batch_size)
+            break
+        except IntegrityError:
+            if attempt == INGEST_MARKS_ATTEMPTS:
+                raise
+    return BulkMarkResult(created=len(marks) - updated, updated=updated, errors=errors)
+
+
+def _check_marks(data, upsert=False):
+    """
+    Look up the report cards, subjects and existing marks of validated
+    ``data`` rows. Returns the ``{card_id: (student_id, year)}`` of the
+    cards, the ``{(card_id, subject_id): mark_id}`` of the existing marks
+    and the errors of each row.
+    """
+    errors = [{} for _ in data]
+    card_ids = {row["report_card"] for row in data}
+    subject_ids = {row["subject"] for row in data}
+    cards = {
+        pk: (student_id, year)
+        for pk, student_id, year in ReportCard.objects.filter(pk__in=card_ids).values_list("id", "student_id", "year")
+    }
+    subjects = set(Subject.objects.filter(pk__in=subject_ids).values_list("id", flat=True))
+    existing = {
+        (report_card_id, subject_id): pk
+        for pk, report_card_id, subject_id in Mark.objects.filter(
+            report_card_id__in=card_ids, subject_id__in=subject_ids
+        ).values_list("id", "report_card_id", "subject_id")
+    }
+
+    seen = set()
+    for index, row in enumerate(data):
+        row_errors = errors[index]
+        key = (row["report_card"], row["subject"])
+        if row["report_card"] not in cards:
+            row_errors["report_card"] = [f'Invalid pk "{row["report_card"]}" - object does not exist.']
+        if row["subject"] not in subjects:
+            row_errors["subject"] = [f'Invalid pk "{row["subject"]}" - object does not exist.']
+        if key in seen or (key in existing and not upsert):
+            row_errors["non_field_errors"] = [DUPLICATE_MARK_MESSAGE]
+        seen.add(key)
+    return cards, existing, errors
+
+
+def save_marks(marks, touched, upsert=False, ignore_conflicts=False, batch_size=1000):
+    """
+    Insert unsaved marks in one transaction and refresh what depends on them.
+    ``touched`` is the set of (student_id, year) pairs the marks belong to.
+    bulk_create skips the model signals, so the overview totals of those
+    pairs are rebuilt, the cached overviews and statistics invalidated, the
+    rankings of their cohorts flagged as stale and queued for a refresh and
+    the updated_at of their report cards bumped here instead. The pairs are
+    flagged for precompute_overviews to warm their overviews again.
+    """
+    options = {}
+    if upsert:
+        options = {"update_conflicts": True, "unique_fields": ["report_card", "subject"], "update_fields": ["score"]}
+    elif ignore_conflicts:
+        options = {"ignore_conflicts": True}
+    with transaction.atomic():
+        Mark.objects.bulk_create(marks, batch_size=batch_size, **options)
+        rebuild_student_years(touched)
+        card_ids = {mark.report_card_id for mark in marks}
+        invalidate_card_cohorts(card_ids)
+        request_rankings_refresh()
+        touch_report_cards(pk__in=card_ids)
+        request_precompute(touched)
+    for student_id in {student_id for student_id, _ in touched}:
+        overview_cache.invalidate(student_id)
+    stats_cache.invalidate(*(year for _, year in touched))
+
+
+def create_report_cards(data, batch_size=1000):
+    """
+    Create the report cards of one term for a cohort of students.
+
+    ``data`` is ``{term, year, students}``. Students that already have a
+    card for the term (matched case-insensitively) keep it; the others get
+    a new one, inserted in one transaction. If another request creates one
+    of those cards meanwhile, the insert fails on unique_report_card_term
+    and is retried with that card reused, so ``created`` only counts the
+    cards inserted by this call.
+    """
+    serializer = BulkReportCardSerializer(data=data)
+    if not serializer.is_valid():
+        return BulkReportCardResult(errors=serializer.errors)
+    term = serializer.validated_data["term"]
+    year = serializer.validated_data["year"]
+    student_ids = list(dict.fromkeys(serializer.validated_data["students"]))
+
+    known = set(Student.objects.filter(pk__in=student_ids).values_list("id", flat=True))
+    unknown = [pk for pk in student_ids if pk not in known]
+    if unknown:
+        return BulkReportCardResult(errors={
+            "students": [f'Invalid pk "{pk}" - object does not exist.' for pk in unknown]
+        })
+
+    cards = ReportCard.objects.filter(student_id__in=student_ids, term__iexact=term, year=year)
+    for attempt in range(1, CREATE_REPORT_CARD_ATTEMPTS + 1):
+        try:
+            with transaction.atomic():
+                existing = set(cards.values_list("student_id", flat=True))
+                new_cards = ReportCard.objects.bulk_create(
+                    [ReportCard(student_id=pk, term=term, year=year) for pk in student_ids if pk not in existing],
+                    batch_size=batch_size,
+                )
+                card_ids = dict(cards.values_list("student_id", "id"))
+            break
+        except IntegrityError:
+            if attempt == CREATE_REPORT_CARD_ATTEMPTS:
+                raise
+    # bulk_create skips the report card signals
+    for card in new_cards:
+        overview_cache.invalidate(card.student_id)
+    return BulkReportCardResult(
+        created=len(new_cards),
+        existing=len(existing),
+        report_cards=[{"id": card_ids[pk], "student": pk} for pk in student_ids],
+    )
@@ -0,0 +1,197 @@
+import threading
+import time
+from collections import OrderedDict, defaultdict
+
+from django.conf import settings
+from django.core.cache import caches
+
+
+def current_generation(backend, key):
+    """
+    Return the generation stored under ``key``, starting a new one if it is unknown.
+    A fresh generation is seeded from the clock so an evicted counter never revives old entries.
+    """
+    generation = backend.get(key)
+    if generation is None:
+        backend.add(key, time.time_ns(), None)
+        generation = backend.get(key)
+    return generation
+
+
+def bump_generation(backend, key):
+    try:
+        backend.incr(key)
+    except ValueError:
+        backend.add(key, time.time_ns(), None)
+
+
+class OverviewCache:
+    """
+    Versioned cache of computed student overviews.
+
+    Entries are keyed by (student, year) plus a per-student generation
+    counter. Bumping the generation on writes makes every cached overview
+    of that student unreachable without having to know which years exist.
+    The keys stored by this process are tracked in LRU order and the
+    oldest are evicted once ``max_entries`` is reached, so memory stays
+    bounded whatever cache backend is configured.
+    """
+
+    key_prefix = "overview"
+
+    def __init__(self, alias=None, timeout=None, max_entries=None):
+        self._alias = alias
+        self._timeout = timeout
+        self._max_entries = max_entries
+        self._keys = OrderedDict()
+        self._student_keys = defaultdict(set)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def backend(self):
+        return caches[self._alias or settings.OVERVIEW_CACHE_ALIAS]
+
+    @property
+    def timeout(self):
+        return self._timeout if self._timeout is not None else settings.OVERVIEW_CACHE_TIMEOUT
+
+    @property
+    def max_entries(self):
+        return self._max_entries if self._max_entries is not None else settings.OVERVIEW_CACHE_MAX_ENTRIES
+
+    def _generation_key(self, student_id):
+        return f"{self.key_prefix}:gen:{student_id}"
+
+    def generation(self, student_id):
+        return current_generation(self.backend, self._generation_key(student_id))
+
+    def _key(self, student_id, year, generation=None):
+        if generation is None:
+            generation = self.generation(student_id)
+        return f"{self.key_prefix}:{student_id}:{year}:{generation}"
+
+    def get(self, student_id, year):
+        key = self._key(student_id, year)
+        value = self.backend.get(key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                self._forget(key)
+            else:
+                self.hits += 1
+                self._remember(key, student_id)
+        return value
+
+    def set(self, student_id, year, overview, generation=None):
+        """
+        Store an overview. Pass the generation read before computing it so
+        an overview racing with a write is stored under the stale generation.
+        """
+        key = self._key(student_id, year, generation)
+        self.backend.set(key, overview, self.timeout)
+        evicted = []
+        with self._lock:
+            self._remember(key, student_id)
+            while len(self._keys) > self.max_entries:
+                oldest = next(iter(self._keys))
+                self._forget(oldest)
+                evicted.append(oldest)
+            self.evictions += len(evicted)
+        if evicted:
+            self.backend.delete_many(evicted)
+
+    def invalidate(self, student_id):
+        """
+        Bump the generation of a student so all of their cached overviews are skipped.
+        """
+        bump_generation(self.backend, self._generation_key(student_id))
+        with self._lock:
+            stale = list(self._student_keys.get(student_id, ()))
+            for cached in stale:
+                self._forget(cached)
+        if stale:
+            self.backend.delete_many(stale)
+
+    def _remember(self, key, student_id):
+        self._keys[key] = student_id
+        self._keys.move_to_end(key)
+        self._student_keys[student_id].add(key)
+
+    def _forget(self, key):
+        student_id = self._keys.pop(key, None)
+        if student_id is None:
+            return
+        keys = self._student_keys[student_id]
+        keys.discard(key)
+        if not keys:
+            del self._student_keys[student_id]
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else None,
+                "evictions": self.evictions,
+                "size": len(self._keys),
+                "max_entries": self.max_entries,
+            }
+
+    def clear(self):
+        with self._lock:
+            keys = list(self._keys)
+            self._keys.clear()
+            self._student_keys.clear()
+            self.hits = self.misses = self.evictions = 0
+        if keys:
+            self.backend.delete_many(keys)
+
+
+class CohortStatsCache:
+    """
+    Cache of cohort statistics keyed by (year, term) plus a per-year
+    generation, bumped whenever a mark of that year is written.
+    """
+
+    key_prefix = "stats"
+
+    def __init__(self, alias=None, timeout=None):
+        self._alias = alias
+        self._timeout = timeout
+
+    @property
+    def backend(self):
+        return caches[self._alias or settings.OVERVIEW_CACHE_ALIAS]
+
+    @property
+    def timeout(self):
+        return self._timeout if self._timeout is not None else settings.COHORT_STATS_CACHE_TIMEOUT
+
+    def _generation_key(self, year):
+        return f"{self.key_prefix}:gen:{year}"
+
+    def generation(self, year):
+        return current_generation(self.backend, self._generation_key(year))
+
+    def _key(self, year, term, generation=None):
+        if generation is None:
+            generation = self.generation(year)
+        return f"{self.key_prefix}:{year}:{(term or '').lower()}:{generation}"
+
+    def get(self, year, term=None):
+        return self.backend.get(self._key(year, term))
+
+    def set(self, year, term, stats, generation=None):
+        self.backend.set(self._key(year, term, generation), stats, self.timeout)
+
+    def invalidate(self, *years):
+        for year in set(years):
+            bump_generation(self.backend, self._generation_key(year))
+
+
+overview_cache = OverviewCache()
+stats_cache = CohortStatsCache()
@@ -0,0 +1,76 @@
+"""
+Validators for conditional GETs of report cards and student overviews.
+
+A report card's ETag and Last-Modified come from its ``updated_at``, which
+is bumped whenever its marks, its student or one of their subjects change,
+so checking them costs one single-row query. An overview's ETag comes
+from the number of report cards of the student in the year and their latest
+``updated_at``, read in one aggregate query, or from when the year was
+archived. Both come from the database, so every worker agrees on them, and
+include the version of the default grading scale the grades come from.
+"""
+import hashlib
+
+from django.db.models import Count, Max
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from .grading import default_grader
+from .models import ArchivedYear, ReportCard
+
+
+def touch_report_cards(**filters):
+    """
+    Bump ``updated_at`` of the report cards matching ``filters`` in one query.
+    """
+    ReportCard.objects.filter(**filters).update(updated_at=timezone.now())
+
+
+def _etag(*parts):
+    parts = (*parts, default_grader().version)
+    return quote_etag(hashlib.md5(":".join(str(part) for part in parts).encode()).hexdigest())
+
+
+def report_card_validators(pk, variant=""):
+    """
+    (ETag, Last-Modified timestamp) of a report card, or (None, None) if it
+    is not in the hot table. ``variant`` tells apart the representations of
+    the card, e.g. sparse fieldsets.
+    """
+    updated_at = ReportCard.objects.filter(pk=pk).values_list("updated_at", flat=True).first()
+    if updated_at is None:
+        return None, None
+    return _etag("report-card", pk, variant, updated_at.isoformat()), int(updated_at.timestamp())
+
+
+def overview_etag(student_id, year):
+    """
+    ETag of the overview of ``student_id`` in ``year``. Adding or removing
+    one of their report cards changes the count, any other write bumps the
+    latest ``updated_at``. Archived years no longer change.
+    """
+    cards = ReportCard.objects.filter(student_id=student_id, year=year).aggregate(
+        count=Count("id"), updated_at=Max("updated_at")
+    )
+    if cards["count"]:
+        return _etag("overview", student_id, year, cards["count"], cards["updated_at"].isoformat())
+    archived_at = ArchivedYear.objects.filter(year=year).values_list("archived_at", flat=True).first()
+    return _etag("overview", student_id, year, 0, archived_at.isoformat() if archived_at else "")
+
+
+def not_modified(request, etag, last_modified=None):
+    """
+    The 304 response to send when the client's copy is still current, else None.
+    """
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is not None:
+        set_validators(response, etag, last_modified)
+    return response
+
+
+def set_validators(response, etag, last_modified=None):
+    response["ETag"] = etag
+    if last_modified is not None:
+        response["Last-Modified"] = http_date(last_modified)
+    return response
@@ -0,0 +1,101 @@
+"""
+Database tuning and read-replica routing.
+
+Views opt in to replica reads per request (see ReadReplicaMixin). While
+such a request runs, ReplicaRouter sends its reads to one of the aliases
+in DATABASE_REPLICAS, until the request writes. A user whose request wrote
+something reads from the primary for the next REPLICA_STICKY_SECONDS, long
+enough for the replicas to catch up, so they always see their own writes.
+The sticky flag lives in the default cache, shared by every worker (see
+CACHE_URL), so the user's next request is sticky whichever worker serves it.
+Reads outside an opted-in request (writes, tasks, commands) use the primary.
+"""
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+
+
+class RoutingState:
+    """
+    Routing of the request being served: the replica it reads from, if
+    any, and whether it has written to the primary.
+    """
+
+    def __init__(self, replica=None):
+        self.replica = replica
+        self.wrote = False
+
+
+routing_state = ContextVar("routing_state", default=None)
+
+
+def configure_sqlite(connection):
+    """
+    Apply SQLITE_PRAGMAS to a new SQLite connection, WAL journaling first so
+    readers no longer block the writer.
+    """
+    if connection.vendor != "sqlite":
+        return
+    for name, value in settings.SQLITE_PRAGMAS.items():
+        connection.connection.execute(f"PRAGMA {name} = {value}")
+
+
+def _sticky_key(user_id):
+    return f"db:sticky:{user_id}"
+
+
+def choose_replica(request):
+    """
+    A random replica to serve the reads of ``request`` from, or None when
+    there are none or the user wrote something recently.
+    """
+    if not settings.DATABASE_REPLICAS:
+        return None
+    user_id = getattr(request.user, "pk", None)
+    if user_id is not None and cache.get(_sticky_key(user_id)):
+        return None
+    return random.choice(settings.DATABASE_REPLICAS)
+
+
+def begin_request(request, replica_reads):
+    routing_state.set(RoutingState(choose_replica(request) if replica_reads else None))
+
+
+def end_request(request):
+    """
+    Keep the user on the primary for a while if the request wrote anything.
+    """
+    state = routing_state.get()
+    user_id = getattr(getattr(request, "user", None), "pk", None)
+    if state is not None and state.wrote and user_id is not None and settings.DATABASE_REPLICAS:
+        cache.set(_sticky_key(user_id), True, settings.REPLICA_STICKY_SECONDS)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = routing_state.get()
+        if state is not None and state.replica and not state.wrote:
+            return state.replica
+        return None
+
+    def db_for_write(self, model, **hints):
+        state = routing_state.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary
+        aliases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas are copies of the primary and get its schema from it
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
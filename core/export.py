@@ -0,0 +1,74 @@
+import csv
+import io
+import json
+from itertools import islice
+
+from rest_framework.utils.encoders import JSONEncoder
+
+from .serializers import ReportCardSerializer
+
+
+CSV_COLUMNS = [
+    "report_card_id",
+    "student_id",
+    "student_name",
+    "student_email",
+    "term",
+    "year",
+    "subject_code",
+    "subject_name",
+    "score",
+]
+
+
+def iter_chunks(queryset, chunk_size):
+    """
+    Yield lists of report cards read through a server-side iterator, with
+    the student and marks prefetched for one chunk at a time.
+    """
+    rows = (
+        queryset
+        .select_related("student")
+        .prefetch_related("marks__subject")
+        .order_by("pk")
+        .iterator(chunk_size=chunk_size)
+    )
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def iter_ndjson(queryset, chunk_size=500):
+    """
+    Yield one JSON line per report card, in the shape of ReportCardSerializer.
+    """
+    for chunk in iter_chunks(queryset, chunk_size):
+        data = ReportCardSerializer(chunk, many=True).data
+        yield "".join(json.dumps(card, cls=JSONEncoder) + "\n" for card in data)
+
+
+def iter_csv(queryset, chunk_size=500):
+    """
+    Yield CSV text with one row per mark. Report cards without marks get a
+    single row with the subject columns left empty.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_COLUMNS)
+    yield buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+    for chunk in iter_chunks(queryset, chunk_size):
+        for card in chunk:
+            student = card.student
+            prefix = [card.pk, student.pk, student.name, student.email, card.term, card.year]
+            marks = card.marks.all()
+            if not marks:
+                writer.writerow(prefix + ["", "", ""])
+            for mark in marks:
+                writer.writerow(prefix + [mark.subject.code, mark.subject.name, mark.score])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
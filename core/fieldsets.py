@@ -0,0 +1,99 @@
+"""
+Sparse fieldsets for list and retrieve responses.
+
+?fields=id,term picks the top-level fields of the response and ?expand=marks
+adds nested ones, which are otherwise left out. Without either parameter the
+full response is sent as before. The fields picked decide which columns are
+loaded (``only()``) and which relations are joined or prefetched, so the
+ones left out cost no query at all.
+"""
+from rest_framework.exceptions import ValidationError
+
+
+FIELDS_PARAM = "fields"
+EXPAND_PARAM = "expand"
+
+
+class Field:
+    """
+    A response field of a model: the model fields it is rendered from and,
+    for nested fields, the relations to select or prefetch for it.
+    Expandable fields are only sent when named in ?fields= or ?expand=.
+    """
+
+    def __init__(self, *columns, select_related=(), prefetch_related=(), expandable=False):
+        self.columns = columns
+        self.select_related = select_related
+        self.prefetch_related = prefetch_related
+        self.expandable = expandable
+
+
+def _names(value):
+    return [name for name in (part.strip() for part in value.split(",")) if name]
+
+
+class Fieldset:
+    """
+    The fields of ``fields`` (a name -> Field mapping) picked by a request.
+    """
+
+    def __init__(self, fields, names):
+        self.fields = fields
+        self.names = frozenset(names)
+
+    @classmethod
+    def from_request(cls, request, fields):
+        """
+        The fieldset asked for by ``request``, or None when it asks for the full response.
+        """
+        params = request.query_params
+        if FIELDS_PARAM not in params and EXPAND_PARAM not in params:
+            return None
+        requested = _names(params.get(FIELDS_PARAM, ""))
+        expand = _names(params.get(EXPAND_PARAM, ""))
+        errors = {}
+        unknown = [name for name in requested if name not in fields]
+        if unknown:
+            errors[FIELDS_PARAM] = [f"Unknown fields: {', '.join(unknown)}."]
+        not_expandable = [name for name in expand if name not in fields or not fields[name].expandable]
+        if not_expandable:
+            errors[EXPAND_PARAM] = [f"Fields that cannot be expanded: {', '.join(not_expandable)}."]
+        if errors:
+            raise ValidationError(errors)
+        if not requested:
+            requested = [name for name, field in fields.items() if not field.expandable]
+        return cls(fields, [*requested, *expand])
+
+    def __contains__(self, name):
+        return name in self.names
+
+    def includes(self, name):
+        """
+        Whether to render ``name``; fields this fieldset does not know about are always rendered.
+        """
+        return name in self.names or name not in self.fields
+
+    def filter(self, data):
+        return {name: value for name, value in data.items() if self.includes(name)}
+
+    def variant(self):
+        """
+        A stable key of the picked fields, for cache validators.
+        """
+        return ",".join(sorted(self.names))
+
+    def prune(self, queryset, *columns):
+        """
+        ``queryset`` loading only the columns and relations of the picked
+        fields, plus ``columns``.
+        """
+        picked = [field for name, field in self.fields.items() if name in self.names]
+        queryset = queryset.select_related(None).prefetch_related(None)
+        select_related = [path for field in picked for path in field.select_related]
+        if select_related:
+            queryset = queryset.select_related(*select_related)
+        prefetch_related = [path for field in picked for path in field.prefetch_related]
+        if prefetch_related:
+            queryset = queryset.prefetch_related(*prefetch_related)
+        only = [queryset.model._meta.pk.name, *(column for field in picked for column in field.columns), *columns]
+        return queryset.only(*dict.fromkeys(only))
@@ -0,0 +1,45 @@
+from django import forms
+from django_filters import rest_framework as filters
+
+from .models import ArchivedMark, ArchivedReportCard, Student, Subject, ReportCard, Mark
+
+
+class RelatedIdFilter(filters.ModelChoiceFilter):
+    """
+    Filter on a related object by id. Renders as a number input in the
+    browsable API instead of a select that would load and display every row.
+    """
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault("widget", forms.NumberInput)
+        super().__init__(*args, **kwargs)
+
+
+class ReportCardFilter(filters.FilterSet):
+    student = RelatedIdFilter(queryset=Student.objects.all())
+
+    class Meta:
+        model = ReportCard
+        fields = ["student", "year"]
+
+
+class MarkFilter(filters.FilterSet):
+    report_card = RelatedIdFilter(queryset=ReportCard.objects.all())
+    subject = RelatedIdFilter(queryset=Subject.objects.all())
+    year = filters.NumberFilter(field_name="report_card__year")
+
+    class Meta:
+        model = Mark
+        fields = ["report_card", "subject", "year"]
+
+
+class ArchivedReportCardFilter(ReportCardFilter):
+    class Meta(ReportCardFilter.Meta):
+        model = ArchivedReportCard
+
+
+class ArchivedMarkFilter(MarkFilter):
+    report_card = RelatedIdFilter(queryset=ArchivedReportCard.objects.all())
+
+    class Meta(MarkFilter.Meta):
+        model = ArchivedMark
@@ -0,0 +1,88 @@
+import hashlib
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework import serializers
+
+from .models import GradeBand
+
+
+DEFAULT_BANDS_CACHE_KEY = "grading:default-bands"
+GRADE_POINT_FIELD = serializers.DecimalField(max_digits=3, decimal_places=2)
+
+
+class Grader:
+    """
+    Maps scores to the (letter, grade point) of a grading scale.
+
+    ``bands`` are (min_score, letter, grade_point) tuples. Scores are
+    graded in bulk: the whole batch is converted to floats once and placed
+    between the band thresholds with ``numpy.searchsorted``. Scores below
+    the lowest band have no grade.
+    ``version`` changes whenever the bands do.
+    """
+
+    def __init__(self, bands):
+        bands = sorted(bands)
+        self.thresholds = [float(min_score) for min_score, _, _ in bands]
+        self.grades = [(letter, grade_point) for _, letter, grade_point in bands]
+        self._thresholds = np.array(self.thresholds)
+        self.version = hashlib.md5(repr(list(zip(self.thresholds, self.grades))).encode()).hexdigest()
+
+    def grade_many(self, scores):
+        scores = list(scores)
+        if not self.grades or not scores:
+            return [None] * len(scores)
+        graded = [index for index, score in enumerate(scores) if score is not None]
+        values = np.array([scores[index] for index in graded], dtype=float)
+        positions = (np.searchsorted(self._thresholds, values, side="right") - 1).tolist()
+        grades = [None] * len(scores)
+        for index, position in zip(graded, positions):
+            if position >= 0:
+                grades[index] = self.grades[position]
+        return grades
+
+    def grade(self, score):
+        return self.grade_many([score])[0]
+
+
+def default_grader():
+    """
+    Grader of the default grading scale. Its bands are kept in the shared
+    cache, dropped when a scale or band is saved or deleted and expired
+    after GRADING_CACHE_TIMEOUT, which bounds how long bulk updates that
+    skip the signals go unnoticed.
+    """
+    bands = cache.get(DEFAULT_BANDS_CACHE_KEY)
+    if bands is None:
+        bands = list(
+            GradeBand.objects
+            .filter(scale__is_default=True)
+            .values_list("min_score", "letter", "grade_point")
+        )
+        cache.set(DEFAULT_BANDS_CACHE_KEY, bands, settings.GRADING_CACHE_TIMEOUT)
+    return Grader(bands)
+
+
+def clear_default_grader():
+    cache.delete(DEFAULT_BANDS_CACHE_KEY)
+
+
+def context_grader(context):
+    """
+    Default grader shared by every serializer rendering the same response.
+    """
+    if "grader" not in context:
+        context["grader"] = default_grader()
+    return context["grader"]
+
+
+def grade_fields(grade):
+    """
+    Response fields of a (letter, grade point) pair, or of no grade.
+    """
+    if grade is None:
+        return {"grade": None, "grade_point": None}
+    letter, grade_point = grade
+    return {"grade": letter, "grade_point": GRADE_POINT_FIELD.to_representation(grade_point)}
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from core.archive import ArchiveError, archive_year, restore_year
+
+
+class Command(BaseCommand):
+    help = (
+        "Move the report cards and marks of a closed academic year to the archive tables, "
+        "or back with --restore"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("year", type=int)
+        parser.add_argument("--restore", action="store_true", help="Move an archived year back to the hot tables")
+        parser.add_argument("--force", action="store_true", help="Archive the current or a future year")
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        year = options["year"]
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size must be positive")
+        try:
+            if options["restore"]:
+                restored = restore_year(year, batch_size=options["batch_size"])
+                self.stdout.write(self.style.SUCCESS(f"Restored {restored} report cards of {year}"))
+                return
+            if year >= timezone.now().year and not options["force"]:
+                raise CommandError(f"{year} is not a closed year, pass --force to archive it anyway")
+            archived = archive_year(year, batch_size=options["batch_size"])
+        except ArchiveError as exc:
+            raise CommandError(str(exc))
+        self.stdout.write(self.style.SUCCESS(
+            f"Archived {archived.report_card_count} report cards and {archived.mark_count} marks of {year}"
+        ))
@@ -0,0 +1,188 @@
+import csv
+import json
+import os
+import time
+from itertools import islice
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from core.archive import archived_years
+from core.bulk import save_marks
+from core.models import Mark, ReportCard, Student, Subject
+
+
+COLUMNS = ["student_email", "subject_code", "term", "year", "score"]
+
+
+class Command(BaseCommand):
+    help = (
+        "Stream marks from a CSV with the columns "
+        "student_email, subject_code, term, year, score. "
+        "Missing report cards are created and every chunk is committed on its own, "
+        "so an interrupted import resumes after the last committed chunk."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="CSV file to import")
+        parser.add_argument("--chunk-size", type=int, default=1000)
+        parser.add_argument(
+            "--checkpoint",
+            help="File recording the committed progress (default: <path>.checkpoint)",
+        )
+        parser.add_argument("--restart", action="store_true", help="Ignore an existing checkpoint")
+        parser.add_argument("--upsert", action="store_true", help="Replace the score of existing marks")
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        chunk_size = options["chunk_size"]
+        if chunk_size < 1:
+            raise CommandError("--chunk-size must be positive")
+        checkpoint = options["checkpoint"] or f"{path}.checkpoint"
+        self.upsert = options["upsert"]
+
+        done = 0 if options["restart"] else self.read_checkpoint(checkpoint, path)
+        self.students = dict(Student.objects.values_list("email", "id"))
+        self.subjects = dict(Subject.objects.values_list("code", "id"))
+        self.score_field = Mark._meta.get_field("score")
+
+        try:
+            handle = open(path, newline="", encoding="utf-8")
+        except OSError as exc:
+            raise CommandError(f"Cannot read {path}: {exc}")
+        with handle:
+            reader = csv.DictReader(handle)
+            missing = set(COLUMNS) - set(reader.fieldnames or [])
+            if missing:
+                raise CommandError(f"Missing columns: {', '.join(sorted(missing))}")
+            if done:
+                self.stdout.write(f"Resuming after row {done}")
+                for _ in islice(reader, done):
+                    pass
+
+            resumed_from = done
+            imported = skipped = 0
+            started = time.monotonic()
+            while True:
+                chunk = list(islice(reader, chunk_size))
+                if not chunk:
+                    break
+                saved, errors = self.import_chunk(chunk, first_row=done + 1)
+                done += len(chunk)
+                imported += saved
+                skipped += errors
+                self.write_checkpoint(checkpoint, path, done)
+                elapsed = time.monotonic() - started
+                rate = (done - resumed_from) / elapsed if elapsed else 0
+                self.stdout.write(
+                    f"{done} rows read, {imported} marks imported, {skipped} skipped ({rate:.0f} rows/sec)"
+                )
+
+        if os.path.exists(checkpoint):
+            os.remove(checkpoint)
+        self.stdout.write(self.style.SUCCESS(f"Imported {imported} marks, skipped {skipped} rows"))
+
+    def import_chunk(self, chunk, first_row):
+        """
+        Resolve and save one chunk of CSV rows in a single transaction.
+        Returns the number of marks saved and the number of rows skipped.
+        """
+        parsed = []
+        errors = 0
+        for number, row in enumerate(chunk, start=first_row):
+            try:
+                parsed.append((number, self.parse_row(row)))
+            except ValidationError as exc:
+                errors += 1
+                self.stderr.write(f"Row {number}: {' '.join(exc.messages)}")
+            except ValueError as exc:
+                errors += 1
+                self.stderr.write(f"Row {number}: {exc}")
+
+        with transaction.atomic():
+            # Archived years are closed for writes, as in the API (see validate_open_year)
+            archived = archived_years()
+            rows = []
+            for number, values in parsed:
+                if values[2] in archived:
+                    errors += 1
+                    self.stderr.write(f"Row {number}: year {values[2]} is archived")
+                else:
+                    rows.append(values)
+            parsed = rows
+            cards = self.resolve_report_cards({(student, term, year) for student, term, year, _, _ in parsed})
+            marks = {}
+            for student, term, year, subject, score in parsed:
+                card_id = cards[(student, term.lower(), year)]
+                # The last row wins when a mark is repeated within the chunk
+                marks[(card_id, subject)] = Mark(report_card_id=card_id, subject_id=subject, score=score)
+            if not self.upsert:
+                # Existing marks are kept, so only the new ones count as imported
+                existing = Mark.objects.filter(
+                    report_card_id__in={card_id for card_id, _ in marks},
+                    subject_id__in={subject for _, subject in marks},
+                ).values_list("report_card_id", "subject_id")
+                for key in existing:
+                    marks.pop(key, None)
+            touched = {(student, year) for student, _, year, _, _ in parsed}
+            save_marks(
+                list(marks.values()),
+                touched,
+                upsert=self.upsert,
+                ignore_conflicts=not self.upsert,
+            )
+        return len(marks), errors + len(parsed) - len(marks)
+
+    def parse_row(self, row):
+        email, code, term, year, score = ((row[column] or "").strip() for column in COLUMNS)
+        if email not in self.students:
+            raise ValueError(f"unknown student {email!r}")
+        if code not in self.subjects:
+            raise ValueError(f"unknown subject {code!r}")
+        if not term:
+            raise ValueError("term is required")
+        try:
+            year = int(year)
+        except ValueError:
+            raise ValueError(f"invalid year {year!r}")
+        score = self.score_field.clean(score, None)
+        return self.students[email], term, year, self.subjects[code], score
+
+    def resolve_report_cards(self, keys):
+        """
+        Map (student_id, term, year) keys to report card ids, matching terms
+        case-insensitively and creating the missing cards in one batch.
+        """
+        student_ids = {student for student, _, _ in keys}
+        years = {year for _, _, year in keys}
+        cards = {}
+        existing = ReportCard.objects.filter(student_id__in=student_ids, year__in=years)
+        for pk, student, term, year in existing.values_list("id", "student_id", "term", "year"):
+            cards.setdefault((student, term.lower(), year), pk)
+
+        missing = {}
+        for student, term, year in keys:
+            if (student, term.lower(), year) not in cards:
+                missing.setdefault((student, term.lower(), year), ReportCard(student_id=student, term=term, year=year))
+        for key, card in zip(missing, ReportCard.objects.bulk_create(missing.values())):
+            cards[key] = card.pk
+        return cards
+
+    def read_checkpoint(self, checkpoint, path):
+        try:
+            with open(checkpoint) as handle:
+                state = json.load(handle)
+        except FileNotFoundError:
+            return 0
+        except ValueError:
+            raise CommandError(f"Checkpoint {checkpoint} is corrupt, rerun with --restart")
+        if state.get("path") != os.path.abspath(path):
+            raise CommandError(f"Checkpoint {checkpoint} belongs to {state.get('path')}, rerun with --restart")
+        return state["rows"]
+
+    def write_checkpoint(self, checkpoint, path, rows):
+        tmp = f"{checkpoint}.tmp"
+        with open(tmp, "w") as handle:
+            json.dump({"path": os.path.abspath(path), "rows": rows}, handle)
+        os.replace(tmp, checkpoint)
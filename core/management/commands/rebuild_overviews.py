@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from core.overview import rebuild_overviews
+
+
+class Command(BaseCommand):
+    help = "Rebuild the student year overview totals from the marks table"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--student", type=int, help="Only rebuild this student id")
+        parser.add_argument("--year", type=int, help="Only rebuild this year")
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        written = rebuild_overviews(
+            student_id=options["student"],
+            year=options["year"],
+            batch_size=options["batch_size"],
+        )
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {written} overview rows"))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from core.search import SEARCH_INDEXES, rebuild_search_index, search_index_available
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text search indexes of students and subjects from their tables"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--database", default="default")
+
+    def handle(self, *args, **options):
+        if not search_index_available(connections[options["database"]]):
+            raise CommandError("Full-text search indexes need SQLite with FTS5.")
+        for table in SEARCH_INDEXES:
+            rebuild_search_index(table, using=options["database"])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {len(SEARCH_INDEXES)} search indexes"))
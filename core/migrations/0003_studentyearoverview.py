@@ -0,0 +1,82 @@
+# Generated by Django 5.2.4 on 2026-10-18 18:04
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, F, Sum
+
+
+def populate_overviews(apps, schema_editor):
+    Mark = apps.get_model("core", "Mark")
+    StudentYearOverview = apps.get_model("core", "StudentYearOverview")
+    totals = (
+        Mark.objects
+        .values("subject_id", student=F("report_card__student_id"), card_year=F("report_card__year"))
+        .annotate(total=Sum("score"), count=Count("id"))
+        .order_by()
+    )
+    StudentYearOverview.objects.bulk_create(
+        [
+            StudentYearOverview(
+                student_id=row["student"],
+                year=row["card_year"],
+                subject_id=row["subject_id"],
+                score_sum=row["total"],
+                mark_count=row["count"],
+            )
+            for row in totals
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0002_alter_reportcard_term_alter_reportcard_year"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="StudentYearOverview",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("year", models.IntegerField()),
+                (
+                    "score_sum",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=12),
+                ),
+                ("mark_count", models.IntegerField(default=0)),
+                (
+                    "student",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="year_overviews",
+                        to="core.student",
+                    ),
+                ),
+                (
+                    "subject",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE, to="core.subject"
+                    ),
+                ),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("student", "year", "subject"),
+                        name="unique_overview_subject",
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(populate_overviews, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,78 @@
+# Generated by Django 5.2.4 on 2026-10-18 18:18
+
+import django.db.models.functions.text
+from collections import defaultdict
+
+from django.db import IntegrityError, migrations, models
+
+
+def merge_duplicate_report_cards(apps, schema_editor):
+    """
+    Merge report cards whose (student, term, year) only differ by the case
+    of the term into the oldest of them, before unique_report_card_term is
+    added. Marks of the same subject on two such cards can't be merged, so
+    they are listed and the migration stops until they are resolved.
+    """
+    ReportCard = apps.get_model("core", "ReportCard")
+    Mark = apps.get_model("core", "Mark")
+    groups = defaultdict(list)
+    for pk, student_id, term, year in ReportCard.objects.order_by("id").values_list("id", "student_id", "term", "year"):
+        groups[(student_id, term.lower(), year)].append(pk)
+
+    conflicts = []
+    for (student_id, term, year), (kept, *duplicates) in groups.items():
+        if not duplicates:
+            continue
+        subjects = defaultdict(list)
+        for card_id, subject_id in Mark.objects.filter(report_card_id__in=[kept, *duplicates]).values_list(
+            "report_card_id", "subject_id"
+        ):
+            subjects[subject_id].append(card_id)
+        clashes = {subject_id: cards for subject_id, cards in subjects.items() if len(cards) > 1}
+        if clashes:
+            conflicts.extend(
+                f"student {student_id}, term {term!r}, year {year}: subject {subject_id} on report cards "
+                + ", ".join(map(str, sorted(cards)))
+                for subject_id, cards in clashes.items()
+            )
+            continue
+        Mark.objects.filter(report_card_id__in=duplicates).update(report_card_id=kept)
+        ReportCard.objects.filter(id__in=duplicates).delete()
+    if conflicts:
+        raise IntegrityError(
+            "Report cards differing only by the case of their term have marks of the same subject, "
+            "keep one mark of each and migrate again:\n" + "\n".join(conflicts)
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0003_studentyearoverview"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="mark",
+            index=models.Index(
+                fields=["report_card", "subject", "score"],
+                name="core_mark_card_subj_score_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="reportcard",
+            index=models.Index(
+                fields=["student", "year"], name="core_rc_student_year_idx"
+            ),
+        ),
+        migrations.RunPython(merge_duplicate_report_cards, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="reportcard",
+            constraint=models.UniqueConstraint(
+                models.F("student"),
+                django.db.models.functions.text.Lower("term"),
+                models.F("year"),
+                name="unique_report_card_term",
+            ),
+        ),
+    ]
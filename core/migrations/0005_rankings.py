@@ -0,0 +1,44 @@
+# Generated by Django 5.2.4 on 2026-10-18 18:24
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0004_report_card_composite_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RankingCohort",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("year", models.IntegerField()),
+                ("term", models.CharField(max_length=100)),
+                ("stale", models.BooleanField(default=False)),
+                ("refreshed_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "constraints": [models.UniqueConstraint(fields=("year", "term"), name="unique_ranking_cohort")],
+            },
+        ),
+        migrations.CreateModel(
+            name="Ranking",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("score", models.DecimalField(decimal_places=2, max_digits=5)),
+                ("rank", models.IntegerField()),
+                ("dense_rank", models.IntegerField()),
+                ("percentile", models.FloatField()),
+                ("cohort_size", models.IntegerField()),
+                ("report_card", models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name="rankings", to="core.reportcard")),
+                ("subject", models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to="core.subject")),
+                ("cohort", models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name="rankings", to="core.rankingcohort")),
+            ],
+            options={
+                "indexes": [models.Index(fields=["cohort", "subject", "rank"], name="core_ranking_board_idx")],
+            },
+        ),
+    ]
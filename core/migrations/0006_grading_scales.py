@@ -0,0 +1,60 @@
+# Generated by Django 5.2.4 on 2026-10-18 18:28
+
+import django.db.models.deletion
+from decimal import Decimal
+
+from django.db import migrations, models
+
+
+DEFAULT_BANDS = [
+    (Decimal("90"), "A", Decimal("4.0")),
+    (Decimal("80"), "B", Decimal("3.0")),
+    (Decimal("70"), "C", Decimal("2.0")),
+    (Decimal("60"), "D", Decimal("1.0")),
+    (Decimal("0"), "F", Decimal("0.0")),
+]
+
+
+def create_default_scale(apps, schema_editor):
+    GradingScale = apps.get_model("core", "GradingScale")
+    GradeBand = apps.get_model("core", "GradeBand")
+    scale = GradingScale.objects.create(name="Standard", is_default=True)
+    GradeBand.objects.bulk_create(
+        GradeBand(scale=scale, min_score=min_score, letter=letter, grade_point=grade_point)
+        for min_score, letter, grade_point in DEFAULT_BANDS
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0005_rankings"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="GradingScale",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("name", models.CharField(max_length=100, unique=True)),
+                ("is_default", models.BooleanField(default=False)),
+            ],
+            options={
+                "constraints": [models.UniqueConstraint(condition=models.Q(("is_default", True)), fields=("is_default",), name="single_default_grading_scale")],
+            },
+        ),
+        migrations.CreateModel(
+            name="GradeBand",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("min_score", models.DecimalField(decimal_places=2, max_digits=5)),
+                ("letter", models.CharField(max_length=5)),
+                ("grade_point", models.DecimalField(decimal_places=2, max_digits=3)),
+                ("scale", models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name="bands", to="core.gradingscale")),
+            ],
+            options={
+                "constraints": [models.UniqueConstraint(fields=("scale", "min_score"), name="unique_grade_band")],
+            },
+        ),
+        migrations.RunPython(create_default_scale, migrations.RunPython.noop),
+    ]
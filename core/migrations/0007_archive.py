@@ -0,0 +1,50 @@
+# Generated by Django 5.2.4 on 2026-10-18 18:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0006_grading_scales"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ArchivedYear",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("year", models.IntegerField(unique=True)),
+                ("report_card_count", models.IntegerField(default=0)),
+                ("mark_count", models.IntegerField(default=0)),
+                ("archived_at", models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name="ArchivedReportCard",
+            fields=[
+                ("id", models.IntegerField(primary_key=True, serialize=False)),
+                ("term", models.CharField(max_length=100)),
+                ("year", models.IntegerField(db_index=True)),
+                ("student", models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name="archived_report_cards", to="core.student")),
+            ],
+        ),
+        migrations.CreateModel(
+            name="ArchivedMark",
+            fields=[
+                ("id", models.IntegerField(primary_key=True, serialize=False)),
+                ("score", models.DecimalField(decimal_places=2, max_digits=5)),
+                ("subject", models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to="core.subject")),
+                ("report_card", models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name="marks", to="core.archivedreportcard")),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name="archivedreportcard",
+            index=models.Index(fields=["student", "year"], name="core_arc_rc_student_year_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="archivedmark",
+            index=models.Index(fields=["report_card", "subject", "score"], name="core_arc_mark_card_subj_idx"),
+        ),
+    ]
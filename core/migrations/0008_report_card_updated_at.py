@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-18 19:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0007_archive"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="reportcard",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
@@ -0,0 +1,35 @@
+from django.db import migrations
+
+from core.search import create_search_index, drop_search_index, search_index_available
+
+
+# Tables and columns indexed by this migration (core.search.SEARCH_INDEXES at the time)
+INDEXES = {
+    "core_student": ("name", "email"),
+    "core_subject": ("name", "code"),
+}
+
+
+def create_search_indexes(apps, schema_editor):
+    if not search_index_available(schema_editor.connection):
+        return
+    for table, columns in INDEXES.items():
+        create_search_index(schema_editor, table, columns)
+
+
+def drop_search_indexes(apps, schema_editor):
+    if not search_index_available(schema_editor.connection):
+        return
+    for table in INDEXES:
+        drop_search_index(schema_editor, table)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0008_report_card_updated_at"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
@@ -1,4 +1,6 @@
 from django.db import models
+from django.db.models import DEFERRED, F
+from django.db.models.functions import Lower
 
 
 # Create your models here.
@@ -19,16 +21,47 @@ class Subject(models.Model):
         return self.name
 
 
-class ReportCard(models.Model):
+class TracksLoadedValuesMixin:
+    """
+    Remember the field values an instance was loaded with, so signal
+    handlers can tell what changed on save without re-reading the row.
+    """
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(
+            zip(field_names, (value for value in values if value is not DEFERRED))
+        )
+        return instance
+
+
+class ReportCard(TracksLoadedValuesMixin, models.Model):
     student = models.ForeignKey(Student, on_delete=models.CASCADE, db_index=True)
     term = models.CharField(max_length=100, db_index=True)
     year = models.IntegerField(db_index=True)
+    # Also bumped when its marks, student or their subjects change (see core.conditional)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # Overviews and exports filter a student's cards by year
+            models.Index(fields=["student", "year"], name="core_rc_student_year_idx"),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                F("student"),
+                Lower("term"),
+                F("year"),
+                name="unique_report_card_term"
+            )
+        ]
 
     def __str__(self):
         return f"{self.student.name}-{self.term}-{self.year}"
 
 
-class Mark(models.Model):
+class Mark(TracksLoadedValuesMixin, models.Model):
     report_card = models.ForeignKey(
         ReportCard, on_delete=models.CASCADE, related_name="marks", db_index=True
     )
@@ -45,6 +78,208 @@ class Mark(models.Model):
                 name="unique_mark_subject"
             )
         ]
+        indexes = [
+            # Covers subject averages of a set of report cards without reading the table
+            models.Index(fields=["report_card", "subject", "score"], name="core_mark_card_subj_score_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.subject}-{self.score}"
+
+
+class StudentYearOverview(models.Model):
+    """
+    Running score totals of a student for one subject in a given year.
+    Kept in step with Mark writes so overviews never rescan the marks table.
+    """
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name="year_overviews")
+    year = models.IntegerField()
+    subject = models.ForeignKey(Subject, on_delete=models.CASCADE)
+    score_sum = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    mark_count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=[
+                    "student",
+                    "year",
+                    "subject"
+                ],
+                name="unique_overview_subject"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.student_id}-{self.year}-{self.subject_id}"
+
+
+class OverviewPrecompute(models.Model):
+    """
+    A (student, year) whose marks were written in bulk, waiting for
+    precompute_overviews to warm its cached overview.
+    """
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name="+")
+    year = models.IntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=[
+                    "student",
+                    "year"
+                ],
+                name="unique_overview_precompute"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.student_id}-{self.year}"
+
+
+class RankingCohort(models.Model):
+    """
+    The report cards of one (term, year), whose rankings are stored in
+    Ranking. Mark writes flag the cohort as stale instead of re-ranking it
+    straight away, and queue refresh_stale_rankings to rank it again.
+    """
+    year = models.IntegerField()
+    # Terms are matched case-insensitively, like the report card constraint does
+    term = models.CharField(max_length=100)
+    stale = models.BooleanField(default=False)
+    refreshed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=[
+                    "year",
+                    "term"
+                ],
+                name="unique_ranking_cohort"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.term}-{self.year}"
+
+
+class Ranking(models.Model):
+    """
+    Position of a report card within its cohort, for one subject or
+    overall (``subject`` is null) on the average of all of its marks.
+    """
+    cohort = models.ForeignKey(RankingCohort, on_delete=models.CASCADE, related_name="rankings")
+    report_card = models.ForeignKey(ReportCard, on_delete=models.CASCADE, related_name="rankings")
+    subject = models.ForeignKey(Subject, on_delete=models.CASCADE, null=True, blank=True)
+    score = models.DecimalField(max_digits=5, decimal_places=2)
+    rank = models.IntegerField()
+    dense_rank = models.IntegerField()
+    # Share of the cohort with a lower score, from 0 to 100
+    percentile = models.FloatField()
+    cohort_size = models.IntegerField()
+
+    class Meta:
+        indexes = [
+            # Leaderboards read one subject of a cohort in rank order
+            models.Index(fields=["cohort", "subject", "rank"], name="core_ranking_board_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.report_card_id}-{self.subject_id}-{self.rank}"
+
+
+class GradingScale(models.Model):
+    """
+    A named set of grade bands. The default scale grades marks and
+    overviews in API responses.
+    """
+    name = models.CharField(max_length=100, unique=True)
+    is_default = models.BooleanField(default=False)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["is_default"],
+                condition=models.Q(is_default=True),
+                name="single_default_grading_scale"
+            )
+        ]
+
+    def __str__(self):
+        return self.name
+
+
+class GradeBand(models.Model):
+    """
+    Scores from ``min_score`` up to the next band of the scale get this letter and grade point.
+    """
+    scale = models.ForeignKey(GradingScale, on_delete=models.CASCADE, related_name="bands")
+    min_score = models.DecimalField(max_digits=5, decimal_places=2)
+    letter = models.CharField(max_length=5)
+    grade_point = models.DecimalField(max_digits=3, decimal_places=2)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=[
+                    "scale",
+                    "min_score"
+                ],
+                name="unique_grade_band"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.scale_id}-{self.letter}"
+
+
+class ArchivedYear(models.Model):
+    """
+    An academic year whose report cards and marks were moved to the archive
+    tables by the archive_year command.
+    """
+    year = models.IntegerField(unique=True)
+    report_card_count = models.IntegerField(default=0)
+    mark_count = models.IntegerField(default=0)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return str(self.year)
+
+
+class ArchivedReportCard(models.Model):
+    """
+    A report card of an archived year. It keeps the id it had in ReportCard,
+    so links to it stay valid.
+    """
+    id = models.IntegerField(primary_key=True)
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name="archived_report_cards")
+    term = models.CharField(max_length=100)
+    year = models.IntegerField(db_index=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["student", "year"], name="core_arc_rc_student_year_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.student.name}-{self.term}-{self.year}"
+
+
+class ArchivedMark(models.Model):
+    """
+    A mark of an archived report card, with the id it had in Mark.
+    """
+    id = models.IntegerField(primary_key=True)
+    report_card = models.ForeignKey(ArchivedReportCard, on_delete=models.CASCADE, related_name="marks")
+    subject = models.ForeignKey(Subject, on_delete=models.CASCADE)
+    score = models.DecimalField(max_digits=5, decimal_places=2)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["report_card", "subject", "score"], name="core_arc_mark_card_subj_idx"),
+        ]
 
     def __str__(self):
         return f"{self.subject}-{self.score}"
@@ -0,0 +1,224 @@
+import asyncio
+from collections import defaultdict
+
+from asgiref.sync import sync_to_async
+from django.db import transaction
+from django.db.models import Count, F, Sum
+
+from .archive import is_archived
+from .fast_serializers import ArchivedReportCardSerializer, FastReportCardSerializer
+from .grading import default_grader, grade_fields
+from .models import Mark, ReportCard, StudentYearOverview
+
+
+def card_key(report_card_id):
+    """
+    Return the (student_id, year) a report card belongs to.
+    """
+    return ReportCard.objects.values_list("student_id", "year").get(pk=report_card_id)
+
+
+def apply_mark_delta(student_id, year, subject_id, score, count):
+    """
+    Add ``score`` and ``count`` to the running totals of one subject.
+    Negative deltas never create rows and totals that drop to zero marks are removed.
+    """
+    rows = StudentYearOverview.objects.filter(student_id=student_id, year=year, subject_id=subject_id)
+    with transaction.atomic():
+        if count > 0:
+            StudentYearOverview.objects.get_or_create(student_id=student_id, year=year, subject_id=subject_id)
+        rows.update(score_sum=F("score_sum") + score, mark_count=F("mark_count") + count)
+        if count < 0:
+            rows.filter(mark_count__lte=0).delete()
+
+
+def rebuild_overviews(student_id=None, year=None, batch_size=1000):
+    """
+    Recompute the overview totals from the marks table, optionally limited
+    to one student and/or one year. Returns the number of rows written.
+    """
+    marks = Mark.objects.all()
+    overviews = StudentYearOverview.objects.all()
+    if student_id is not None:
+        marks = marks.filter(report_card__student_id=student_id)
+        overviews = overviews.filter(student_id=student_id)
+    if year is not None:
+        marks = marks.filter(report_card__year=year)
+        overviews = overviews.filter(year=year)
+    return _rebuild_totals(marks, overviews, batch_size)
+
+
+def rebuild_student_years(pairs, batch_size=1000):
+    """
+    Recompute the totals of many (student_id, year) pairs at once. Every
+    combination of the given students and years is rebuilt, a superset of
+    the pairs that keeps the work to one delete and one grouped query.
+    """
+    student_ids = {student_id for student_id, _ in pairs}
+    years = {year for _, year in pairs}
+    if not student_ids:
+        return 0
+    marks = Mark.objects.filter(report_card__student_id__in=student_ids, report_card__year__in=years)
+    overviews = StudentYearOverview.objects.filter(student_id__in=student_ids, year__in=years)
+    return _rebuild_totals(marks, overviews, batch_size)
+
+
+def _rebuild_totals(marks, overviews, batch_size):
+    totals = (
+        marks
+        .values("subject_id", student=F("report_card__student_id"), card_year=F("report_card__year"))
+        .annotate(total=Sum("score"), count=Count("id"))
+        .order_by()
+    )
+    written = 0
+    with transaction.atomic():
+        overviews.delete()
+        batch = []
+        for row in totals.iterator(chunk_size=batch_size):
+            batch.append(StudentYearOverview(
+                student_id=row["student"],
+                year=row["card_year"],
+                subject_id=row["subject_id"],
+                score_sum=row["total"],
+                mark_count=row["count"],
+            ))
+            if len(batch) >= batch_size:
+                StudentYearOverview.objects.bulk_create(batch)
+                written += len(batch)
+                batch = []
+        StudentYearOverview.objects.bulk_create(batch)
+        written += len(batch)
+    return written
+
+
+TOTAL_FIELDS = ("subject__name", "score_sum", "mark_count")
+
+
+def year_totals(student_id, year):
+    """
+    The running totals of a student for a year, one row per subject, in a single indexed lookup.
+    """
+    return (
+        StudentYearOverview.objects
+        .filter(student_id=student_id, year=year)
+        .values(*TOTAL_FIELDS)
+        .order_by("subject__name")
+    )
+
+
+def summarize_totals(rows):
+    """
+    Per-subject averages and the overall average of total rows. The overall
+    average comes from the summed scores and counts, so it is weighted by
+    marks rather than being an average of the subject averages.
+    """
+    subject_averages = []
+    total = 0
+    count = 0
+    for row in rows:
+        subject_averages.append({
+            "subject_name": row["subject__name"],
+            "average_score": row["score_sum"] / row["mark_count"],
+        })
+        total += row["score_sum"]
+        count += row["mark_count"]
+    overall_average = total / count if count else None
+    return subject_averages, overall_average
+
+
+def student_year_averages(student_id, year):
+    """
+    Read the per-subject and overall averages of a student for a year
+    from the overview table in a single query.
+    """
+    return summarize_totals(year_totals(student_id, year))
+
+
+def overview_document(report_cards, total_rows, grader):
+    """
+    Assemble a student overview from its rendered report cards and total rows.
+    """
+    subject_averages, overall_average = summarize_totals(total_rows)
+    grades = grader.grade_many([row["average_score"] for row in subject_averages] + [overall_average])
+    for row, grade in zip(subject_averages, grades):
+        row.update(grade_fields(grade))
+    overall_grade = grade_fields(grades[-1])
+    return {
+        "report_cards": report_cards,
+        "subject_averages": subject_averages,
+        "overall_average": overall_average,
+        "overall_grade": overall_grade["grade"],
+        "overall_grade_point": overall_grade["grade_point"],
+    }
+
+
+def report_card_serializer(year):
+    """
+    Fast serializer reading the report cards of ``year`` from the hot or the archive tables.
+    """
+    return ArchivedReportCardSerializer() if is_archived(year) else FastReportCardSerializer()
+
+
+def student_overview(student_id, year):
+    """
+    Overview of a student's year: report cards and their marks in two
+    queries and every average from one read of the overview totals.
+    Shared by the avg-overview endpoints and calculate_student_overview.
+    """
+    serializer = report_card_serializer(year)
+    cards = serializer.card_model.objects.filter(student_id=student_id, year=year).order_by("id")
+    return overview_document(
+        serializer.to_representation(serializer.rows(cards)),
+        list(year_totals(student_id, year)),
+        default_grader(),
+    )
+
+
+def student_overviews(student_ids, year):
+    """
+    Overviews of many students for one year, keyed by student id. The
+    report cards, their marks and the totals of every student are read
+    with one query each, whatever the number of students.
+    """
+    student_ids = list(student_ids)
+    serializer = report_card_serializer(year)
+    cards = serializer.card_model.objects.filter(student_id__in=student_ids, year=year).order_by("id")
+    card_rows = list(serializer.rows(cards))
+    mark_rows = list(serializer.mark_rows([row["id"] for row in card_rows])) if card_rows else []
+    total_rows = defaultdict(list)
+    totals = (
+        StudentYearOverview.objects
+        .filter(student_id__in=student_ids, year=year)
+        .values("student_id", *TOTAL_FIELDS)
+        .order_by("subject__name")
+    )
+    for row in totals:
+        total_rows[row["student_id"]].append(row)
+
+    grader = default_grader()
+    report_cards = defaultdict(list)
+    for card in serializer.build(card_rows, mark_rows, grader):
+        report_cards[card["student"]].append(card)
+    return {
+        student_id: overview_document(report_cards[student_id], total_rows[student_id], grader)
+        for student_id in student_ids
+    }
+
+
+async def astudent_overview(student_id, year):
+    """
+    Async student_overview, with the report cards and the totals read concurrently.
+    """
+    archived = await sync_to_async(is_archived)(year)
+    serializer = ArchivedReportCardSerializer() if archived else FastReportCardSerializer()
+    cards = serializer.card_model.objects.filter(student_id=student_id, year=year).order_by("id")
+    report_cards, total_rows, grader = await asyncio.gather(
+        serializer.ato_representation(serializer.rows(cards)),
+        alist(year_totals(student_id, year)),
+        sync_to_async(default_grader)(),
+    )
+    return overview_document(report_cards, total_rows, grader)
+
+
+async def alist(queryset):
+    return [row async for row in queryset]
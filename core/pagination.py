@@ -0,0 +1,141 @@
+from rest_framework import pagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+FALSE_VALUES = ("0", "false", "no")
+TRUE_VALUES = ("1", "true", "yes")
+
+
+class LimitOffsetPagination(pagination.LimitOffsetPagination):
+    """
+    Limit/offset pagination where ?count=false skips the COUNT(*) query.
+    One extra row is fetched instead to know whether there is a next page.
+    """
+    count_query_param = "count"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.skip_count = request.query_params.get(self.count_query_param, "").lower() in FALSE_VALUES
+        if not self.skip_count:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.request = request
+        self.limit = self.get_limit(request)
+        if self.limit is None:
+            return None
+        self.offset = self.get_offset(request)
+        self.count = None
+        rows = list(queryset[self.offset:self.offset + self.limit + 1])
+        self.has_next = len(rows) > self.limit
+        return rows[:self.limit]
+
+    async def apaginate_queryset(self, queryset, request):
+        """
+        paginate_queryset with the async ORM: the count and the page are
+        queried with acount() and async iteration of the page slice.
+        """
+        self.request = request
+        self.limit = self.get_limit(request)
+        if self.limit is None:
+            return None
+        self.offset = self.get_offset(request)
+        self.skip_count = request.query_params.get(self.count_query_param, "").lower() in FALSE_VALUES
+        if self.skip_count:
+            self.count = None
+            rows = [row async for row in queryset[self.offset:self.offset + self.limit + 1]]
+            self.has_next = len(rows) > self.limit
+            return rows[:self.limit]
+
+        self.count = await queryset.acount()
+        if self.count == 0 or self.offset > self.count:
+            return []
+        return [row async for row in queryset[self.offset:self.offset + self.limit]]
+
+    def get_next_link(self):
+        if not self.skip_count:
+            return super().get_next_link()
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        url = replace_query_param(url, self.limit_query_param, self.limit)
+        return replace_query_param(url, self.offset_query_param, self.offset + self.limit)
+
+    def get_paginated_response(self, data):
+        if not self.skip_count:
+            return super().get_paginated_response(data)
+        return Response({
+            "next": self.get_next_link(),
+            "previous": self.get_previous_link(),
+            "results": data,
+        })
+
+
+class KeysetPagination(pagination.CursorPagination):
+    """
+    Keyset (cursor) pagination on the ``cursor_ordering`` of the view, which
+    should be an indexed and unique column. Pages cost the same however deep
+    the client goes. The total is left out unless ?count=true is passed.
+    """
+    ordering = "id"
+    page_size = 100
+    page_size_query_param = "page_size"
+    max_page_size = 1000
+    count_query_param = "count"
+
+    def get_ordering(self, request, queryset, view):
+        ordering = getattr(view, "cursor_ordering", self.ordering)
+        return (ordering,) if isinstance(ordering, str) else tuple(ordering)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        with_count = request.query_params.get(self.count_query_param, "").lower() in TRUE_VALUES
+        self.count = queryset.count() if with_count else None
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        response = super().get_paginated_response(data)
+        if self.count is not None:
+            response.data["count"] = self.count
+        return response
+
+
+class HybridPagination(pagination.BasePagination):
+    """
+    Limit/offset pagination for legacy clients, switched to keyset pagination
+    per request with ?pagination=cursor (or any request carrying a ?cursor=).
+    """
+    mode_query_param = "pagination"
+
+    def __init__(self):
+        self.paginator = LimitOffsetPagination()
+
+    def use_cursor(self, request):
+        return (
+            request.query_params.get(self.mode_query_param) == "cursor"
+            or KeysetPagination.cursor_query_param in request.query_params
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.paginator = KeysetPagination() if self.use_cursor(request) else LimitOffsetPagination()
+        return self.paginator.paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        return self.paginator.get_paginated_response(data)
+
+    def get_paginated_response_schema(self, schema):
+        return self.paginator.get_paginated_response_schema(schema)
+
+    def get_results(self, data):
+        return self.paginator.get_results(data)
+
+    def to_html(self):
+        return self.paginator.to_html()
+
+    @property
+    def display_page_controls(self):
+        return getattr(self.paginator, "display_page_controls", False)
+
+    def get_schema_operation_parameters(self, view):
+        return (
+            LimitOffsetPagination().get_schema_operation_parameters(view)
+            + KeysetPagination().get_schema_operation_parameters(view)
+        )
@@ -0,0 +1,187 @@
+"""
+Opt-in request profiling. With PROFILING_ENABLED set, ProfilingMiddleware
+times every request to the API routes of core.routers, splits the time
+between the database, the view code (serializers, mostly) and rendering,
+reports the split in a Server-Timing header and keeps the recent samples
+of each route for the /api/_metrics/ endpoint.
+"""
+import math
+import threading
+import time
+from collections import deque
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+
+class Profile:
+    """
+    Measurements of one request. ``execute`` is installed as an execute
+    wrapper on every database connection for the duration of the request.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.view_started = None
+        self.view_time = None
+        self.render_started = None
+        self.render_time = 0.0
+        self._view_db_time = 0.0
+
+    def execute(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.db_time += time.perf_counter() - started
+
+    def start_view(self):
+        self.view_started = time.perf_counter()
+        self._view_db_time = self.db_time
+
+    def end_view(self):
+        if self.view_started is not None and self.view_time is None:
+            elapsed = time.perf_counter() - self.view_started
+            self.view_time = max(elapsed - (self.db_time - self._view_db_time), 0.0)
+
+    def start_render(self):
+        self.render_started = time.perf_counter()
+
+    def end_render(self, response):
+        if self.render_started is not None:
+            self.render_time = time.perf_counter() - self.render_started
+
+    def sample(self, size):
+        return {
+            "total_ms": (time.perf_counter() - self.started) * 1000,
+            "db_ms": self.db_time * 1000,
+            "queries": self.queries,
+            "serialize_ms": (self.view_time or 0.0) * 1000,
+            "render_ms": self.render_time * 1000,
+            "size": size,
+        }
+
+
+def server_timing(sample):
+    return ", ".join([
+        f'db;dur={sample["db_ms"]:.2f};desc="{sample["queries"]} queries"',
+        f'serialize;dur={sample["serialize_ms"]:.2f}',
+        f'render;dur={sample["render_ms"]:.2f}',
+        f'total;dur={sample["total_ms"]:.2f}',
+    ])
+
+
+def percentile(values, fraction):
+    """
+    Nearest-rank percentile of sorted ``values``.
+    """
+    if not values:
+        return None
+    return values[max(math.ceil(fraction * len(values)) - 1, 0)]
+
+
+class Histogram:
+    """
+    The most recent ``max_samples`` samples of every key (a route, a task),
+    kept in process memory and summarized as percentiles of ``fields``.
+    """
+
+    def __init__(self, fields, max_samples=None):
+        self.fields = fields
+        self._max_samples = max_samples
+        self._samples = {}
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    @property
+    def max_samples(self):
+        return self._max_samples if self._max_samples is not None else settings.PROFILING_MAX_SAMPLES
+
+    def record(self, key, sample):
+        with self._lock:
+            if key not in self._samples:
+                self._samples[key] = deque(maxlen=self.max_samples)
+                self._counts[key] = 0
+            self._samples[key].append(sample)
+            self._counts[key] += 1
+
+    def summary(self):
+        with self._lock:
+            keys = {key: (list(samples), self._counts[key]) for key, samples in self._samples.items()}
+        return {key: self._summarize(samples, count) for key, (samples, count) in sorted(keys.items())}
+
+    def _summarize(self, samples, count):
+        summary = {"count": count, "samples": len(samples)}
+        for field in self.fields:
+            # Fields a sample could not measure, like the size of a streamed response, are None
+            values = sorted(sample[field] for sample in samples if sample[field] is not None)
+            summary[field] = {
+                "p50": percentile(values, 0.50),
+                "p95": percentile(values, 0.95),
+                "p99": percentile(values, 0.99),
+            }
+        return summary
+
+    def clear(self):
+        with self._lock:
+            self._samples.clear()
+            self._counts.clear()
+
+
+route_histogram = Histogram(("total_ms", "db_ms", "queries", "serialize_ms", "render_ms", "size"))
+
+
+def profiled_route(request):
+    """
+    Histogram key of a request to a core.routers route, None for any other request.
+    """
+    match = getattr(request, "resolver_match", None)
+    if match is None or not match.func.__module__.startswith("core.") or match.url_name == "metrics":
+        return None
+    return f"{request.method} {match.view_name}"
+
+
+class ProfilingMiddleware:
+    """
+    Records wall time, query count and database time, view time and
+    response size of the requests to the API routes. Unused unless
+    PROFILING_ENABLED is set.
+    """
+
+    def __init__(self, get_response):
+        if not settings.PROFILING_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        profile = request._profile = Profile()
+        with ExitStack() as stack:
+            for connection in connections.all(initialized_only=False):
+                stack.enter_context(connection.execute_wrapper(profile.execute))
+            response = self.get_response(request)
+        profile.end_view()
+
+        route = profiled_route(request)
+        if route is None:
+            return response
+        size = None if response.streaming else len(response.content)
+        sample = profile.sample(size)
+        route_histogram.record(route, sample)
+        response["Server-Timing"] = server_timing(sample)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._profile.start_view()
+
+    def process_template_response(self, request, response):
+        # DRF responses are rendered after this hook returns
+        profile = request._profile
+        profile.end_view()
+        profile.start_render()
+        response.add_post_render_callback(profile.end_render)
+        return response
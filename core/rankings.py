@@ -0,0 +1,118 @@
+from django.db import transaction
+from django.db.models import Avg, Count, F, Prefetch, Window, prefetch_related_objects
+from django.db.models.functions import DenseRank, Lower, PercentRank, Rank
+
+from .models import Mark, Ranking, RankingCohort, ReportCard
+
+
+def _ranked(queryset, score, partition_by=None):
+    """
+    Annotate rank, dense rank, percentile and cohort size on ``queryset``
+    with window functions over ``score`` (highest first).
+    """
+    def window(expression, descending=True):
+        return Window(
+            expression=expression,
+            partition_by=partition_by,
+            order_by=score.desc() if descending else score.asc(),
+        )
+
+    return queryset.annotate(
+        rank=window(Rank()),
+        dense_rank=window(DenseRank()),
+        percent_rank=window(PercentRank(), descending=False),
+        cohort_size=Window(expression=Count("*"), partition_by=partition_by),
+    )
+
+
+def refresh_rankings(year, term, batch_size=1000):
+    """
+    Recompute every ranking of one (term, year) cohort: per subject on the
+    mark scores and overall on the average score of each report card.
+    Returns the cohort.
+    """
+    term = term.lower()
+    cards = ReportCard.objects.annotate(term_key=Lower("term")).filter(year=year, term_key=term)
+    subject_rows = (
+        _ranked(
+            Mark.objects.filter(report_card__in=cards.values("id")),
+            F("score"),
+            partition_by=F("subject_id"),
+        )
+        .values("report_card_id", "subject_id", "score", "rank", "dense_rank", "percent_rank", "cohort_size")
+        .order_by("subject_id", "rank", "report_card_id")
+    )
+    overall_rows = (
+        _ranked(
+            cards.filter(marks__isnull=False).values("id").annotate(score=Avg("marks__score")),
+            F("score"),
+        )
+        .values("id", "score", "rank", "dense_rank", "percent_rank", "cohort_size")
+        .order_by("rank", "id")
+    )
+
+    with transaction.atomic():
+        cohort, created = RankingCohort.objects.get_or_create(year=year, term=term)
+        if not created:
+            # Cleared first so a mark written while refreshing flags the cohort again
+            RankingCohort.objects.filter(pk=cohort.pk).update(stale=False)
+        cohort.rankings.all().delete()
+        # Inserted in rank order, so the ids of a leaderboard follow its ranks
+        rankings = [
+            Ranking(cohort=cohort, report_card_id=row["id"], subject_id=None, **_ranking_fields(row))
+            for row in overall_rows
+        ]
+        rankings += [
+            Ranking(cohort=cohort, report_card_id=row["report_card_id"], subject_id=row["subject_id"],
+                    **_ranking_fields(row))
+            for row in subject_rows
+        ]
+        Ranking.objects.bulk_create(rankings, batch_size=batch_size)
+    cohort.stale = False
+    return cohort
+
+
+def _ranking_fields(row):
+    return {
+        "score": row["score"],
+        "rank": row["rank"],
+        "dense_rank": row["dense_rank"],
+        "percentile": round(row["percent_rank"] * 100, 2),
+        "cohort_size": row["cohort_size"],
+    }
+
+
+def attach_rankings(report_cards):
+    """
+    Prefetch the rankings of ``report_cards``, so serializing them costs no
+    query per card. Reads never re-rank: a cohort flagged as stale keeps its
+    last rankings until refresh_stale_rankings has run.
+    """
+    report_cards = list(report_cards)
+    rankings = Ranking.objects.order_by(F("subject_id").asc(nulls_first=True))
+    prefetch_related_objects(report_cards, Prefetch("rankings", queryset=rankings))
+    return report_cards
+
+
+def invalidate_cohorts(keys):
+    """
+    Flag the ranking cohorts of the given (year, term) keys as stale,
+    creating those that have never been ranked, in one query.
+    """
+    keys = sorted({(int(year), term.lower()) for year, term in keys})
+    if keys:
+        RankingCohort.objects.bulk_create(
+            [RankingCohort(year=year, term=term, stale=True) for year, term in keys],
+            update_conflicts=True,
+            unique_fields=["year", "term"],
+            update_fields=["stale"],
+        )
+
+
+def invalidate_card_cohorts(report_card_ids):
+    """
+    Flag the ranking cohorts the given report cards belong to as stale.
+    """
+    invalidate_cohorts(
+        ReportCard.objects.filter(pk__in=report_card_ids).values_list("year", "term").distinct()
+    )
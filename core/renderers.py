@@ -0,0 +1,43 @@
+import csv
+import io
+import json
+
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+
+class NDJSONRenderer(BaseRenderer):
+    """
+    Newline delimited JSON. Streaming views write their own rows, this is
+    used for content negotiation and for plain responses such as errors.
+    """
+    media_type = "application/x-ndjson"
+    format = "ndjson"
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        rows = data if isinstance(data, list) else [data]
+        return "".join(json.dumps(row, cls=JSONEncoder) + "\n" for row in rows).encode(self.charset)
+
+
+class CSVRenderer(BaseRenderer):
+    """
+    CSV with one row per item. Plain responses such as errors are written
+    as key/value rows.
+    """
+    media_type = "text/csv"
+    format = "csv"
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        if isinstance(data, dict):
+            writer.writerows(data.items())
+        else:
+            writer.writerows(data)
+        return buffer.getvalue().encode(self.charset)
@@ -1,7 +1,9 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
+
+from . import async_views
 from .viewsets import (
-    StudentModelViewSet, SubjectModelViewSet, ReportCardModelViewSet, MarkModelViewSet
+    StudentModelViewSet, SubjectModelViewSet, ReportCardModelViewSet, MarkModelViewSet, MetricsView
 )
 
 router = DefaultRouter()
@@ -12,4 +14,18 @@ router.register(r"marks", MarkModelViewSet, basename="mark")
 
 urlpatterns = [
     path("", include(router.urls)),
+    # Per-route latency percentiles recorded by core.profiling.ProfilingMiddleware
+    path("_metrics/", MetricsView.as_view(), name="metrics"),
+    # Async read endpoints, for deployments served over ASGI
+    path(
+        "async/report-cards/<int:pk>/",
+        async_views.report_card_detail,
+        name="async-report-card-detail",
+    ),
+    path("async/marks/", async_views.mark_list, name="async-mark-list"),
+    path(
+        "async/students/<int:pk>/avg-overview/",
+        async_views.avg_overview,
+        name="async-student-avg-overview",
+    ),
 ]
@@ -0,0 +1,137 @@
+"""
+Full-text search of students and subjects.
+
+On SQLite builds with FTS5, migration 0009 creates an external content FTS5
+index per table of SEARCH_INDEXES (``<table>_fts``), filled from the table
+and kept in sync with it by triggers, so every insert, update and
+delete is indexed, bulk ones and plain SQL included. FullTextSearchFilter
+then answers ?search= from the index, matching every word of the search as
+a prefix and ordering the results by relevance (bm25). Other databases, and
+SQLite builds without FTS5, keep DRF's LIKE search.
+
+Migrations that rebuild an indexed table on SQLite (e.g. altering one of its
+columns) drop its triggers, and have to call create_search_index again.
+"""
+import re
+import sqlite3
+from functools import cache
+
+from django.conf import settings
+from django.db import connections
+from rest_framework import filters
+
+
+# Indexed columns of each table, matching the search_fields of its viewset
+SEARCH_INDEXES = {
+    "core_student": ("name", "email"),
+    "core_subject": ("name", "code"),
+}
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def index_table(table):
+    return f"{table}_fts"
+
+
+@cache
+def fts5_supported():
+    """
+    Whether the SQLite library of this process was built with FTS5.
+    """
+    connection = sqlite3.connect(":memory:")
+    try:
+        return bool(connection.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')").fetchone()[0])
+    finally:
+        connection.close()
+
+
+def search_index_available(connection):
+    return connection.vendor == "sqlite" and fts5_supported()
+
+
+def create_search_index(schema_editor, table, columns, pk="id"):
+    """
+    Create the FTS5 index of ``table`` with its sync triggers and fill it from the table.
+    """
+    fts = index_table(table)
+    names = ", ".join(columns)
+    new = ", ".join(f"new.{column}" for column in columns)
+    old = ", ".join(f"old.{column}" for column in columns)
+    delete_old = f"INSERT INTO {fts}({fts}, rowid, {names}) VALUES ('delete', old.{pk}, {old});"
+    insert_new = f"INSERT INTO {fts}(rowid, {names}) VALUES (new.{pk}, {new});"
+    for statement in [
+        f"CREATE VIRTUAL TABLE {fts} USING fts5({names}, content='{table}', content_rowid='{pk}', "
+        f"tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+        f"CREATE TRIGGER {fts}_insert AFTER INSERT ON {table} BEGIN {insert_new} END",
+        f"CREATE TRIGGER {fts}_delete AFTER DELETE ON {table} BEGIN {delete_old} END",
+        f"CREATE TRIGGER {fts}_update AFTER UPDATE ON {table} BEGIN {delete_old} {insert_new} END",
+        f"INSERT INTO {fts}({fts}) VALUES ('rebuild')",
+    ]:
+        schema_editor.execute(statement)
+
+
+def drop_search_index(schema_editor, table):
+    fts = index_table(table)
+    for suffix in ("insert", "delete", "update"):
+        schema_editor.execute(f"DROP TRIGGER IF EXISTS {fts}_{suffix}")
+    schema_editor.execute(f"DROP TABLE IF EXISTS {fts}")
+
+
+def rebuild_search_index(table, using="default"):
+    """
+    Refill the index of ``table`` from the table.
+    """
+    fts = index_table(table)
+    with connections[using].cursor() as cursor:
+        cursor.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+
+
+def match_expression(search):
+    """
+    FTS5 query matching every word of ``search`` as a prefix, or None if it has no words.
+    Each word is quoted, so FTS5 operators in the search are taken literally.
+    """
+    tokens = TOKEN_PATTERN.findall(search)
+    if not tokens:
+        return None
+    return " ".join(f'"{token}"*' for token in tokens)
+
+
+def full_text_search(queryset, expression):
+    """
+    Rows of ``queryset`` matching the FTS5 query ``expression`` in the index
+    of its table, best matches first (``search_rank``, lower is better).
+    """
+    table = queryset.model._meta.db_table
+    fts = index_table(table)
+    # A join with the index: the ORM has no expression for an FTS5 MATCH
+    return queryset.extra(
+        tables=[fts],
+        where=[f"{fts}.rowid = {table}.{queryset.model._meta.pk.column}", f"{fts} MATCH %s"],
+        params=[expression],
+        select={"search_rank": f"{fts}.rank"},
+    ).order_by("search_rank", "pk")
+
+
+class FullTextSearchFilter(filters.SearchFilter):
+    """
+    SearchFilter answered from the FTS5 index of the model when there is
+    one (see the module docstring), DRF's LIKE search otherwise.
+    """
+
+    def use_index(self, queryset, view):
+        columns = SEARCH_INDEXES.get(queryset.model._meta.db_table)
+        return (
+            settings.FULL_TEXT_SEARCH_ENABLED
+            and columns is not None
+            and set(self.get_search_fields(view, None) or ()) <= set(columns)
+            and search_index_available(connections[queryset.db])
+        )
+
+    def filter_queryset(self, request, queryset, view):
+        # Searches without any word (e.g. only punctuation) are left to the LIKE search
+        expression = match_expression(request.query_params.get(self.search_param, ""))
+        if expression is None or not self.use_index(queryset, view):
+            return super().filter_queryset(request, queryset, view)
+        return full_text_search(queryset, expression)
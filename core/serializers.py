@@ -1,8 +1,45 @@
+from contextlib import contextmanager
+
+from django.db import IntegrityError, models, transaction
 from rest_framework import serializers
-from .models import Student, Subject, ReportCard, Mark
+from rest_framework.settings import api_settings
+
+from .archive import is_archived
+from .grading import context_grader, grade_fields
+from .models import Student, Subject, ReportCard, Mark, Ranking
+
+
+# Upper bound of options rendered for related fields in the browsable API forms
+RELATED_CHOICES_CUTOFF = 100
+
+
+def validate_open_year(year):
+    if is_archived(year):
+        raise serializers.ValidationError(f"Year {year} is archived.")
+    return year
+
 
+class SparseFieldsMixin:
+    """
+    Renders only the fields of the request's ?fields=/?expand= fieldset
+    (``context["fieldset"]``, see core.fieldsets), when this is the
+    top-level serializer of the response rather than a nested one.
+    """
 
-class StudentModelSerializer(serializers.ModelSerializer):
+    @property
+    def fieldset(self):
+        top = self.parent if isinstance(self.parent, serializers.ListSerializer) else self
+        return self.context.get("fieldset") if top.parent is None else None
+
+    def get_fields(self):
+        fields = super().get_fields()
+        fieldset = self.fieldset
+        if fieldset is None:
+            return fields
+        return {name: field for name, field in fields.items() if fieldset.includes(name)}
+
+
+class StudentModelSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Student
         fields = ["id", "name", "email", "date_of_birth"]
@@ -52,30 +89,102 @@ class MarkModelSerializer(serializers.ModelSerializer):
         }
 
 
-class MarkSerializer(serializers.ModelSerializer):
+class GradedMarkListSerializer(serializers.ListSerializer):
+    """
+    Grades all the marks of the list in one batch before rendering them.
+    """
+
+    def to_representation(self, data):
+        marks = list(data.all() if isinstance(data, models.manager.BaseManager) else data)
+        grades = context_grader(self.context).grade_many(mark.score for mark in marks)
+        return [self.child.graded_representation(mark, grade) for mark, grade in zip(marks, grades)]
+
+
+class MarkSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     subject = SubjectModelSerializer(read_only=True)
 
     class Meta:
         model = Mark
         fields = ["id", "score", "subject"]
+        list_serializer_class = GradedMarkListSerializer
 
+    def to_representation(self, instance):
+        """
+        Adds the letter grade and grade point of the score on the default grading scale.
+        """
+        return self.graded_representation(instance, context_grader(self.context).grade(instance.score))
 
-class ReportCardSerializer(serializers.ModelSerializer):
+    def graded_representation(self, instance, grade):
+        data = super().to_representation(instance)
+        data.update(grade_fields(grade))
+        return data if self.fieldset is None else self.fieldset.filter(data)
+
+
+class RankingSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Ranking
+        fields = ["subject", "score", "rank", "dense_rank", "percentile", "cohort_size"]
+
+
+class ReportCardSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     marks = MarkSerializer(many=True, read_only=True)
     student_detail = StudentModelSerializer(source="student", read_only=True)
 
     class Meta:
         model = ReportCard
         fields = ["id", "student", "term", "year", "marks", "student_detail"]
+        extra_kwargs = {
+            "student": {"html_cutoff": RELATED_CHOICES_CUTOFF},
+        }
 
-    def validate(self, data):
-        student = data.get("student")
-        term = data.get("term")
-        year = data.get("year")
-        if ReportCard.objects.filter(student=student, term__iexact=term, year=year).exists():
-            raise serializers.ValidationError(f"Report card for this student for {term} {year} already exists")
+    def to_representation(self, instance):
+        """
+        Rankings within the cohort are only added when the context asks for
+        ``include_rankings``; they are read from the prefetched ``rankings``.
+        """
+        data = super().to_representation(instance)
+        if self.context.get("include_rankings"):
+            rankings = list(instance.rankings.all())
+            overall = next((ranking for ranking in rankings if ranking.subject_id is None), None)
+            data["rankings"] = {
+                "overall": RankingSerializer(overall).data if overall else None,
+                "subjects": RankingSerializer(
+                    [ranking for ranking in rankings if ranking.subject_id is not None], many=True
+                ).data,
+            }
         return data
 
+    def validate_year(self, year):
+        return validate_open_year(year)
+
+    def create(self, validated_data):
+        with self._unique_term_guard(validated_data):
+            return super().create(validated_data)
+
+    def update(self, instance, validated_data):
+        with self._unique_term_guard({"term": instance.term, "year": instance.year, **validated_data}):
+            return super().update(instance, validated_data)
+
+    @contextmanager
+    def _unique_term_guard(self, data):
+        """
+        Duplicates are rejected by the unique_report_card_term constraint
+        rather than a lookup before every insert, which also closes the race
+        between concurrent requests. Its IntegrityError becomes the usual
+        validation error.
+        """
+        try:
+            with transaction.atomic():
+                yield
+        except IntegrityError as exc:
+            if "unique_report_card_term" not in str(exc):
+                raise
+            raise serializers.ValidationError({
+                api_settings.NON_FIELD_ERRORS_KEY: [
+                    f"Report card for this student for {data.get('term')} {data.get('year')} already exists"
+                ]
+            })
+
 
 class AddMarkSerializer(serializers.ModelSerializer):
 
@@ -87,6 +196,32 @@ class AddMarkSerializer(serializers.ModelSerializer):
             "report_card",
             "score"
         ]
-    extra_kwargs = {
-        "id": {"read_only": True},
-    }
+        extra_kwargs = {
+            "id": {"read_only": True},
+            "subject": {"html_cutoff": RELATED_CHOICES_CUTOFF},
+            # Report cards are displayed with their student's name
+            "report_card": {
+                "queryset": ReportCard.objects.select_related("student"),
+                "html_cutoff": RELATED_CHOICES_CUTOFF,
+            },
+        }
+
+
+class BulkMarkSerializer(serializers.Serializer):
+    """
+    Shape of one row of a bulk mark upload. Related ids are only checked
+    for type here and resolved for the whole batch at once in core.bulk.
+    """
+    report_card = serializers.IntegerField(min_value=1)
+    subject = serializers.IntegerField(min_value=1)
+    score = serializers.DecimalField(max_digits=5, decimal_places=2)
+
+
+class BulkReportCardSerializer(serializers.Serializer):
+    """
+    One term's report cards for a cohort of students. The student ids are
+    resolved for the whole cohort at once in core.bulk.
+    """
+    term = serializers.CharField(max_length=100)
+    year = serializers.IntegerField(validators=[validate_open_year])
+    students = serializers.ListField(child=serializers.IntegerField(min_value=1), allow_empty=False)
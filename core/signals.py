@@ -0,0 +1,174 @@
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from .archive import tracking_suspended
+from .authentication import token_cache
+from .cache import overview_cache, stats_cache
+from .conditional import touch_report_cards
+from .db import configure_sqlite
+from .grading import clear_default_grader
+from .models import GradeBand, GradingScale, Mark, ReportCard, Student, Subject
+from .overview import apply_mark_delta, card_key, rebuild_overviews
+from .rankings import invalidate_card_cohorts, invalidate_cohorts
+from .tasks import request_rankings_refresh
+
+
+MARK_STATE_FIELDS = {"report_card_id", "subject_id", "score"}
+
+
+def _mark_state(mark):
+    score = Mark._meta.get_field("score").to_python(mark.score)
+    return mark.report_card_id, mark.subject_id, score
+
+
+@receiver(post_save, sender=Mark)
+def track_mark_save(sender, instance, created, raw=False, **kwargs):
+    """
+    Keep the student year overview totals in step with a saved mark,
+    invalidate the cached overviews and cohort statistics it affects, flag
+    the rankings of its cohort as stale and bump its report card's updated_at.
+    """
+    if raw or tracking_suspended():
+        return
+    new_card, new_subject, new_score = _mark_state(instance)
+    new_key = card_key(new_card)
+    touched = {new_key}
+    loaded = getattr(instance, "_loaded_values", None)
+    if created:
+        apply_mark_delta(*new_key, new_subject, new_score, 1)
+    elif loaded is None or not MARK_STATE_FIELDS <= loaded.keys():
+        rebuild_overviews(*new_key)
+    else:
+        old_card, old_subject, old_score = loaded["report_card_id"], loaded["subject_id"], loaded["score"]
+        if (old_card, old_subject) == (new_card, new_subject):
+            if old_score != new_score:
+                apply_mark_delta(*new_key, new_subject, new_score - old_score, 0)
+        else:
+            old_key = new_key if old_card == new_card else card_key(old_card)
+            touched.add(old_key)
+            apply_mark_delta(*old_key, old_subject, -old_score, -1)
+            apply_mark_delta(*new_key, new_subject, new_score, 1)
+    instance._loaded_values = {
+        "report_card_id": new_card, "subject_id": new_subject, "score": new_score,
+    }
+    for student_id in {student_id for student_id, _ in touched}:
+        overview_cache.invalidate(student_id)
+    stats_cache.invalidate(*(year for _, year in touched))
+    cards = {new_card, (loaded or {}).get("report_card_id", new_card)}
+    invalidate_card_cohorts(cards)
+    request_rankings_refresh()
+    touch_report_cards(pk__in=cards)
+
+
+@receiver(post_delete, sender=Mark)
+def track_mark_delete(sender, instance, **kwargs):
+    if tracking_suspended():
+        return
+    report_card_id, subject_id, score = _mark_state(instance)
+    try:
+        student_id, year = card_key(report_card_id)
+    except ReportCard.DoesNotExist:
+        return
+    apply_mark_delta(student_id, year, subject_id, -score, -1)
+    overview_cache.invalidate(student_id)
+    stats_cache.invalidate(year)
+    invalidate_card_cohorts([report_card_id])
+    request_rankings_refresh()
+    touch_report_cards(pk=report_card_id)
+
+
+@receiver(post_save, sender=ReportCard)
+def track_report_card_save(sender, instance, created, raw=False, **kwargs):
+    """
+    Rebuild the affected totals when a report card moves to another student
+    or year, and invalidate the cached overviews, cohort statistics and
+    rankings it affects.
+    """
+    if raw or tracking_suspended():
+        return
+    overview_cache.invalidate(instance.student_id)
+    loaded = getattr(instance, "_loaded_values", None)
+    if not created:
+        # A renamed or moved card changes the statistics of its old and new cohort
+        stats_cache.invalidate(instance.year, (loaded or {}).get("year", instance.year))
+        invalidate_cohorts({
+            (instance.year, instance.term),
+            ((loaded or {}).get("year", instance.year), (loaded or {}).get("term", instance.term)),
+        })
+        request_rankings_refresh()
+    if not created and loaded is not None and {"student_id", "year"} <= loaded.keys():
+        old_key = (loaded["student_id"], int(loaded["year"]))
+        new_key = (instance.student_id, int(instance.year))
+        if old_key != new_key:
+            rebuild_overviews(*old_key)
+            rebuild_overviews(*new_key)
+            overview_cache.invalidate(old_key[0])
+    instance._loaded_values = {
+        "id": instance.pk, "student_id": instance.student_id, "term": instance.term, "year": instance.year,
+    }
+
+
+@receiver(post_delete, sender=ReportCard)
+def track_report_card_delete(sender, instance, **kwargs):
+    if tracking_suspended():
+        return
+    overview_cache.invalidate(instance.student_id)
+    stats_cache.invalidate(instance.year)
+    invalidate_cohorts([(instance.year, instance.term)])
+    request_rankings_refresh()
+
+
+@receiver(post_save, sender=Student)
+def track_student_save(sender, instance, created, raw=False, **kwargs):
+    """
+    Report cards and overviews embed their student's details, so an edited
+    student changes their ETags.
+    """
+    if raw or created:
+        return
+    touch_report_cards(student_id=instance.pk)
+    overview_cache.invalidate(instance.pk)
+
+
+@receiver(post_save, sender=Subject)
+def track_subject_save(sender, instance, created, raw=False, **kwargs):
+    """
+    Same for the report cards and overviews with a mark in an edited subject.
+    """
+    if raw or created:
+        return
+    touch_report_cards(marks__subject_id=instance.pk)
+    students = ReportCard.objects.filter(marks__subject_id=instance.pk).values_list("student_id", flat=True)
+    for student_id in set(students):
+        overview_cache.invalidate(student_id)
+
+
+@receiver(post_save, sender=GradingScale)
+@receiver(post_delete, sender=GradingScale)
+@receiver(post_save, sender=GradeBand)
+@receiver(post_delete, sender=GradeBand)
+def track_grading_scale_change(sender, **kwargs):
+    clear_default_grader()
+
+
+@receiver(post_delete, sender=Token)
+def track_token_delete(sender, instance, **kwargs):
+    token_cache.invalidate(instance.key)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def track_user_save(sender, instance, raw=False, **kwargs):
+    """
+    Drop the cached tokens of a saved user, so deactivation takes effect on the next request.
+    """
+    if raw:
+        return
+    token_cache.invalidate_user(instance.pk)
+
+
+@receiver(connection_created)
+def tune_connection(sender, connection, **kwargs):
+    configure_sqlite(connection)
@@ -0,0 +1,64 @@
+from django.conf import settings
+from django.db.models import Avg, Count, Max, Min, Q, StdDev
+
+from .archive import mark_model
+
+
+def cohort_stats(year, term=None):
+    """
+    Per-subject statistics of every mark given in a year, optionally
+    limited to one term (matched case-insensitively), computed with one
+    grouped query. The cohort-wide figures are derived from the subject
+    rows rather than a second pass over the marks. Archived years are read
+    from the archive tables.
+    """
+    marks = mark_model(year).objects.filter(report_card__year=year)
+    if term:
+        marks = marks.filter(report_card__term__iexact=term)
+    rows = (
+        marks
+        .values("subject_id", "subject__name", "subject__code")
+        .annotate(
+            student_count=Count("report_card__student_id", distinct=True),
+            mark_count=Count("id"),
+            average_score=Avg("score"),
+            min_score=Min("score"),
+            max_score=Max("score"),
+            std_dev=StdDev("score"),
+            passed=Count("id", filter=Q(score__gte=settings.REPORT_CARD_PASS_MARK)),
+        )
+        .order_by("subject__name")
+    )
+
+    subjects = []
+    total = passed = count = 0
+    for row in rows:
+        subjects.append({
+            "subject_id": row["subject_id"],
+            "subject_name": row["subject__name"],
+            "subject_code": row["subject__code"],
+            "student_count": row["student_count"],
+            "mark_count": row["mark_count"],
+            "average_score": row["average_score"],
+            "min_score": row["min_score"],
+            "max_score": row["max_score"],
+            "std_dev": row["std_dev"],
+            "pass_rate": row["passed"] / row["mark_count"],
+        })
+        total += row["average_score"] * row["mark_count"]
+        passed += row["passed"]
+        count += row["mark_count"]
+
+    return {
+        "year": year,
+        "term": term or None,
+        "pass_mark": settings.REPORT_CARD_PASS_MARK,
+        "subjects": subjects,
+        "overall": {
+            "mark_count": count,
+            "average_score": total / count if count else None,
+            "min_score": min((subject["min_score"] for subject in subjects), default=None),
+            "max_score": max((subject["max_score"] for subject in subjects), default=None),
+            "pass_rate": passed / count if count else None,
+        },
+    }
@@ -1,27 +1,179 @@
+import re
+import time
+import uuid
+from itertools import groupby
+from operator import itemgetter
+
 from celery import shared_task
-from django.db.models import Avg, F
-from .models import Mark, ReportCard
-from .serializers import ReportCardSerializer
+from celery.result import AsyncResult
+from celery.signals import before_task_publish, task_postrun, task_prerun
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .cache import overview_cache
+from .models import OverviewPrecompute, RankingCohort
+from .overview import student_overview, student_overviews
+from .profiling import Histogram
+from .rankings import refresh_rankings
+
+
+OVERVIEW_TASK_ID_PATTERN = re.compile(r"overview-(?P<student>\d+)-(?P<year>-?\d+)-[0-9a-f]{32}")
+
+# Run time and queue latency of the core tasks executed by this process
+task_histogram = Histogram(("runtime_ms", "queue_ms"))
+_task_starts = {}
 
 
 @shared_task
 def calculate_student_overview(student, year):
     """
-    Celery task to calculate student overview
+    Celery task to calculate student overview.
+    The result is also cached so later requests can be answered without a new task.
+    """
+    generation = overview_cache.generation(student)
+    try:
+        overview = student_overview(student, year)
+    except Exception:
+        # A failed task must not keep answering for its (student, year)
+        cache.delete(_overview_task_key(student, year, generation))
+        raise
+    overview_cache.set(student, year, overview, generation)
+    return overview
+
+
+def _overview_task_key(student, year, generation):
+    return f"overview:task:{student}:{year}:{generation}"
+
+
+def overview_task_id(student, year):
+    """
+    Id for a new calculate_student_overview task, naming the student and year it is for.
+    """
+    return f"overview-{student}-{year}-{uuid.uuid4().hex}"
+
+
+def overview_task_student(task_id):
+    """
+    Student of a task id from overview_task_id, or None for any other id.
+    """
+    match = OVERVIEW_TASK_ID_PATTERN.fullmatch(task_id)
+    return int(match["student"]) if match else None
+
+
+def enqueue_student_overview(student, year):
+    """
+    Queue calculate_student_overview unless a task for the same student,
+    year and overview generation has already been queued, in which case
+    the result of that task is returned instead. A write to the student's
+    marks starts a new generation and so allows a new task. The task slots
+    live in the shared cache, so every web worker joins the same task.
+    """
+    key = _overview_task_key(student, year, overview_cache.generation(student))
+    task_id = overview_task_id(student, year)
+    if not cache.add(key, task_id, settings.OVERVIEW_TASK_DEDUP_TIMEOUT):
+        queued = cache.get(key)
+        if queued is not None:
+            return AsyncResult(queued, app=calculate_student_overview.app)
+        cache.set(key, task_id, settings.OVERVIEW_TASK_DEDUP_TIMEOUT)
+    return calculate_student_overview.apply_async((student, year), task_id=task_id)
+
+
+@shared_task
+def calculate_student_overviews(students, year):
+    """
+    Calculate and cache the overviews of many students for one year in a
+    few set-based queries. Returns the number of overviews cached.
     """
-    qs = ReportCard.objects.filter(student=student, year=year).prefetch_related("marks__subject")
-    cards_serializer = ReportCardSerializer(qs, many=True)
+    generations = {student: overview_cache.generation(student) for student in students}
+    overviews = student_overviews(students, year)
+    for student, overview in overviews.items():
+        overview_cache.set(student, year, overview, generations[student])
+    return len(overviews)
+
+
+def request_precompute(pairs):
+    """
+    Flag the (student_id, year) pairs whose marks were written in bulk, so
+    precompute_overviews warms their overviews on its next run. The flags
+    are rows of OverviewPrecompute, so every worker and beat see them.
+    """
+    OverviewPrecompute.objects.bulk_create(
+        [OverviewPrecompute(student_id=student, year=year) for student, year in sorted(set(pairs))],
+        ignore_conflicts=True,
+    )
+
+
+@shared_task
+def precompute_overviews(batch_size=None):
+    """
+    Periodic task (see CELERY_BEAT_SCHEDULE) that queues calculate_student_overviews
+    in batches for the (student, year) pairs flagged by request_precompute.
+    Returns the number of batches queued.
+    """
+    batch_size = batch_size or settings.OVERVIEW_PRECOMPUTE_BATCH_SIZE
+    flagged = OverviewPrecompute.objects.order_by("year", "student_id").values_list("id", "year", "student_id")
+    queued = 0
+    for year, rows in groupby(flagged, key=itemgetter(1)):
+        rows = list(rows)
+        for start in range(0, len(rows), batch_size):
+            batch = rows[start:start + batch_size]
+            # Cleared before the overviews are computed, so a write meanwhile flags its pair again
+            OverviewPrecompute.objects.filter(pk__in=[pk for pk, _, _ in batch]).delete()
+            calculate_student_overviews.delay([student for _, _, student in batch], year)
+            queued += 1
+    return queued
+
+
+@shared_task
+def refresh_stale_rankings():
+    """
+    Re-rank the cohorts flagged as stale by mark and report card writes.
+    Queued by request_rankings_refresh and run periodically as well (see
+    CELERY_BEAT_SCHEDULE). Returns the number of cohorts refreshed.
+    """
+    refreshed = 0
+    for pk, year, term in RankingCohort.objects.filter(stale=True).order_by("pk").values_list("pk", "year", "term"):
+        # Claimed first, so a task running concurrently leaves the cohort alone
+        if RankingCohort.objects.filter(pk=pk, stale=True).update(stale=False):
+            refresh_rankings(year, term)
+            refreshed += 1
+    return refreshed
+
+
+def request_rankings_refresh():
+    """
+    Queue refresh_stale_rankings once the current transaction commits, so
+    the rankings are refreshed from the write path and never by a read.
+    """
+    transaction.on_commit(refresh_stale_rankings.delay)
+
+
+def _is_core_task(name):
+    return name is not None and name.startswith(f"{__name__}.")
+
+
+@before_task_publish.connect
+def stamp_enqueued_at(sender=None, headers=None, **kwargs):
+    if _is_core_task(sender) and headers is not None:
+        headers["enqueued_at"] = time.time()
+
+
+@task_prerun.connect
+def start_task_timer(task_id=None, task=None, **kwargs):
+    if _is_core_task(task.name):
+        _task_starts[task_id] = (time.perf_counter(), time.time())
 
-    marks_qs = Mark.objects.filter(report_card__student=student, report_card__year=year)
-    subject_aggregate = (
-        marks_qs
-        .annotate(subject_name=F("subject__name"))
-        .values("subject_name")
-        .annotate(average_score=Avg("score")))
-    overall_average = marks_qs.aggregate(overall_average=Avg("score"))["overall_average"]
 
-    return {
-        "report_cards": cards_serializer.data,
-        "subject_averages": list(subject_aggregate),
-        "overall_average": overall_average
-    }
+@task_postrun.connect
+def record_task_timing(task_id=None, task=None, **kwargs):
+    started = _task_starts.pop(task_id, None)
+    if started is None:
+        return
+    perf_started, wall_started = started
+    # Tasks run eagerly are never published, so they have no queue latency
+    enqueued_at = getattr(task.request, "enqueued_at", None)
+    task_histogram.record(task.name, {
+        "runtime_ms": (time.perf_counter() - perf_started) * 1000,
+        "queue_ms": (wall_started - enqueued_at) * 1000 if enqueued_at else None,
+    })
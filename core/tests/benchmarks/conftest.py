@@ -0,0 +1,205 @@
+"""
+Fixtures for the latency and query-count benchmarks.
+
+The benchmarks are deselected by default and run with ``pytest -m benchmark``.
+Environment variables:
+
+* ``BENCHMARK_SCALES``: comma separated mark counts to seed (default ``1000``,
+  the baseline also covers ``10000`` and ``100000``).
+* ``BENCHMARK_ROUNDS``: timed rounds per measurement (default ``20``).
+* ``BENCHMARK_CHECK_LATENCY=1``: also fail when the p95 latency regresses
+  against the baseline. Timings depend on the machine the baseline was
+  recorded on, so by default they are only reported; query counts are
+  always checked.
+* ``BENCHMARK_TOLERANCE``: allowed p95 slowdown against the baseline (default ``1.0``, i.e. twice as slow).
+* ``BENCHMARK_UPDATE=1``: store the measured numbers as the new baseline instead of comparing.
+* ``BENCHMARK_CONCURRENCY``: concurrent clients of the WSGI/ASGI load test (default ``20``).
+* ``BENCHMARK_SEARCH_SCALES``: comma separated student counts of the search
+  benchmarks (default ``10000``, the baseline also covers ``100000`` and ``500000``).
+"""
+import json
+import os
+import time
+from datetime import date
+from pathlib import Path
+
+import pytest
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.models import Student, Subject, ReportCard, Mark, StudentYearOverview, RankingCohort, Ranking
+from core.overview import rebuild_overviews
+
+
+BASELINE_PATH = Path(__file__).with_name("baseline.json")
+SUBJECTS = 8
+TERMS = ["Term1", "Term2"]
+YEAR = 2024
+
+SCALES = [int(scale) for scale in os.environ.get("BENCHMARK_SCALES", "1000").split(",")]
+ROUNDS = int(os.environ.get("BENCHMARK_ROUNDS", "20"))
+TOLERANCE = float(os.environ.get("BENCHMARK_TOLERANCE", "1.0"))
+UPDATE = os.environ.get("BENCHMARK_UPDATE") == "1"
+CHECK_LATENCY = os.environ.get("BENCHMARK_CHECK_LATENCY") == "1"
+CONCURRENCY = int(os.environ.get("BENCHMARK_CONCURRENCY", "20"))
+SEARCH_SCALES = [int(scale) for scale in os.environ.get("BENCHMARK_SEARCH_SCALES", "10000").split(",")]
+
+_results = {}
+_throughput = {}
+
+
+def seed(marks):
+    """
+    Create ``marks`` marks spread over students with one report card per term
+    and one mark per subject on each card.
+    """
+    students = max(1, marks // (SUBJECTS * len(TERMS)))
+    subjects = Subject.objects.bulk_create(
+        [Subject(name=f"Subject {i}", code=f"SUB{i}") for i in range(SUBJECTS)]
+    )
+    students = Student.objects.bulk_create(
+        [
+            Student(name=f"Student {i}", email=f"student{i}@example.com", date_of_birth=date(2008, 1, 1))
+            for i in range(students)
+        ],
+        batch_size=1000,
+    )
+    cards = ReportCard.objects.bulk_create(
+        [ReportCard(student=student, term=term, year=YEAR) for student in students for term in TERMS],
+        batch_size=1000,
+    )
+    Mark.objects.bulk_create(
+        [
+            Mark(report_card=card, subject=subject, score=(card.pk * 7 + subject.pk * 13) % 100)
+            for card in cards
+            for subject in subjects
+        ],
+        batch_size=1000,
+    )
+    rebuild_overviews()
+    return {"students": students, "subjects": subjects, "cards": cards}
+
+
+def truncate():
+    # Plain deletes: going through the ORM would fire a signal per mark
+    with connection.cursor() as cursor:
+        for model in [Ranking, RankingCohort, StudentYearOverview, Mark, ReportCard, Subject, Student]:
+            cursor.execute(f"DELETE FROM {model._meta.db_table}")
+
+
+@pytest.fixture(scope="module", params=SCALES, ids=lambda scale: f"{scale}marks")
+def dataset(request, django_db_setup, django_db_blocker):
+    with django_db_blocker.unblock():
+        data = seed(request.param)
+        data["scale"] = request.param
+        yield data
+        truncate()
+
+
+@pytest.fixture
+def api_client(db):
+    user = User.objects.create_user(username="bench", password="pass1234")
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION="Token " + Token.objects.create(user=user).key)
+    return client
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    index = min(len(values) - 1, max(0, round(fraction * (len(values) - 1))))
+    return values[index]
+
+
+def measure(key, func):
+    """
+    Time ``func`` over ``BENCHMARK_ROUNDS`` rounds after one warm-up call and
+    check its query count, and with BENCHMARK_CHECK_LATENCY its p95 latency,
+    against the stored baseline.
+    """
+    func()
+    timings = []
+    with CaptureQueriesContext(connection) as context:
+        func()
+    queries = len(context.captured_queries)
+    for _ in range(ROUNDS):
+        started = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - started) * 1000)
+    result = {
+        "queries": queries,
+        "p50_ms": round(percentile(timings, 0.5), 3),
+        "p95_ms": round(percentile(timings, 0.95), 3),
+    }
+    _results[key] = result
+
+    baseline = _load_baseline().get(key)
+    if UPDATE or baseline is None:
+        return result
+    assert queries <= baseline["queries"], (
+        f"{key}: {queries} queries, baseline is {baseline['queries']}"
+    )
+    if not CHECK_LATENCY:
+        return result
+    limit = baseline["p95_ms"] * (1 + TOLERANCE)
+    assert result["p95_ms"] <= limit, (
+        f"{key}: p95 {result['p95_ms']}ms exceeds {limit:.3f}ms (baseline {baseline['p95_ms']}ms)"
+    )
+    return result
+
+
+@pytest.fixture
+def benchmark(dataset):
+    """
+    Measure a request against the seeded dataset (see measure).
+    """
+
+    def run(name, func):
+        return measure(f"{name}@{dataset['scale']}", func)
+
+    return run
+
+
+@pytest.fixture
+def throughput(dataset):
+    """
+    Record requests per second of a load test. These depend too much on the
+    machine to be compared against a baseline and are only reported.
+    """
+
+    def record(name, requests, seconds):
+        _throughput[f"{name}@{dataset['scale']}"] = requests / seconds
+
+    return record
+
+
+def _load_baseline():
+    if not BASELINE_PATH.exists():
+        return {}
+    return json.loads(BASELINE_PATH.read_text())
+
+
+def pytest_sessionfinish(session):
+    if not _results:
+        return
+    if UPDATE:
+        baseline = _load_baseline()
+        baseline.update(_results)
+        BASELINE_PATH.write_text(json.dumps(dict(sorted(baseline.items())), indent=2) + "\n")
+
+
+def pytest_terminal_summary(terminalreporter):
+    if _results:
+        terminalreporter.section("benchmarks")
+        terminalreporter.write_line(f"{'benchmark':45} {'queries':>8} {'p50 ms':>10} {'p95 ms':>10}")
+        for key, result in sorted(_results.items()):
+            terminalreporter.write_line(
+                f"{key:45} {result['queries']:>8} {result['p50_ms']:>10.3f} {result['p95_ms']:>10.3f}"
+            )
+    if _throughput:
+        terminalreporter.section(f"load test ({CONCURRENCY} concurrent clients)")
+        terminalreporter.write_line(f"{'benchmark':45} {'req/s':>10}")
+        for key, rate in sorted(_throughput.items()):
+            terminalreporter.write_line(f"{key:45} {rate:>10.1f}")
@@ -0,0 +1,93 @@
+"""
+WSGI against ASGI throughput of the overview, report card and mark reads.
+
+WSGI is modelled as a threaded worker with one thread per client, ASGI as
+a single event loop serving every client. Both go through the full
+request handler in process, so the numbers compare the handlers rather
+than the network stack.
+"""
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import AsyncClient, Client
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+
+from .conftest import CONCURRENCY, ROUNDS
+
+
+pytestmark = [pytest.mark.benchmark, pytest.mark.django_db]
+
+
+@pytest.fixture(scope="module")
+def token(dataset, django_db_blocker):
+    # Committed, so the worker threads' own connections can see it
+    with django_db_blocker.unblock():
+        user = User.objects.create_user(username="load", password="pass1234")
+        token = Token.objects.create(user=user)
+        yield token.key
+        user.delete()
+
+
+def urls(dataset):
+    student = dataset["students"][len(dataset["students"]) // 2]
+    card = dataset["cards"][len(dataset["cards"]) // 2]
+    return [
+        (
+            # inline like the async endpoint, concurrent clients would otherwise share one queued task
+            reverse("student-avg-overview", kwargs={"pk": student.pk}) + "?year=2024&inline=true",
+            reverse("async-student-avg-overview", kwargs={"pk": student.pk}) + "?year=2024",
+        ),
+        (
+            reverse("report-card-detail", kwargs={"pk": card.pk}),
+            reverse("async-report-card-detail", kwargs={"pk": card.pk}),
+        ),
+        (
+            reverse("mark-list") + f"?report_card={card.pk}",
+            reverse("async-mark-list") + f"?report_card={card.pk}",
+        ),
+    ]
+
+
+def run_wsgi(paths, token):
+    def client_session(_):
+        client = Client(headers={"Authorization": f"Token {token}"})
+        try:
+            for path in paths:
+                assert client.get(path).status_code == 200
+        finally:
+            connection.close()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=CONCURRENCY) as pool:
+        list(pool.map(client_session, range(CONCURRENCY)))
+    return time.perf_counter() - started
+
+
+def run_asgi(paths, token):
+    async def client_session():
+        client = AsyncClient()
+        for path in paths:
+            response = await client.get(path, headers={"Authorization": f"Token {token}"})
+            assert response.status_code == 200
+
+    async def main():
+        await asyncio.gather(*(client_session() for _ in range(CONCURRENCY)))
+
+    started = time.perf_counter()
+    asyncio.run(main())
+    return time.perf_counter() - started
+
+
+def test_wsgi_vs_asgi_throughput(dataset, token, throughput):
+    pairs = urls(dataset)
+    sync_paths = [sync_path for sync_path, _ in pairs] * ROUNDS
+    async_paths = [async_path for _, async_path in pairs] * ROUNDS
+    requests = CONCURRENCY * len(sync_paths)
+
+    throughput("wsgi_reads", requests, run_wsgi(sync_paths, token))
+    throughput("asgi_reads", requests, run_asgi(async_paths, token))
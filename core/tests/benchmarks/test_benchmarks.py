@@ -0,0 +1,93 @@
+import pytest
+from django.urls import reverse
+
+
+pytestmark = [pytest.mark.benchmark, pytest.mark.django_db]
+
+
+def get(client, url, status=200, **headers):
+    def request():
+        response = client.get(url, **headers)
+        assert response.status_code == status, response.content
+    return request
+
+
+def revalidate(client, url):
+    """
+    A conditional GET of ``url`` with the ETag of its current response.
+    """
+    etag = client.get(url)["ETag"]
+    return get(client, url, 304, HTTP_IF_NONE_MATCH=etag)
+
+
+def test_avg_overview_inline(benchmark, dataset, api_client):
+    student = dataset["students"][len(dataset["students"]) // 2]
+    url = reverse("student-avg-overview", kwargs={"pk": student.pk}) + "?year=2024&inline=true"
+    benchmark("avg_overview_inline", get(api_client, url))
+
+
+def test_avg_overview_cached(benchmark, dataset, api_client):
+    student = dataset["students"][len(dataset["students"]) // 2]
+    url = reverse("student-avg-overview", kwargs={"pk": student.pk}) + "?year=2024"
+    benchmark("avg_overview_cached", get(api_client, url))
+
+
+def test_report_card_list(benchmark, dataset, api_client):
+    url = reverse("report-card-list") + "?limit=50&offset=50"
+    benchmark("report_card_list", get(api_client, url))
+
+
+def test_report_card_list_cursor(benchmark, dataset, api_client):
+    url = reverse("report-card-list") + "?pagination=cursor&page_size=50"
+    benchmark("report_card_list_cursor", get(api_client, url))
+
+
+def test_report_card_list_sparse(benchmark, dataset, api_client):
+    url = reverse("report-card-list") + "?limit=50&offset=50&fields=id,student,term,year"
+    benchmark("report_card_list_sparse", get(api_client, url))
+
+
+def test_report_card_retrieve(benchmark, dataset, api_client):
+    card = dataset["cards"][len(dataset["cards"]) // 2]
+    url = reverse("report-card-detail", kwargs={"pk": card.pk})
+    benchmark("report_card_retrieve", get(api_client, url))
+
+
+def test_report_card_not_modified(benchmark, dataset, api_client):
+    card = dataset["cards"][len(dataset["cards"]) // 2]
+    url = reverse("report-card-detail", kwargs={"pk": card.pk})
+    benchmark("report_card_not_modified", revalidate(api_client, url))
+
+
+def test_avg_overview_not_modified(benchmark, dataset, api_client):
+    student = dataset["students"][len(dataset["students"]) // 2]
+    url = reverse("student-avg-overview", kwargs={"pk": student.pk}) + "?year=2024&inline=true"
+    benchmark("avg_overview_not_modified", revalidate(api_client, url))
+
+
+def test_mark_list_filtered(benchmark, dataset, api_client):
+    subject = dataset["subjects"][0]
+    url = reverse("mark-list") + f"?subject={subject.pk}&limit=100"
+    benchmark("mark_list_by_subject", get(api_client, url))
+
+
+def test_mark_list_by_report_card(benchmark, dataset, api_client):
+    card = dataset["cards"][len(dataset["cards"]) // 2]
+    url = reverse("mark-list") + f"?report_card={card.pk}"
+    benchmark("mark_list_by_report_card", get(api_client, url))
+
+
+def test_bulk_mark_upsert(benchmark, dataset, api_client):
+    cards = dataset["cards"][:50]
+    rows = [
+        {"report_card": card.pk, "subject": subject.pk, "score": "55.5"}
+        for card in cards
+        for subject in dataset["subjects"]
+    ]
+    url = reverse("mark-bulk") + "?upsert=true"
+
+    def request():
+        response = api_client.post(url, rows, format="json")
+        assert response.status_code == 201, response.content
+
+    benchmark("bulk_mark_upsert_400", request)
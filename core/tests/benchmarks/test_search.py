@@ -0,0 +1,57 @@
+"""
+Student search from the FTS5 index against the LIKE scan it replaces.
+
+The index lookups should stay roughly flat as the number of students
+grows, while the LIKE search grows with the table.
+"""
+from datetime import date
+
+import pytest
+from django.db import connection
+from django.test import override_settings
+from django.urls import reverse
+
+from core.models import Student
+
+from .conftest import SEARCH_SCALES, measure
+from .test_benchmarks import get
+
+
+pytestmark = [pytest.mark.benchmark, pytest.mark.django_db]
+
+FIRST_NAMES = ["Aarav", "Maria", "Chen", "Fatima", "Liam", "Sofia", "Kwame", "Yuki", "Omar", "Elena"]
+LAST_NAMES = ["Sharma", "Garcia", "Wang", "Khan", "Murphy", "Rossi", "Mensah", "Sato", "Haddad", "Novak"]
+
+
+@pytest.fixture(scope="module", params=SEARCH_SCALES, ids=lambda scale: f"{scale}students")
+def students(request, django_db_setup, django_db_blocker):
+    with django_db_blocker.unblock():
+        Student.objects.bulk_create(
+            [
+                Student(
+                    name=f"{FIRST_NAMES[i % 10]} {LAST_NAMES[i // 10 % 10]}",
+                    email=f"{FIRST_NAMES[i % 10].lower()}.{LAST_NAMES[i // 10 % 10].lower()}{i}@example.com",
+                    date_of_birth=date(2008, 1, 1),
+                )
+                for i in range(request.param)
+            ],
+            batch_size=1000,
+        )
+        yield request.param
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {Student._meta.db_table}")
+
+
+def search_url(students):
+    # One student's email, e.g. "fatima.mensah4963"
+    i = students // 2 + 3
+    return reverse("student-list") + f"?search={FIRST_NAMES[i % 10].lower()}.{LAST_NAMES[i // 10 % 10].lower()}{i}"
+
+
+def test_student_search(students, api_client):
+    measure(f"student_search@{students}students", get(api_client, search_url(students)))
+
+
+@override_settings(FULL_TEXT_SEARCH_ENABLED=False)
+def test_student_search_like(students, api_client):
+    measure(f"student_search_like@{students}students", get(api_client, search_url(students)))
@@ -0,0 +1,48 @@
+import pytest
+from django.conf import settings
+from django.core.cache import cache
+from django.test import override_settings
+
+from core.authentication import token_cache
+from core.cache import overview_cache
+from core.profiling import route_histogram
+from reportcard.celery import app as celery_app
+
+
+@pytest.fixture(autouse=True, scope="session")
+def celery_eager_mode():
+    """
+    Run Celery tasks inline and keep their results in an in-memory backend.
+    """
+    conf = celery_app.conf
+    # Touch the config first so the lazily loaded Django settings don't override ours
+    conf.broker_url
+    conf.update(
+        CELERY_TASK_ALWAYS_EAGER=True,
+        CELERY_TASK_STORE_EAGER_RESULT=True,
+        CELERY_RESULT_BACKEND="cache+memory://",
+    )
+    yield
+
+
+@pytest.fixture(autouse=True, scope="session")
+def local_cache():
+    """
+    Keep the cache in memory, so the tests run without a Redis server.
+    """
+    with override_settings(CACHES={
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "OPTIONS": {"MAX_ENTRIES": settings.CACHE_MAX_ENTRIES},
+        },
+    }):
+        yield
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    overview_cache.clear()
+    token_cache.clear()
+    route_histogram.clear()
+    yield
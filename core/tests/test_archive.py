@@ -0,0 +1,110 @@
+from decimal import Decimal
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.urls import reverse
+from rest_framework import status
+
+from core.archive import ArchiveError, archive_year, is_archived, restore_year
+from core.models import (
+    ArchivedMark, ArchivedReportCard, Mark, RankingCohort, ReportCard, Student, StudentYearOverview, Subject
+)
+from core.overview import student_overview
+from core.rankings import refresh_rankings
+from core.stats import cohort_stats
+
+from .test_viewsets import BaseViewSetTest
+
+
+class ArchiveTestMixin:
+    def setUp(self):
+        super().setUp()
+        self.student = Student.objects.create(name="Old", email="old@example.com", date_of_birth="2000-01-01")
+        self.math = Subject.objects.create(name="Math", code="MAT")
+        self.card = ReportCard.objects.create(student=self.student, term="Term1", year=2020)
+        self.mark = Mark.objects.create(report_card=self.card, subject=self.math, score=Decimal("75"))
+        self.current = ReportCard.objects.create(student=self.student, term="Term1", year=2024)
+        Mark.objects.create(report_card=self.current, subject=self.math, score=Decimal("90"))
+
+
+class ArchiveYearTest(ArchiveTestMixin, BaseViewSetTest):
+    def test_rows_move_with_their_ids(self):
+        overview = student_overview(self.student.pk, 2020)
+        stats = cohort_stats(2020)
+        refresh_rankings(2020, "term1")
+
+        archived = archive_year(2020)
+        self.assertEqual((archived.report_card_count, archived.mark_count), (1, 1))
+        self.assertTrue(is_archived(2020))
+        self.assertFalse(ReportCard.objects.filter(year=2020).exists())
+        self.assertEqual(ArchivedReportCard.objects.get(pk=self.card.pk).term, "Term1")
+        self.assertEqual(ArchivedMark.objects.get(pk=self.mark.pk).score, Decimal("75"))
+        self.assertFalse(RankingCohort.objects.filter(year=2020).exists())
+        # The totals are left as they are, so overviews and statistics read the same
+        self.assertTrue(StudentYearOverview.objects.filter(student=self.student, year=2020).exists())
+        self.assertEqual(student_overview(self.student.pk, 2020), overview)
+        self.assertEqual(cohort_stats(2020), stats)
+
+        with self.assertRaises(ArchiveError):
+            archive_year(2020)
+
+    def test_restore(self):
+        archive_year(2020)
+        self.assertEqual(restore_year(2020), 1)
+        self.assertFalse(is_archived(2020))
+        self.assertEqual(Mark.objects.get(pk=self.mark.pk).report_card_id, self.card.pk)
+        self.assertFalse(ArchivedReportCard.objects.exists())
+
+    def test_command_refuses_open_years(self):
+        with self.assertRaises(CommandError):
+            call_command("archive_year", "2999", stdout=StringIO())
+        out = StringIO()
+        call_command("archive_year", "2020", stdout=out)
+        self.assertIn("Archived 1 report cards and 1 marks of 2020", out.getvalue())
+
+
+class ArchiveRoutingTest(ArchiveTestMixin, BaseViewSetTest):
+    def setUp(self):
+        super().setUp()
+        archive_year(2020)
+
+    def test_report_card_list_routes_by_year(self):
+        response = self.client.get(reverse("report-card-list"))
+        self.assertEqual([card["id"] for card in response.data], [self.current.pk])
+
+        response = self.client.get(reverse("report-card-list") + "?year=2020")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 1)
+        card = response.data[0]
+        self.assertEqual((card["id"], card["year"]), (self.card.pk, 2020))
+        self.assertEqual(card["marks"][0]["score"], "75.00")
+        self.assertEqual(card["student_detail"]["name"], "Old")
+
+    def test_report_card_retrieve_falls_back_to_the_archive(self):
+        url = reverse("report-card-detail", kwargs={"pk": self.card.pk})
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["marks"][0]["grade"], "C")
+        missing = reverse("report-card-detail", kwargs={"pk": 999999})
+        self.assertEqual(self.client.get(missing).status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_mark_list_routes_by_year(self):
+        response = self.client.get(reverse("mark-list") + f"?year=2020&report_card={self.card.pk}")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([mark["id"] for mark in response.data], [self.mark.pk])
+        response = self.client.get(reverse("mark-list") + "?year=2024")
+        self.assertEqual([mark["score"] for mark in response.data], ["90.00"])
+
+    def test_avg_overview_of_an_archived_year(self):
+        url = reverse("student-avg-overview", kwargs={"pk": self.student.pk}) + "?year=2020&inline=true"
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([card["id"] for card in response.data["report_cards"]], [self.card.pk])
+        self.assertEqual(response.data["overall_average"], Decimal("75"))
+
+    def test_archived_years_are_closed_for_writes(self):
+        response = self.client.post(
+            reverse("report-card-list"), {"student": self.student.pk, "term": "Term2", "year": 2020}
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("year", response.data)
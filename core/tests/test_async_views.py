@@ -0,0 +1,132 @@
+import json
+from decimal import Decimal
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.db.models import QuerySet
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.archive import archive_year
+from core.cache import overview_cache
+from core.models import Student, Subject, ReportCard, Mark
+from core.pagination import LimitOffsetPagination
+
+
+class AsyncViewTest(TestCase):
+    """
+    The async endpoints must answer exactly like their DRF counterparts.
+    """
+
+    def setUp(self):
+        user = User.objects.create_user(username="teacher", password="pass1234")
+        self.auth = {"headers": {"Authorization": f"Token {Token.objects.create(user=user).key}"}}
+        self.api = APIClient()
+        self.api.credentials(HTTP_AUTHORIZATION=self.auth["headers"]["Authorization"])
+        self.student = Student.objects.create(name="Omar", email="omar@example.com", date_of_birth="2004-05-06")
+        self.math = Subject.objects.create(name="Math", code="MAT")
+        self.art = Subject.objects.create(name="Art", code="ART")
+        self.card = ReportCard.objects.create(student=self.student, term="Term1", year=2024)
+        Mark.objects.create(report_card=self.card, subject=self.math, score=Decimal("91.5"))
+        Mark.objects.create(report_card=self.card, subject=self.art, score=Decimal("64"))
+        other = ReportCard.objects.create(student=self.student, term="Term2", year=2024)
+        Mark.objects.create(report_card=other, subject=self.math, score=Decimal("70"))
+
+    def assertSameJSON(self, response, expected):
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content), json.loads(expected.content))
+
+    def assertSamePage(self, response, expected):
+        # The same page but for the next and previous links, which point to each endpoint
+        self.assertEqual(response.status_code, 200)
+        page, expected = json.loads(response.content), json.loads(expected.content)
+        self.assertEqual((page["count"], page["results"]), (expected["count"], expected["results"]))
+
+    async def test_report_card_detail(self):
+        response = await self.async_client.get(
+            reverse("async-report-card-detail", kwargs={"pk": self.card.pk}), **self.auth
+        )
+        expected = await self.sync(self.api.get, reverse("report-card-detail", kwargs={"pk": self.card.pk}))
+        self.assertSameJSON(response, expected)
+
+    async def test_report_card_not_found(self):
+        response = await self.async_client.get(reverse("async-report-card-detail", kwargs={"pk": 999}), **self.auth)
+        self.assertEqual(response.status_code, 404)
+
+    async def test_archived_report_card(self):
+        await self.sync(archive_year, 2024)
+        url = reverse("async-report-card-detail", kwargs={"pk": self.card.pk})
+        response = await self.async_client.get(url, **self.auth)
+        expected = await self.sync(self.api.get, reverse("report-card-detail", kwargs={"pk": self.card.pk}))
+        self.assertSameJSON(response, expected)
+
+    async def test_mark_list(self):
+        query = f"?subject={self.math.pk}&limit=1&offset=1"
+        response = await self.async_client.get(reverse("async-mark-list") + query, **self.auth)
+        expected = await self.sync(self.api.get, reverse("mark-list") + query)
+        self.assertSamePage(response, expected)
+        self.assertEqual(json.loads(response.content)["count"], 2)
+
+    @override_settings(ASYNC_PAGE_SIZE=2)
+    async def test_mark_list_default_page_size(self):
+        response = await self.async_client.get(reverse("async-mark-list") + "?count=false", **self.auth)
+        page = json.loads(response.content)
+        self.assertEqual(len(page["results"]), 2)
+        self.assertIn("offset=2", page["next"])
+        self.assertNotIn("count", page)
+
+    async def test_mark_list_uses_the_async_orm(self):
+        # Only the filters are validated in a thread, the count and the page are async queries
+        with (
+            mock.patch.object(QuerySet, "acount", autospec=True, side_effect=QuerySet.acount) as acount,
+            mock.patch.object(LimitOffsetPagination, "paginate_queryset") as paginate_queryset,
+        ):
+            response = await self.async_client.get(reverse("async-mark-list") + "?limit=1", **self.auth)
+        self.assertEqual(len(json.loads(response.content)["results"]), 1)
+        acount.assert_awaited_once()
+        paginate_queryset.assert_not_called()
+
+    async def test_mark_list_filters(self):
+        response = await self.async_client.get(reverse("async-mark-list") + "?subject=999", **self.auth)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("subject", json.loads(response.content))
+
+        await self.sync(archive_year, 2024)
+        query = f"?year=2024&report_card={self.card.pk}&limit=10"
+        response = await self.async_client.get(reverse("async-mark-list") + query, **self.auth)
+        expected = await self.sync(self.api.get, reverse("mark-list") + query)
+        self.assertSamePage(response, expected)
+        self.assertEqual(json.loads(response.content)["count"], 2)
+
+    async def test_avg_overview_matches_task(self):
+        url = reverse("async-student-avg-overview", kwargs={"pk": self.student.pk}) + "?year=2024"
+        response = await self.async_client.get(url, **self.auth)
+        self.assertEqual(response.status_code, 200)
+        expected = await self.sync(
+            self.api.get,
+            reverse("student-avg-overview", kwargs={"pk": self.student.pk}) + "?year=2024&inline=true",
+        )
+        self.assertSameJSON(response, expected)
+
+        # The second request is answered from the overview cache
+        hits = overview_cache.hits
+        self.assertSameJSON(await self.async_client.get(url, **self.auth), expected)
+        self.assertEqual(overview_cache.hits, hits + 1)
+
+    async def test_avg_overview_validates_year(self):
+        url = reverse("async-student-avg-overview", kwargs={"pk": self.student.pk})
+        self.assertEqual((await self.async_client.get(url, **self.auth)).status_code, 400)
+        self.assertEqual((await self.async_client.get(url + "?year=x", **self.auth)).status_code, 400)
+
+    async def test_requires_token(self):
+        response = await self.async_client.get(reverse("async-mark-list"))
+        self.assertEqual(response.status_code, 401)
+        response = await self.async_client.get(reverse("async-mark-list"), headers={"Authorization": "Token nope"})
+        self.assertEqual(response.status_code, 401)
+
+    @staticmethod
+    async def sync(func, *args):
+        return await sync_to_async(func)(*args)
@@ -0,0 +1,98 @@
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.authentication import TokenCache, lookup_token, token_cache
+
+
+class TokenCacheTest(TestCase):
+    def setUp(self):
+        self.users = [User.objects.create_user(username=f"user{i}", password="pass1234") for i in range(3)]
+        self.tokens = [Token.objects.create(user=user) for user in self.users]
+
+    # The process memory alone, without the shared backend behind it
+    @override_settings(TOKEN_CACHE_ALIAS=None)
+    def test_expired_tokens_are_misses(self):
+        cache = TokenCache(timeout=60)
+        cache.set(self.tokens[0])
+        self.assertEqual(cache.get(self.tokens[0].key), self.tokens[0])
+        with mock.patch("core.authentication.time.monotonic", return_value=10 ** 9):
+            self.assertIsNone(cache.get(self.tokens[0].key))
+        self.assertEqual(cache.stats()["hit_rate"], 0.5)
+
+    @override_settings(TOKEN_CACHE_ALIAS=None)
+    def test_size_is_bounded(self):
+        cache = TokenCache(timeout=60, max_entries=2)
+        for token in self.tokens:
+            cache.set(token)
+        self.assertIsNone(cache.get(self.tokens[0].key))
+        self.assertEqual(cache.get(self.tokens[2].key), self.tokens[2])
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+    def test_shared_backend(self):
+        first = TokenCache(alias="default", timeout=60)
+        second = TokenCache(alias="default", timeout=60)
+        first.set(self.tokens[0])
+        self.assertEqual(second.get(self.tokens[0].key).user_id, self.users[0].pk)
+        first._tokens.clear()
+        self.assertEqual(first.get(self.tokens[0].key), self.tokens[0])
+
+    def test_revocations_reach_every_process(self):
+        # Both hold the token in their own memory
+        first = TokenCache(alias="default", timeout=60)
+        second = TokenCache(alias="default", timeout=60)
+        for cache in (first, second):
+            cache.set(self.tokens[0])
+            cache.set(self.tokens[1])
+        second.invalidate_user(self.users[0].pk)
+        self.assertIsNone(first.get(self.tokens[0].key))
+        self.assertEqual(first.get(self.tokens[1].key), self.tokens[1])
+        second.invalidate(self.tokens[1].key)
+        self.assertIsNone(first.get(self.tokens[1].key))
+
+    @override_settings(TOKEN_CACHE_ALIAS=None)
+    def test_short_timeout_without_shared_backend(self):
+        self.assertEqual(TokenCache(timeout=60).timeout, settings.TOKEN_CACHE_LOCAL_TIMEOUT)
+        self.assertEqual(TokenCache(alias="default", timeout=60).timeout, 60)
+
+    def test_unknown_tokens_are_not_cached(self):
+        with self.assertRaises(Token.DoesNotExist):
+            lookup_token("missing")
+        self.assertEqual(token_cache.stats()["size"], 0)
+
+
+class CachingTokenAuthenticationTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="teacher", password="pass1234")
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+        self.url = reverse("subject-list")
+
+    def test_validated_token_skips_the_lookup(self):
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_200_OK)
+        # only the subject list itself
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get(self.url).status_code, status.HTTP_200_OK)
+        self.assertEqual(token_cache.stats()["hits"], 1)
+
+    def test_invalid_token(self):
+        self.client.credentials(HTTP_AUTHORIZATION="Token nope")
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deleted_token_is_refused(self):
+        self.client.get(self.url)
+        self.token.delete()
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deactivated_user_is_refused(self):
+        self.client.get(self.url)
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_401_UNAUTHORIZED)
@@ -0,0 +1,69 @@
+from decimal import Decimal
+
+from django.test import TestCase
+
+from core.cache import OverviewCache, overview_cache
+from core.models import Student, Subject, ReportCard, Mark
+from core.tasks import calculate_student_overview
+
+
+class OverviewCacheTest(TestCase):
+    def setUp(self):
+        self.cache = OverviewCache(timeout=60, max_entries=2)
+
+    def test_hit_and_miss_counters(self):
+        self.assertIsNone(self.cache.get(1, 2024))
+        self.cache.set(1, 2024, {"overall_average": 80})
+        self.assertEqual(self.cache.get(1, 2024), {"overall_average": 80})
+        stats = self.cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 1))
+        self.assertEqual(stats["hit_rate"], 0.5)
+
+    def test_invalidate_skips_every_year_of_a_student(self):
+        self.cache.set(1, 2023, {"overall_average": 70})
+        self.cache.set(2, 2024, {"overall_average": 90})
+        self.cache.invalidate(1)
+        self.assertIsNone(self.cache.get(1, 2023))
+        self.assertEqual(self.cache.get(2, 2024), {"overall_average": 90})
+
+    def test_least_recently_used_entry_is_evicted(self):
+        self.cache.set(1, 2024, {"overall_average": 1})
+        self.cache.set(2, 2024, {"overall_average": 2})
+        self.cache.get(1, 2024)
+        self.cache.set(3, 2024, {"overall_average": 3})
+        self.assertIsNone(self.cache.get(2, 2024))
+        self.assertIsNotNone(self.cache.get(1, 2024))
+        self.assertEqual(self.cache.stats()["evictions"], 1)
+        self.assertEqual(self.cache.stats()["size"], 2)
+
+    def test_lost_generation_does_not_revive_old_entries(self):
+        self.cache.set(1, 2024, {"overall_average": 1})
+        self.cache.backend.delete(self.cache._generation_key(1))
+        self.assertIsNone(self.cache.get(1, 2024))
+
+    def test_overview_stored_under_generation_read_before_computing(self):
+        generation = self.cache.generation(1)
+        self.cache.invalidate(1)
+        self.cache.set(1, 2024, {"overall_average": 1}, generation)
+        self.assertIsNone(self.cache.get(1, 2024))
+
+
+class OverviewCacheInvalidationTest(TestCase):
+    def setUp(self):
+        self.student = Student.objects.create(name="Ivan", email="ivan@example.com", date_of_birth="2002-02-02")
+        self.subject = Subject.objects.create(name="Math", code="MAT")
+        self.report_card = ReportCard.objects.create(student=self.student, term="Term1", year=2024)
+        calculate_student_overview(self.student.pk, 2024)
+
+    def test_mark_write_invalidates_overview(self):
+        self.assertIsNotNone(overview_cache.get(self.student.pk, 2024))
+        mark = Mark.objects.create(report_card=self.report_card, subject=self.subject, score=Decimal("80"))
+        self.assertIsNone(overview_cache.get(self.student.pk, 2024))
+
+        calculate_student_overview(self.student.pk, 2024)
+        mark.delete()
+        self.assertIsNone(overview_cache.get(self.student.pk, 2024))
+
+    def test_report_card_write_invalidates_overview(self):
+        ReportCard.objects.create(student=self.student, term="Term2", year=2024)
+        self.assertIsNone(overview_cache.get(self.student.pk, 2024))
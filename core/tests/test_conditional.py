@@ -0,0 +1,151 @@
+from decimal import Decimal
+from unittest import mock
+
+from celery.result import AsyncResult
+from django.urls import reverse
+from rest_framework import status
+
+from core.archive import archive_year
+from core.models import GradeBand, Mark, ReportCard, Student, Subject
+from core.tasks import calculate_student_overview
+
+from .test_viewsets import BaseViewSetTest
+
+
+class ConditionalTestMixin:
+    def setUp(self):
+        super().setUp()
+        self.student = Student.objects.create(name="Asha", email="asha@example.com", date_of_birth="2005-01-01")
+        self.math = Subject.objects.create(name="Math", code="MAT")
+        self.card = ReportCard.objects.create(student=self.student, term="Term1", year=2024)
+        self.mark = Mark.objects.create(report_card=self.card, subject=self.math, score=Decimal("80"))
+
+    def revalidate(self, url, response, **headers):
+        headers = headers or {"HTTP_IF_NONE_MATCH": response["ETag"]}
+        return self.client.get(url, **headers)
+
+
+class ReportCardConditionalGetTest(ConditionalTestMixin, BaseViewSetTest):
+    def setUp(self):
+        super().setUp()
+        self.url = reverse("report-card-detail", kwargs={"pk": self.card.pk})
+
+    def test_not_modified_after_one_query(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn("Last-Modified", response)
+        with self.assertNumQueries(1):
+            not_modified = self.revalidate(self.url, response)
+        self.assertEqual(not_modified.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(not_modified["ETag"], response["ETag"])
+
+    def test_if_modified_since(self):
+        response = self.client.get(self.url)
+        not_modified = self.revalidate(self.url, response, HTTP_IF_MODIFIED_SINCE=response["Last-Modified"])
+        self.assertEqual(not_modified.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_mark_changes_change_the_etag(self):
+        response = self.client.get(self.url)
+        self.mark.score = Decimal("85")
+        self.mark.save()
+        self.assertEqual(self.revalidate(self.url, response).status_code, status.HTTP_200_OK)
+
+        response = self.client.get(self.url)
+        self.mark.delete()
+        self.assertEqual(self.revalidate(self.url, response).status_code, status.HTTP_200_OK)
+
+    def test_bulk_marks_change_the_etag(self):
+        response = self.client.get(self.url)
+        science = Subject.objects.create(name="Science", code="SCI")
+        self.client.post(
+            reverse("mark-bulk"), [{"report_card": self.card.pk, "subject": science.pk, "score": "70"}], format="json"
+        )
+        self.assertEqual(self.revalidate(self.url, response).status_code, status.HTTP_200_OK)
+
+    def test_student_and_subject_changes_change_the_etag(self):
+        response = self.client.get(self.url)
+        self.student.name = "Asha K"
+        self.student.save()
+        response = self.revalidate(self.url, response)
+        self.assertEqual(response.data["student_detail"]["name"], "Asha K")
+
+        self.math.name = "Mathematics"
+        self.math.save()
+        response = self.revalidate(self.url, response)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["marks"][0]["subject"]["name"], "Mathematics")
+
+    def test_grading_changes_change_the_etag(self):
+        response = self.client.get(self.url)
+        band = GradeBand.objects.filter(scale__is_default=True).order_by("-min_score").first()
+        band.min_score = Decimal("79")
+        band.save()
+        self.assertEqual(self.revalidate(self.url, response).status_code, status.HTTP_200_OK)
+
+    def test_rankings_and_archived_cards_are_not_conditional(self):
+        response = self.client.get(self.url + "?rankings=true")
+        self.assertNotIn("ETag", response)
+
+        archive_year(2024)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn("ETag", response)
+
+    def test_missing_card(self):
+        response = self.client.get(
+            reverse("report-card-detail", kwargs={"pk": 9999}), HTTP_IF_NONE_MATCH='"stale"'
+        )
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class OverviewConditionalGetTest(ConditionalTestMixin, BaseViewSetTest):
+    def setUp(self):
+        super().setUp()
+        self.url = reverse("student-avg-overview", kwargs={"pk": self.student.pk}) + "?year=2024"
+
+    def test_not_modified_after_one_query(self):
+        response = self.client.get(self.url + "&inline=true")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        with self.assertNumQueries(1):
+            not_modified = self.revalidate(self.url, response)
+        self.assertEqual(not_modified.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_cached_overview_has_the_same_etag(self):
+        response = self.client.get(self.url + "&inline=true")
+        cached = self.client.get(self.url)
+        self.assertEqual(cached.status_code, status.HTTP_200_OK)
+        self.assertEqual(cached["ETag"], response["ETag"])
+
+    def test_queued_overview_has_no_etag(self):
+        pending = AsyncResult("overview-task", app=calculate_student_overview.app)
+        with mock.patch.object(calculate_student_overview, "apply_async", return_value=pending):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertNotIn("ETag", response)
+
+    def test_writes_change_the_etag(self):
+        response = self.client.get(self.url + "&inline=true")
+        Mark.objects.create(
+            report_card=self.card, subject=Subject.objects.create(name="Art", code="ART"), score=Decimal("60")
+        )
+        self.assertEqual(self.revalidate(self.url + "&inline=true", response).status_code, status.HTTP_200_OK)
+
+        response = self.client.get(self.url + "&inline=true")
+        self.student.name = "Asha K"
+        self.student.save()
+        response = self.revalidate(self.url + "&inline=true", response)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["report_cards"][0]["student_detail"]["name"], "Asha K")
+
+    def test_card_deletion_and_archival_change_the_etag(self):
+        other = ReportCard.objects.create(student=self.student, term="Term2", year=2024)
+        response = self.client.get(self.url + "&inline=true")
+        other.delete()
+        self.assertEqual(self.revalidate(self.url + "&inline=true", response).status_code, status.HTTP_200_OK)
+
+        response = self.client.get(self.url + "&inline=true")
+        archive_year(2024)
+        response = self.revalidate(self.url + "&inline=true", response)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        not_modified = self.revalidate(self.url + "&inline=true", response)
+        self.assertEqual(not_modified.status_code, status.HTTP_304_NOT_MODIFIED)
@@ -0,0 +1,131 @@
+import os
+import sqlite3
+import tempfile
+
+from django.contrib.auth.models import User
+from django.db import connection, connections
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.authentication import lookup_token
+from core.db import ReplicaRouter, RoutingState, routing_state
+from core.grading import default_grader
+from core.models import ReportCard, Student
+
+REPLICA = "replica_test"
+
+
+class SQLitePragmaTest(TestCase):
+    def test_pragmas_applied_on_connect(self):
+        with connection.cursor() as cursor:
+            cursor.execute("PRAGMA busy_timeout")
+            self.assertEqual(cursor.fetchone()[0], 5000)
+            cursor.execute("PRAGMA synchronous")
+            # NORMAL
+            self.assertEqual(cursor.fetchone()[0], 1)
+
+
+@override_settings(DATABASE_REPLICAS=[REPLICA])
+class ReplicaRouterTest(TestCase):
+    def setUp(self):
+        self.router = ReplicaRouter()
+        self.token = routing_state.set(RoutingState(REPLICA))
+        self.addCleanup(routing_state.reset, self.token)
+
+    def test_reads_go_to_the_replica_until_a_write(self):
+        self.assertEqual(self.router.db_for_read(Student), REPLICA)
+        self.assertEqual(self.router.db_for_write(Student), "default")
+        self.assertIsNone(self.router.db_for_read(Student))
+
+    def test_primary_outside_requests(self):
+        routing_state.set(None)
+        self.assertIsNone(self.router.db_for_read(Student))
+
+    def test_replicas_are_not_migrated(self):
+        self.assertFalse(self.router.allow_migrate(REPLICA, "core"))
+        self.assertIsNone(self.router.allow_migrate("default", "core"))
+
+
+class ReplicaReadsTest(TestCase):
+    """
+    Reads against a second SQLite file holding a snapshot of the primary.
+    """
+    databases = {"default", REPLICA}
+
+    @classmethod
+    def setUpClass(cls):
+        handle, cls.replica_path = tempfile.mkstemp(suffix=".sqlite3")
+        os.close(handle)
+        # The replica starts as a copy of the primary's schema
+        connection.ensure_connection()
+        replica = sqlite3.connect(cls.replica_path)
+        try:
+            connection.connection.backup(replica)
+        finally:
+            replica.close()
+        connections.settings[REPLICA] = connections.configure_settings({
+            "default": connections.settings["default"],
+            REPLICA: {"ENGINE": "django.db.backends.sqlite3", "NAME": cls.replica_path},
+        })[REPLICA]
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections[REPLICA].close()
+        del connections[REPLICA]
+        del connections.settings[REPLICA]
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(cls.replica_path + suffix):
+                os.remove(cls.replica_path + suffix)
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="teacher", password="pass1234")
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+        default_grader()
+        lookup_token(self.token.key)
+        # One student has reached the replica, the other one not yet
+        self.student = Student.objects.create(name="Synced", email="synced@example.com", date_of_birth="2005-01-01")
+        Student.objects.using(REPLICA).create(
+            pk=self.student.pk, name="Synced", email="synced@example.com", date_of_birth="2005-01-01"
+        )
+        Student.objects.create(name="Lagging", email="lagging@example.com", date_of_birth="2005-01-01")
+
+    def names(self):
+        return {row["name"] for row in self.client.get(reverse("student-list")).data}
+
+    def test_reads_without_replicas_use_the_primary(self):
+        self.assertEqual(self.names(), {"Synced", "Lagging"})
+
+    @override_settings(DATABASE_REPLICAS=[REPLICA])
+    def test_list_and_retrieve_read_from_the_replica(self):
+        self.assertEqual(self.names(), {"Synced"})
+        response = self.client.get(reverse("student-detail", kwargs={"pk": self.student.pk}))
+        self.assertEqual(response.data["name"], "Synced")
+
+    @override_settings(DATABASE_REPLICAS=[REPLICA])
+    def test_writer_reads_its_own_writes(self):
+        response = self.client.post(
+            reverse("student-list"),
+            {"name": "Fresh", "email": "fresh@example.com", "date_of_birth": "2005-01-01"},
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.names(), {"Synced", "Lagging", "Fresh"})
+
+        other = User.objects.create_user(username="other", password="pass1234")
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {Token.objects.create(user=other).key}")
+        self.assertEqual(self.names(), {"Synced"})
+
+    @override_settings(DATABASE_REPLICAS=[REPLICA])
+    def test_async_reads_from_the_replica(self):
+        card = ReportCard.objects.create(student=self.student, term="Term1", year=2024)
+        url = reverse("async-report-card-detail", kwargs={"pk": card.pk})
+        # not replicated yet
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_404_NOT_FOUND)
+        with self.settings(DATABASE_REPLICAS=[]):
+            self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK)
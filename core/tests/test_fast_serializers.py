@@ -0,0 +1,59 @@
+from decimal import Decimal
+
+from django.test import TestCase
+from rest_framework.renderers import JSONRenderer
+
+from core.fast_serializers import FastMarkSerializer, FastReportCardSerializer
+from core.grading import default_grader
+from core.models import Student, Subject, ReportCard, Mark
+from core.serializers import MarkSerializer, ReportCardSerializer
+
+
+class FastSerializerParityTest(TestCase):
+    """
+    The fast read path must render exactly the same JSON as the DRF serializers.
+    """
+
+    def setUp(self):
+        self.students = [
+            Student.objects.create(name="Lena", email="lena@example.com", date_of_birth="2003-01-09"),
+            Student.objects.create(name="Zoë \"Z\" O'Neil", email="zoe@example.com", date_of_birth="2004-12-31"),
+        ]
+        subjects = [
+            Subject.objects.create(name="Math", code="MAT"),
+            Subject.objects.create(name="Ünicode Studies", code="UNI"),
+        ]
+        scores = [Decimal("0"), Decimal("99.99"), Decimal("85.5"), Decimal("100")]
+        for student in self.students:
+            for term in ["Term1", "Term2"]:
+                card = ReportCard.objects.create(student=student, term=term, year=2024)
+                for subject, score in zip(subjects, scores):
+                    Mark.objects.create(report_card=card, subject=subject, score=score)
+                    scores.append(scores.pop(0))
+        ReportCard.objects.create(student=self.students[0], term="Empty", year=2025)
+
+    def render(self, data):
+        return JSONRenderer().render(data)
+
+    def test_report_card_parity(self):
+        queryset = ReportCard.objects.select_related("student").prefetch_related("marks__subject").order_by("id")
+        expected = self.render(ReportCardSerializer(queryset, many=True).data)
+        serializer = FastReportCardSerializer()
+        self.assertEqual(self.render(serializer.to_representation(serializer.rows(queryset))), expected)
+
+    def test_mark_parity(self):
+        queryset = Mark.objects.select_related("subject", "report_card").order_by("id")
+        expected = self.render(MarkSerializer(queryset, many=True).data)
+        serializer = FastMarkSerializer()
+        self.assertEqual(self.render(serializer.to_representation(serializer.rows(queryset))), expected)
+
+    def test_report_card_uses_two_queries(self):
+        serializer = FastReportCardSerializer()
+        default_grader()
+        with self.assertNumQueries(2):
+            serializer.to_representation(serializer.rows(ReportCard.objects.all()))
+
+    def test_empty_page(self):
+        serializer = FastReportCardSerializer()
+        with self.assertNumQueries(1):
+            self.assertEqual(serializer.to_representation(serializer.rows(ReportCard.objects.filter(year=1900))), [])
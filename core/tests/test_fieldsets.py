@@ -0,0 +1,126 @@
+from decimal import Decimal
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+
+from core.archive import archive_year
+from core.models import Mark, ReportCard, Student, Subject
+
+from .test_viewsets import BaseViewSetTest
+
+
+class FieldsetTestMixin:
+    def setUp(self):
+        super().setUp()
+        self.student = Student.objects.create(name="Asha", email="asha@example.com", date_of_birth="2005-01-01")
+        self.math = Subject.objects.create(name="Math", code="MAT")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.card = ReportCard.objects.create(student=self.student, term="Term1", year=2024)
+            self.mark = Mark.objects.create(report_card=self.card, subject=self.math, score=Decimal("92"))
+
+    def get(self, url, **params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.content)
+        return response, [query["sql"] for query in queries.captured_queries]
+
+
+class ReportCardFieldsetTest(FieldsetTestMixin, BaseViewSetTest):
+    def setUp(self):
+        super().setUp()
+        self.list_url = reverse("report-card-list")
+        self.detail_url = reverse("report-card-detail", kwargs={"pk": self.card.pk})
+
+    def test_full_response_without_parameters(self):
+        response, _ = self.get(self.list_url)
+        self.assertEqual(list(response.data[0]), ["id", "student", "term", "year", "marks", "student_detail"])
+
+    def test_list_fields(self):
+        response, queries = self.get(self.list_url, fields="id,term")
+        self.assertEqual(response.data, [{"id": self.card.pk, "term": "Term1"}])
+        # Neither the student join nor the marks query
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn("core_student", queries[0])
+
+    def test_list_expand(self):
+        response, queries = self.get(self.list_url, expand="marks")
+        self.assertEqual(list(response.data[0]), ["id", "student", "term", "year", "marks"])
+        self.assertEqual(response.data[0]["marks"][0]["grade"], "A")
+        self.assertEqual(len(queries), 2)
+        self.assertNotIn("core_student", queries[0])
+
+        response, _ = self.get(self.list_url, fields="id,student_detail")
+        self.assertEqual(response.data[0]["student_detail"]["name"], "Asha")
+        self.assertEqual(list(response.data[0]), ["id", "student_detail"])
+
+    def test_retrieve_fields(self):
+        response, queries = self.get(self.detail_url, fields="id,year")
+        self.assertEqual(response.data, {"id": self.card.pk, "year": 2024})
+        # The ETag lookup and the card, without the student, marks or their subjects
+        self.assertEqual(len(queries), 2)
+        self.assertNotIn("core_student", queries[1])
+        self.assertNotIn("term", queries[1])
+
+        response, queries = self.get(self.detail_url, expand="student_detail")
+        self.assertEqual(list(response.data), ["id", "student", "term", "year", "student_detail"])
+        self.assertEqual(len(queries), 2)
+
+    def test_etag_depends_on_fieldset(self):
+        full, _ = self.get(self.detail_url)
+        sparse, _ = self.get(self.detail_url, fields="id")
+        self.assertNotEqual(full["ETag"], sparse["ETag"])
+        response = self.client.get(self.detail_url, {"fields": "id"}, HTTP_IF_NONE_MATCH=sparse["ETag"])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_rankings_are_kept(self):
+        response, _ = self.get(self.detail_url, fields="id", rankings="true")
+        self.assertEqual(list(response.data), ["id", "rankings"])
+        self.assertEqual(response.data["rankings"]["overall"]["rank"], 1)
+
+    def test_archived_year(self):
+        archive_year(2024)
+        response, _ = self.get(self.list_url, year=2024, fields="id,term")
+        self.assertEqual(response.data, [{"id": self.card.pk, "term": "Term1"}])
+        response, _ = self.get(self.detail_url, expand="marks")
+        self.assertEqual(list(response.data), ["id", "student", "term", "year", "marks"])
+
+    def test_invalid_fields(self):
+        response = self.client.get(self.list_url, {"fields": "id,nope", "expand": "term"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("nope", response.data["fields"][0])
+        self.assertIn("term", response.data["expand"][0])
+
+
+class MarkFieldsetTest(FieldsetTestMixin, BaseViewSetTest):
+    def test_list_fields(self):
+        response, queries = self.get(reverse("mark-list"), fields="id,grade")
+        self.assertEqual(response.data, [{"id": self.mark.pk, "grade": "A"}])
+        self.assertNotIn("core_subject", queries[0])
+
+    def test_retrieve_expand(self):
+        url = reverse("mark-detail", kwargs={"pk": self.mark.pk})
+        response, queries = self.get(url, fields="score")
+        self.assertEqual(response.data, {"score": "92.00"})
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn("core_subject", queries[0])
+        self.assertNotIn("core_reportcard", queries[0])
+
+        response, _ = self.get(url, expand="subject")
+        self.assertEqual(list(response.data), ["id", "score", "subject", "grade", "grade_point"])
+        self.assertEqual(response.data["subject"]["code"], "MAT")
+
+
+class StudentFieldsetTest(FieldsetTestMixin, BaseViewSetTest):
+    def test_fields(self):
+        response, queries = self.get(reverse("student-list"), fields="id,name")
+        self.assertEqual(response.data, [{"id": self.student.pk, "name": "Asha"}])
+        self.assertNotIn("email", queries[0])
+
+        response, _ = self.get(reverse("student-detail", kwargs={"pk": self.student.pk}), fields="email")
+        self.assertEqual(response.data, {"email": "asha@example.com"})
+
+    def test_nothing_to_expand(self):
+        response = self.client.get(reverse("student-list"), {"expand": "name"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
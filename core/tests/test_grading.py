@@ -0,0 +1,84 @@
+import time
+from decimal import Decimal
+from unittest import mock
+
+from django.conf import settings
+from django.test import TestCase
+
+from core.grading import Grader, default_grader
+from core.models import Student, Subject, ReportCard, Mark, GradingScale, GradeBand
+from core.serializers import MarkSerializer
+from core.tasks import calculate_student_overview
+
+
+BANDS = [
+    (Decimal("90"), "A", Decimal("4.0")),
+    (Decimal("80"), "B", Decimal("3.0")),
+    (Decimal("50"), "C", Decimal("2.0")),
+    (Decimal("40"), "D", Decimal("1.0")),
+]
+
+
+class GraderTest(TestCase):
+    scores = [Decimal("100"), Decimal("90"), Decimal("89.99"), Decimal("50"), Decimal("40"), Decimal("39.99"), None]
+    expected = [
+        ("A", Decimal("4.0")),
+        ("A", Decimal("4.0")),
+        ("B", Decimal("3.0")),
+        ("C", Decimal("2.0")),
+        ("D", Decimal("1.0")),
+        None,
+        None,
+    ]
+
+    def test_grade_many(self):
+        self.assertEqual(Grader(BANDS).grade_many(self.scores), self.expected)
+
+    def test_scale_without_bands(self):
+        self.assertEqual(Grader([]).grade_many([Decimal("50")]), [None])
+
+    def test_default_scale(self):
+        self.assertEqual(default_grader().grade(Decimal("85")), ("B", Decimal("3.00")))
+
+    def test_default_scale_is_cached_until_changed(self):
+        default_grader()
+        with self.assertNumQueries(0):
+            default_grader()
+        scale = GradingScale.objects.get(is_default=True)
+        GradeBand.objects.create(scale=scale, min_score=Decimal("85"), letter="B+", grade_point=Decimal("3.5"))
+        self.assertEqual(default_grader().grade(Decimal("87"))[0], "B+")
+
+
+    def test_default_scale_expires(self):
+        default_grader()
+        # A bulk update skips the signals that drop the cached bands
+        GradeBand.objects.filter(letter="B").update(letter="B+")
+        self.assertEqual(default_grader().grade(Decimal("85"))[0], "B")
+        later = time.time() + settings.GRADING_CACHE_TIMEOUT + 1
+        with mock.patch("django.core.cache.backends.locmem.time.time", return_value=later):
+            self.assertEqual(default_grader().grade(Decimal("85"))[0], "B+")
+
+
+class GradedOutputTest(TestCase):
+    def setUp(self):
+        self.student = Student.objects.create(name="Ivy", email="ivy@example.com", date_of_birth="2004-04-04")
+        self.card = ReportCard.objects.create(student=self.student, term="Term1", year=2024)
+        self.math = Subject.objects.create(name="Math", code="MAT")
+        self.art = Subject.objects.create(name="Art", code="ART")
+        Mark.objects.create(report_card=self.card, subject=self.math, score=Decimal("95"))
+        Mark.objects.create(report_card=self.card, subject=self.art, score=Decimal("55"))
+
+    def test_mark_serializer_grades(self):
+        data = MarkSerializer(Mark.objects.order_by("id"), many=True).data
+        self.assertEqual([(mark["grade"], mark["grade_point"]) for mark in data], [("A", "4.00"), ("F", "0.00")])
+        single = MarkSerializer(Mark.objects.get(subject=self.math)).data
+        self.assertEqual(single["grade"], "A")
+
+    def test_overview_grades(self):
+        overview = calculate_student_overview(self.student.id, 2024)
+        self.assertEqual(
+            [(row["subject_name"], row["grade"]) for row in overview["subject_averages"]],
+            [("Art", "F"), ("Math", "A")],
+        )
+        # Overall average is 75
+        self.assertEqual((overview["overall_grade"], overview["overall_grade_point"]), ("C", "2.00"))
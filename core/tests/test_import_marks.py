@@ -0,0 +1,109 @@
+import json
+import os
+import tempfile
+from decimal import Decimal
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+from core.archive import archive_year
+from core.models import ArchivedReportCard, Student, Subject, ReportCard, Mark, StudentYearOverview
+
+
+class ImportMarksCommandTest(TestCase):
+    def setUp(self):
+        self.jane = Student.objects.create(name="Jane", email="jane@example.com", date_of_birth="2004-04-04")
+        self.john = Student.objects.create(name="John", email="john@example.com", date_of_birth="2004-05-05")
+        Subject.objects.create(name="Math", code="MAT")
+        Subject.objects.create(name="Science", code="SCI")
+        self.existing = ReportCard.objects.create(student=self.jane, term="Term1", year=2024)
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, "marks.csv")
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def write_csv(self, *rows):
+        with open(self.path, "w") as handle:
+            handle.write("student_email,subject_code,term,year,score\n")
+            for row in rows:
+                handle.write(",".join(row) + "\n")
+
+    def run_import(self, *args):
+        out, err = StringIO(), StringIO()
+        call_command("import_marks", self.path, *args, stdout=out, stderr=err)
+        return out.getvalue(), err.getvalue()
+
+    def test_import_creates_marks_and_missing_report_cards(self):
+        self.write_csv(
+            ("jane@example.com", "MAT", "term1", "2024", "80"),
+            ("jane@example.com", "SCI", "Term1", "2024", "70"),
+            ("john@example.com", "MAT", "Term1", "2024", "90"),
+        )
+        out, err = self.run_import("--chunk-size", "2")
+        self.assertIn("rows/sec", out)
+        self.assertEqual(err, "")
+        self.assertEqual(Mark.objects.filter(report_card=self.existing).count(), 2)
+        self.assertEqual(ReportCard.objects.count(), 2)
+        self.assertEqual(Mark.objects.get(report_card__student=self.john).score, Decimal("90"))
+        overview = StudentYearOverview.objects.get(student=self.jane, subject__code="MAT")
+        self.assertEqual((overview.score_sum, overview.mark_count), (Decimal("80"), 1))
+        self.assertFalse(os.path.exists(self.path + ".checkpoint"))
+
+    def test_invalid_rows_are_reported_and_skipped(self):
+        self.write_csv(
+            ("nobody@example.com", "MAT", "Term1", "2024", "80"),
+            ("jane@example.com", "XXX", "Term1", "2024", "80"),
+            ("jane@example.com", "MAT", "Term1", "2024", "abc"),
+            ("jane@example.com", "SCI", "Term1", "2024", "75"),
+        )
+        out, err = self.run_import()
+        self.assertIn("Row 1: unknown student", err)
+        self.assertIn("Row 2: unknown subject", err)
+        self.assertIn("Row 3:", err)
+        self.assertIn("Imported 1 marks, skipped 3 rows", out)
+
+    def test_archived_years_are_skipped(self):
+        ReportCard.objects.create(student=self.john, term="Term1", year=2023)
+        archive_year(2023)
+        self.write_csv(
+            ("john@example.com", "MAT", "Term1", "2023", "80"),
+            ("jane@example.com", "MAT", "Term1", "2024", "75"),
+        )
+        out, err = self.run_import()
+        self.assertIn("Row 1: year 2023 is archived", err)
+        self.assertIn("Imported 1 marks, skipped 1 rows", out)
+        self.assertFalse(ReportCard.objects.filter(year=2023).exists())
+        self.assertEqual(ArchivedReportCard.objects.get().marks.count(), 0)
+
+    def test_resumes_after_last_committed_chunk(self):
+        self.write_csv(
+            ("jane@example.com", "MAT", "Term1", "2024", "80"),
+            ("jane@example.com", "SCI", "Term1", "2024", "70"),
+            ("john@example.com", "MAT", "Term1", "2024", "90"),
+        )
+        with open(self.path + ".checkpoint", "w") as handle:
+            json.dump({"path": os.path.abspath(self.path), "rows": 2}, handle)
+        out, _ = self.run_import()
+        self.assertIn("Resuming after row 2", out)
+        self.assertEqual(Mark.objects.count(), 1)
+        self.assertTrue(Mark.objects.filter(report_card__student=self.john).exists())
+
+    def test_existing_marks_are_kept_unless_upserting(self):
+        self.write_csv(("jane@example.com", "MAT", "Term1", "2024", "80"))
+        self.run_import()
+        self.write_csv(("jane@example.com", "MAT", "Term1", "2024", "95"))
+        out, _ = self.run_import()
+        self.assertIn("Imported 0 marks, skipped 1 rows", out)
+        self.assertEqual(Mark.objects.get().score, Decimal("80"))
+        out, _ = self.run_import("--upsert")
+        self.assertIn("Imported 1 marks, skipped 0 rows", out)
+        self.assertEqual(Mark.objects.get().score, Decimal("95"))
+
+    def test_missing_columns(self):
+        with open(self.path, "w") as handle:
+            handle.write("student_email,score\n")
+        with self.assertRaises(CommandError):
+            self.run_import()
@@ -0,0 +1,35 @@
+from django.db import connection
+from django.db.models import Avg
+from django.test import TestCase, skipUnlessDBFeature
+
+from core.models import Student, ReportCard, Mark
+
+
+@skipUnlessDBFeature("supports_expression_indexes")
+class QueryPlanTest(TestCase):
+    """
+    The hot queries must be answered through the composite indexes.
+    """
+
+    def setUp(self):
+        if connection.vendor != "sqlite":
+            self.skipTest("Query plans are asserted for SQLite")
+        self.student = Student.objects.create(name="Noor", email="noor@example.com", date_of_birth="2003-03-03")
+
+    def test_report_cards_of_student_year_use_composite_index(self):
+        plan = ReportCard.objects.filter(student=self.student, year=2024).explain()
+        self.assertIn("core_rc_student_year_idx", plan)
+
+    def test_duplicate_term_lookup_uses_composite_index(self):
+        plan = ReportCard.objects.filter(student=self.student, term__iexact="term1", year=2024).explain()
+        self.assertIn("core_rc_student_year_idx", plan)
+
+    def test_subject_averages_are_index_only(self):
+        plan = (
+            Mark.objects
+            .filter(report_card__student=self.student, report_card__year=2024)
+            .values("subject")
+            .annotate(average_score=Avg("score"))
+            .explain()
+        )
+        self.assertIn("COVERING INDEX core_mark_card_subj_score_idx", plan)
@@ -0,0 +1,55 @@
+from django.db import IntegrityError, connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TransactionTestCase
+
+
+class MergeDuplicateReportCardsMigrationTest(TransactionTestCase):
+    """
+    0004 merges report cards only differing by the case of their term before adding unique_report_card_term.
+    """
+
+    # Restores the rows of the data migrations (e.g. the default grading scale) afterwards
+    serialized_rollback = True
+    before = [("core", "0003_studentyearoverview")]
+    after = [("core", "0004_report_card_composite_indexes")]
+
+    def setUp(self):
+        self.migrate(self.before)
+        apps = self.executor.loader.project_state(self.before).apps
+        self.Mark = apps.get_model("core", "Mark")
+        self.ReportCard = apps.get_model("core", "ReportCard")
+        student = apps.get_model("core", "Student").objects.create(
+            name="Asha", email="asha@example.com", date_of_birth="2005-01-01"
+        )
+        Subject = apps.get_model("core", "Subject")
+        self.math = Subject.objects.create(name="Math", code="MAT")
+        self.science = Subject.objects.create(name="Science", code="SCI")
+        self.kept = self.ReportCard.objects.create(student=student, term="Term1", year=2024)
+        self.duplicate = self.ReportCard.objects.create(student=student, term="term1", year=2024)
+        self.ReportCard.objects.create(student=student, term="Term2", year=2024)
+        self.Mark.objects.create(report_card=self.kept, subject=self.math, score=80)
+
+    def tearDown(self):
+        self.migrate(self.executor.loader.graph.leaf_nodes())
+
+    def migrate(self, targets):
+        self.executor = MigrationExecutor(connection)
+        self.executor.loader.build_graph()
+        self.executor.migrate(targets)
+
+    def test_duplicates_are_merged(self):
+        self.Mark.objects.create(report_card=self.duplicate, subject=self.science, score=70)
+        self.migrate(self.after)
+        self.assertEqual(self.ReportCard.objects.count(), 2)
+        self.assertFalse(self.ReportCard.objects.filter(pk=self.duplicate.pk).exists())
+        self.assertEqual(self.Mark.objects.filter(report_card=self.kept).count(), 2)
+
+    def test_marks_of_the_same_subject_are_reported(self):
+        self.Mark.objects.create(report_card=self.duplicate, subject=self.math, score=70)
+        with self.assertRaisesMessage(IntegrityError, f"subject {self.math.pk} on report cards"):
+            self.migrate(self.after)
+        self.assertEqual(self.ReportCard.objects.count(), 3)
+        # Resolved by hand, the migration goes through
+        self.Mark.objects.filter(report_card=self.duplicate).delete()
+        self.migrate(self.after)
+        self.assertEqual(self.ReportCard.objects.count(), 2)
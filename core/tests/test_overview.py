@@ -0,0 +1,94 @@
+from decimal import Decimal
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from core.models import Student, Subject, ReportCard, Mark, StudentYearOverview
+from core.grading import default_grader
+from core.overview import student_overview, student_year_averages
+
+
+class StudentYearOverviewTest(TestCase):
+    def setUp(self):
+        self.student = Student.objects.create(name="Hana", email="hana@example.com", date_of_birth="2003-04-04")
+        self.math = Subject.objects.create(name="Math", code="MAT")
+        self.physics = Subject.objects.create(name="Physics", code="PHY")
+        self.term1 = ReportCard.objects.create(student=self.student, term="Term1", year=2024)
+        self.term2 = ReportCard.objects.create(student=self.student, term="Term2", year=2024)
+
+    def totals(self, subject):
+        row = StudentYearOverview.objects.get(student=self.student, year=2024, subject=subject)
+        return row.score_sum, row.mark_count
+
+    def test_create_marks_updates_totals(self):
+        Mark.objects.create(report_card=self.term1, subject=self.math, score=Decimal("80"))
+        Mark.objects.create(report_card=self.term2, subject=self.math, score=Decimal("60"))
+        Mark.objects.create(report_card=self.term1, subject=self.physics, score=Decimal("70"))
+        self.assertEqual(self.totals(self.math), (Decimal("140"), 2))
+        self.assertEqual(self.totals(self.physics), (Decimal("70"), 1))
+
+    def test_update_mark_adjusts_totals(self):
+        mark = Mark.objects.create(report_card=self.term1, subject=self.math, score=Decimal("80"))
+        mark = Mark.objects.get(pk=mark.pk)
+        mark.score = Decimal("90")
+        mark.save()
+        self.assertEqual(self.totals(self.math), (Decimal("90"), 1))
+
+        mark.subject = self.physics
+        mark.save()
+        self.assertFalse(StudentYearOverview.objects.filter(subject=self.math).exists())
+        self.assertEqual(self.totals(self.physics), (Decimal("90"), 1))
+
+    def test_delete_mark_removes_totals(self):
+        mark = Mark.objects.create(report_card=self.term1, subject=self.math, score=Decimal("80"))
+        Mark.objects.create(report_card=self.term2, subject=self.math, score=Decimal("60"))
+        mark.delete()
+        self.assertEqual(self.totals(self.math), (Decimal("60"), 1))
+
+        self.term2.delete()
+        self.assertFalse(StudentYearOverview.objects.exists())
+
+    def test_moving_report_card_rebuilds_both_years(self):
+        Mark.objects.create(report_card=self.term1, subject=self.math, score=Decimal("80"))
+        card = ReportCard.objects.get(pk=self.term1.pk)
+        card.year = 2025
+        card.save()
+        self.assertFalse(StudentYearOverview.objects.filter(year=2024).exists())
+        self.assertEqual(StudentYearOverview.objects.get(year=2025).score_sum, Decimal("80"))
+
+    def test_averages_are_weighted_by_mark_count(self):
+        Mark.objects.create(report_card=self.term1, subject=self.math, score=Decimal("80"))
+        Mark.objects.create(report_card=self.term2, subject=self.math, score=Decimal("60"))
+        Mark.objects.create(report_card=self.term1, subject=self.physics, score=Decimal("100"))
+        with self.assertNumQueries(1):
+            subject_averages, overall_average = student_year_averages(self.student.pk, 2024)
+        self.assertEqual(subject_averages, [
+            {"subject_name": "Math", "average_score": Decimal("70")},
+            {"subject_name": "Physics", "average_score": Decimal("100")},
+        ])
+        self.assertEqual(overall_average, Decimal("80"))
+
+    def test_student_overview_reads_totals_once(self):
+        Mark.objects.create(report_card=self.term1, subject=self.math, score=Decimal("80"))
+        Mark.objects.create(report_card=self.term2, subject=self.math, score=Decimal("60"))
+        Mark.objects.create(report_card=self.term1, subject=self.physics, score=Decimal("100"))
+        default_grader()
+        # the archived year check, report cards, their marks and the overview totals
+        with self.assertNumQueries(4):
+            overview = student_overview(self.student.pk, 2024)
+        self.assertEqual([card["term"] for card in overview["report_cards"]], ["Term1", "Term2"])
+        self.assertEqual(
+            [(row["subject_name"], row["average_score"]) for row in overview["subject_averages"]],
+            [("Math", Decimal("70")), ("Physics", Decimal("100"))],
+        )
+        # Weighted by marks: (80 + 60 + 100) / 3, not the mean of 70 and 100
+        self.assertEqual(overview["overall_average"], Decimal("80"))
+
+    def test_rebuild_command_restores_totals(self):
+        Mark.objects.create(report_card=self.term1, subject=self.math, score=Decimal("80"))
+        Mark.objects.create(report_card=self.term2, subject=self.math, score=Decimal("60"))
+        StudentYearOverview.objects.all().delete()
+
+        call_command("rebuild_overviews", stdout=StringIO())
+        self.assertEqual(self.totals(self.math), (Decimal("140"), 2))
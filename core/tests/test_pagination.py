@@ -0,0 +1,59 @@
+from decimal import Decimal
+
+from django.urls import reverse
+from rest_framework import status
+
+from core.models import Student, Subject, ReportCard, Mark
+from core.tests.test_viewsets import BaseViewSetTest
+
+
+class PaginationTest(BaseViewSetTest):
+    def setUp(self):
+        super().setUp()
+        student = Student.objects.create(name="Kim", email="kim@example.com", date_of_birth="2001-01-01")
+        subject = Subject.objects.create(name="Math", code="MAT")
+        for year in range(2000, 2005):
+            card = ReportCard.objects.create(student=student, term="Fall", year=year)
+            Mark.objects.create(report_card=card, subject=subject, score=Decimal("70"))
+
+    def get(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def test_unpaginated_by_default(self):
+        data = self.get(reverse("report-card-list"))
+        self.assertEqual(len(data), 5)
+
+    def test_limit_offset_with_count(self):
+        data = self.get(reverse("report-card-list") + "?limit=2&offset=2")
+        self.assertEqual(data["count"], 5)
+        self.assertEqual([card["year"] for card in data["results"]], [2002, 2003])
+
+    def test_limit_offset_without_count(self):
+        url = reverse("mark-list") + "?limit=2&offset=2&count=false"
+        # the page itself, no COUNT(*)
+        with self.assertNumQueries(1):
+            data = self.get(url)
+        self.assertNotIn("count", data)
+        self.assertEqual(len(data["results"]), 2)
+        self.assertIn("offset=4", data["next"])
+
+        data = self.get(reverse("mark-list") + "?limit=2&offset=4&count=false")
+        self.assertEqual(len(data["results"]), 1)
+        self.assertIsNone(data["next"])
+
+    def test_cursor_pagination_walks_all_pages(self):
+        url = reverse("report-card-list") + "?pagination=cursor&page_size=2"
+        years = []
+        while url:
+            data = self.get(url)
+            self.assertNotIn("count", data)
+            years += [card["year"] for card in data["results"]]
+            url = data["next"]
+        self.assertEqual(years, [2000, 2001, 2002, 2003, 2004])
+
+    def test_cursor_pagination_with_count(self):
+        for name in ["student-list", "subject-list", "report-card-list", "mark-list"]:
+            data = self.get(reverse(name) + "?pagination=cursor&count=true")
+            self.assertEqual(data["count"], len(data["results"]))
@@ -0,0 +1,75 @@
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.models import Subject
+from core.profiling import Histogram, percentile, route_histogram
+
+
+class RouteHistogramTest(TestCase):
+    def test_percentiles(self):
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 0.50), 50)
+        self.assertEqual(percentile(values, 0.95), 95)
+        self.assertEqual(percentile(values, 0.99), 99)
+        self.assertIsNone(percentile([], 0.5))
+
+    def test_samples_are_bounded(self):
+        histogram = Histogram(("total_ms", "size"), max_samples=10)
+        for total in range(25):
+            histogram.record("GET subject-list", {"total_ms": total, "size": None if total % 2 else 10})
+        summary = histogram.summary()["GET subject-list"]
+        self.assertEqual(summary["count"], 25)
+        self.assertEqual(summary["samples"], 10)
+        self.assertEqual(summary["total_ms"]["p50"], 19)
+        self.assertEqual(summary["size"]["p99"], 10)
+
+
+@override_settings(PROFILING_ENABLED=True)
+class ProfilingMiddlewareTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="admin", password="pass1234", is_staff=True)
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+        Subject.objects.create(name="Math")
+
+    def test_server_timing_header(self):
+        response = self.client.get(reverse("subject-list"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        timing = response["Server-Timing"]
+        for metric in ("db;dur=", "serialize;dur=", "render;dur=", "total;dur="):
+            self.assertIn(metric, timing)
+        # the token lookup and the subject list
+        self.assertIn('desc="2 queries"', timing)
+
+    def test_metrics_report_route_percentiles(self):
+        for _ in range(3):
+            self.client.get(reverse("subject-list"))
+        self.client.get(reverse("async-mark-list"))
+        response = self.client.get(reverse("metrics"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        routes = response.json()["routes"]
+        self.assertEqual(set(routes), {"GET subject-list", "GET async-mark-list"})
+        summary = routes["GET subject-list"]
+        self.assertEqual(summary["count"], 3)
+        # the token is only looked up by the first request
+        self.assertEqual(summary["queries"]["p50"], 1)
+        self.assertEqual(summary["queries"]["p99"], 2)
+        self.assertLessEqual(summary["total_ms"]["p50"], summary["total_ms"]["p99"])
+        self.assertGreater(summary["size"]["p50"], 0)
+        self.assertIn("tokens", response.json()["caches"])
+
+    def test_metrics_require_staff(self):
+        user = User.objects.create_user(username="teacher", password="pass1234")
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {Token.objects.create(user=user).key}")
+        self.assertEqual(self.client.get(reverse("metrics")).status_code, status.HTTP_403_FORBIDDEN)
+
+    @override_settings(PROFILING_ENABLED=False)
+    def test_disabled_by_default(self):
+        response = self.client.get(reverse("subject-list"))
+        self.assertNotIn("Server-Timing", response)
+        self.assertEqual(route_histogram.summary(), {})
@@ -0,0 +1,76 @@
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+
+from core.authentication import lookup_token
+from core.grading import default_grader
+from core.models import Student, Subject, ReportCard, Mark
+from core.serializers import AddMarkSerializer, RELATED_CHOICES_CUTOFF
+
+
+class ConstantQueryCountTest(TestCase):
+    """
+    Rendering lists and forms must not issue a query per row.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_superuser(username="admin", password="pass1234")
+        self.token = Token.objects.create(user=self.user)
+        self.subject = Subject.objects.create(name="Math", code="MAT")
+        self.rows = 0
+        # The grading scale and validated tokens are cached
+        # across requests, load them before counting queries
+        default_grader()
+        lookup_token(self.token.key)
+
+    def add_rows(self, count):
+        for _ in range(count):
+            self.rows += 1
+            student = Student.objects.create(
+                name=f"Student {self.rows}", email=f"student{self.rows}@example.com", date_of_birth="2000-01-01"
+            )
+            card = ReportCard.objects.create(student=student, term="Term1", year=2024)
+            Mark.objects.create(report_card=card, subject=self.subject, score=Decimal("50"))
+
+    def count_queries(self, url, **headers):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url, **headers)
+        self.assertEqual(response.status_code, 200)
+        return len(context.captured_queries)
+
+    def assertConstantQueries(self, url, **headers):
+        self.add_rows(3)
+        small = self.count_queries(url, **headers)
+        self.add_rows(12)
+        self.assertEqual(self.count_queries(url, **headers), small)
+
+    def test_browsable_api_mark_form(self):
+        self.assertConstantQueries(
+            reverse("mark-list"),
+            HTTP_ACCEPT="text/html",
+            HTTP_AUTHORIZATION=f"Token {self.token.key}",
+        )
+
+    def test_browsable_api_report_card_form(self):
+        self.assertConstantQueries(
+            reverse("report-card-list"),
+            HTTP_ACCEPT="text/html",
+            HTTP_AUTHORIZATION=f"Token {self.token.key}",
+        )
+
+    def test_related_choices_are_capped(self):
+        self.add_rows(RELATED_CHOICES_CUTOFF + 5)
+        options = list(AddMarkSerializer().fields["report_card"].iter_options())
+        # The cutoff adds a disabled "More than N items..." option
+        self.assertEqual(len(options), RELATED_CHOICES_CUTOFF + 1)
+
+    def test_admin_changelists(self):
+        self.client.force_login(self.user)
+        for model in ["reportcard", "mark", "studentyearoverview"]:
+            with self.subTest(model=model):
+                self.assertConstantQueries(reverse(f"admin:core_{model}_changelist"))
@@ -0,0 +1,150 @@
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+
+from core.models import Student, Subject, ReportCard, Mark, Ranking, RankingCohort
+from core.rankings import refresh_rankings
+from core.tasks import refresh_stale_rankings
+
+
+class CohortMixin:
+    def make_cohort(self):
+        self.math = Subject.objects.create(name="Math", code="MAT")
+        self.physics = Subject.objects.create(name="Physics", code="PHY")
+        self.cards = []
+        for i, (math, physics) in enumerate([("80", "30"), ("80", "50"), ("20", "70")]):
+            student = Student.objects.create(name=f"Pupil {i}", email=f"pupil{i}@example.com", date_of_birth="2005-01-01")
+            card = ReportCard.objects.create(student=student, term="Term1", year=2024)
+            Mark.objects.create(report_card=card, subject=self.math, score=Decimal(math))
+            Mark.objects.create(report_card=card, subject=self.physics, score=Decimal(physics))
+            self.cards.append(card)
+
+    def ranking(self, card, subject=None):
+        ranking = Ranking.objects.get(report_card=card, subject=subject)
+        return ranking.rank, ranking.dense_rank, ranking.percentile
+
+
+class RefreshRankingsTest(CohortMixin, TestCase):
+    def setUp(self):
+        self.make_cohort()
+
+    def test_subject_and_overall_rankings(self):
+        refresh_rankings(2024, "TERM1")
+        # Ties share a rank, dense ranks leave no gap
+        self.assertEqual(self.ranking(self.cards[0], self.math), (1, 1, 50.0))
+        self.assertEqual(self.ranking(self.cards[1], self.math), (1, 1, 50.0))
+        self.assertEqual(self.ranking(self.cards[2], self.math), (3, 2, 0.0))
+        self.assertEqual(self.ranking(self.cards[2], self.physics), (1, 1, 100.0))
+        # Overall averages are 55, 65 and 45
+        self.assertEqual(self.ranking(self.cards[1]), (1, 1, 100.0))
+        self.assertEqual(self.ranking(self.cards[2]), (3, 3, 0.0))
+        self.assertEqual(Ranking.objects.get(report_card=self.cards[1], subject=None).score, Decimal("65"))
+        self.assertEqual(set(Ranking.objects.values_list("cohort_size", flat=True)), {3})
+
+    def test_query_count_does_not_grow_with_cohort(self):
+        # cohort lookup and update (the mark writes created it), delete, two ranked selects and the insert
+        with self.assertNumQueries(8):
+            refresh_rankings(2024, "Term1")
+
+    def test_mark_writes_flag_cohort_stale(self):
+        refresh_rankings(2024, "Term1")
+        mark = Mark.objects.get(report_card=self.cards[2], subject=self.math)
+        mark.score = Decimal("95")
+        mark.save()
+        self.assertTrue(RankingCohort.objects.get(year=2024, term="term1").stale)
+
+        self.assertEqual(refresh_stale_rankings(), 1)
+        self.assertFalse(RankingCohort.objects.get(year=2024, term="term1").stale)
+        self.assertEqual(self.ranking(self.cards[2], self.math), (1, 1, 100.0))
+
+    def test_writes_queue_a_refresh(self):
+        self.assertTrue(RankingCohort.objects.get(year=2024, term="term1").stale)
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            Mark.objects.filter(report_card=self.cards[0], subject=self.math).get().save()
+        self.assertEqual(len(callbacks), 1)
+        self.assertFalse(RankingCohort.objects.get(year=2024, term="term1").stale)
+        self.assertEqual(self.ranking(self.cards[0], self.math), (1, 1, 50.0))
+
+    def test_other_cohorts_stay_fresh(self):
+        refresh_rankings(2024, "Term1")
+        card = ReportCard.objects.create(student=self.cards[0].student, term="Term2", year=2024)
+        Mark.objects.create(report_card=card, subject=self.math, score=Decimal("10"))
+        self.assertFalse(RankingCohort.objects.get(year=2024, term="term1").stale)
+        self.assertTrue(RankingCohort.objects.get(year=2024, term="term2").stale)
+
+    def test_refresh_skips_up_to_date_rankings(self):
+        refresh_stale_rankings()
+        with self.assertNumQueries(1):
+            self.assertEqual(refresh_stale_rankings(), 0)
+
+
+class RankingViewTest(CohortMixin, APITestCase):
+    def setUp(self):
+        user = User.objects.create_user(username="teacher", password="password")
+        self.client.credentials(HTTP_AUTHORIZATION="Token " + Token.objects.create(user=user).key)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.make_cohort()
+
+    def test_report_cards_without_rankings_by_default(self):
+        response = self.client.get(reverse("report-card-detail", kwargs={"pk": self.cards[0].pk}))
+        self.assertNotIn("rankings", response.data)
+
+    def test_retrieve_with_rankings(self):
+        url = reverse("report-card-detail", kwargs={"pk": self.cards[1].pk})
+        response = self.client.get(url + "?rankings=true")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        rankings = response.data["rankings"]
+        self.assertEqual(rankings["overall"]["rank"], 1)
+        self.assertEqual(
+            [(row["subject"], row["rank"]) for row in rankings["subjects"]],
+            [(self.math.id, 1), (self.physics.id, 2)],
+        )
+
+    def test_list_with_rankings_does_not_query_per_card(self):
+        url = reverse("report-card-list") + "?rankings=true"
+        self.client.get(url)
+        # cards, marks, subjects and rankings (the token is cached by now)
+        with self.assertNumQueries(4):
+            response = self.client.get(url)
+        self.assertEqual(len(response.data), 3)
+        self.assertTrue(all(card["rankings"]["overall"] for card in response.data))
+
+    def test_leaderboard(self):
+        url = reverse("report-card-leaderboard")
+        response = self.client.get(url + "?year=2024&term=term1")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.data
+        self.assertEqual([row["report_card"] for row in results], [self.cards[1].id, self.cards[0].id, self.cards[2].id])
+        self.assertEqual(results[0]["student"]["name"], "Pupil 1")
+
+        response = self.client.get(url + f"?year=2024&term=Term1&subject={self.physics.id}")
+        self.assertEqual(response.data[0]["report_card"], self.cards[2].id)
+
+    def test_leaderboard_requires_cohort(self):
+        url = reverse("report-card-leaderboard")
+        self.assertEqual(self.client.get(url + "?year=2024").status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(url + "?year=x&term=Term1").status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_reads_do_not_rank(self):
+        mark = Mark.objects.get(report_card=self.cards[2], subject=self.math)
+        mark.score = Decimal("95")
+        mark.save()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("report-card-list") + "?rankings=true")
+            self.client.get(reverse("report-card-leaderboard") + "?year=2024&term=Term1")
+        self.assertTrue(all(query["sql"].startswith("SELECT") for query in queries.captured_queries))
+        # The last rankings until the refresh queued by the write has run
+        self.assertEqual(response.data[2]["rankings"]["overall"]["rank"], 3)
+        self.assertTrue(RankingCohort.objects.get(year=2024, term="term1").stale)
+
+    def test_unranked_cohort(self):
+        ReportCard.objects.create(student=self.cards[0].student, term="Term2", year=2024)
+        response = self.client.get(reverse("report-card-leaderboard") + "?year=2024&term=Term2")
+        self.assertEqual(response.data, [])
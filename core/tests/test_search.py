@@ -0,0 +1,94 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+
+from core.models import Student, Subject
+from core.search import full_text_search, match_expression
+
+from .test_viewsets import BaseViewSetTest
+
+
+class MatchExpressionTest(TestCase):
+    def test_words_are_quoted_prefixes(self):
+        self.assertEqual(match_expression("jo smi"), '"jo"* "smi"*')
+        self.assertEqual(match_expression("john@example.com"), '"john"* "example"* "com"*')
+
+    def test_operators_are_literal(self):
+        self.assertEqual(match_expression('NOT "a" OR b*'), '"NOT"* "a"* "OR"* "b"*')
+
+    def test_no_words(self):
+        self.assertIsNone(match_expression(" @. "))
+
+
+class StudentSearchTest(BaseViewSetTest):
+    def setUp(self):
+        super().setUp()
+        self.maria = Student.objects.create(name="Maria Smith", email="maria@example.com", date_of_birth="2005-01-01")
+        self.jones = Student.objects.create(
+            name="Smith Jones", email="smith.jones@example.com", date_of_birth="2005-01-01"
+        )
+        self.ana = Student.objects.create(name="Ana Müller", email="ana@school.org", date_of_birth="2005-01-01")
+
+    def search(self, term):
+        response = self.client.get(reverse("student-list"), {"search": term})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [student["id"] for student in response.data]
+
+    def test_prefix_matches_ranked(self):
+        # The second student matches in both their name and email
+        self.assertEqual(self.search("smi"), [self.jones.pk, self.maria.pk])
+        self.assertEqual(self.search("mar smi"), [self.maria.pk])
+
+    def test_email_and_diacritics(self):
+        self.assertEqual(self.search("ana@school"), [self.ana.pk])
+        self.assertEqual(self.search("muller"), [self.ana.pk])
+
+    def test_index_follows_writes(self):
+        self.maria.name = "Maria Garcia"
+        self.maria.save()
+        self.assertEqual(self.search("garcia"), [self.maria.pk])
+        self.assertEqual(self.search("smith"), [self.jones.pk])
+
+        Student.objects.filter(pk=self.ana.pk).update(name="Ana Weber")
+        self.assertEqual(self.search("weber"), [self.ana.pk])
+
+        Student.objects.bulk_create([
+            Student(name="Bulk Weber", email="bulk@example.com", date_of_birth="2005-01-01"),
+        ])
+        self.assertEqual(len(self.search("weber")), 2)
+
+        self.jones.delete()
+        self.assertEqual(self.search("smith"), [])
+
+    def test_paginated_search(self):
+        response = self.client.get(reverse("student-list"), {"search": "example", "limit": 1})
+        self.assertEqual(response.data["count"], 2)
+        self.assertEqual(len(response.data["results"]), 1)
+
+    @override_settings(FULL_TEXT_SEARCH_ENABLED=False)
+    def test_like_fallback(self):
+        # LIKE matches inside words too
+        self.assertEqual(sorted(self.search("mith")), [self.maria.pk, self.jones.pk])
+
+    def test_search_without_words_uses_like(self):
+        self.assertEqual(self.search("@school."), [self.ana.pk])
+
+
+class SubjectSearchTest(BaseViewSetTest):
+    def test_code_prefix(self):
+        math = Subject.objects.create(name="Mathematics", code="MAT101")
+        Subject.objects.create(name="Physics", code="PHY101")
+        response = self.client.get(reverse("subject-list"), {"search": "mat"})
+        self.assertEqual([subject["id"] for subject in response.data], [math.pk])
+
+
+class RebuildSearchIndexCommandTest(TestCase):
+    def test_rebuild(self):
+        student = Student.objects.create(name="Kofi Mensah", email="kofi@example.com", date_of_birth="2005-01-01")
+        out = StringIO()
+        call_command("rebuild_search_index", stdout=out)
+        self.assertIn("Rebuilt 2 search indexes", out.getvalue())
+        self.assertEqual(list(full_text_search(Student.objects.all(), match_expression("kofi"))), [student])
@@ -65,9 +65,21 @@ class ReportCardModelSerializerTest(TestCase):
         data = {"student": self.student.id, "term": "term1", "year": "2023"}
 
         serializer = ReportCardSerializer(data=data)
+        # Duplicates are caught by the database constraint when saving
+        serializer.is_valid(raise_exception=True)
         with self.assertRaises(ValidationError) as cm:
-            serializer.is_valid(raise_exception=True)
+            serializer.save()
         self.assertIn("already exists", str(cm.exception))
+        self.assertEqual(ReportCard.objects.filter(student=self.student).count(), 1)
+
+    def test_update_report_card_to_duplicate_term(self):
+        ReportCard.objects.create(student=self.student, term="Term1", year="2023")
+        other = ReportCard.objects.create(student=self.student, term="Term2", year="2023")
+        serializer = ReportCardSerializer(other, data={"term": "TERM1"}, partial=True)
+        serializer.is_valid(raise_exception=True)
+        with self.assertRaises(ValidationError) as cm:
+            serializer.save()
+        self.assertIn("non_field_errors", cm.exception.detail)
 
 
 class MarkModelSerializerTest(TestCase):
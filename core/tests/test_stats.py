@@ -0,0 +1,108 @@
+from decimal import Decimal
+
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+from django.contrib.auth.models import User
+
+from core.bulk import save_marks
+from core.cache import stats_cache
+from core.models import Student, Subject, ReportCard, Mark
+from core.stats import cohort_stats
+
+
+class CohortStatsTest(TestCase):
+    def setUp(self):
+        self.math = Subject.objects.create(name="Math", code="MAT")
+        self.physics = Subject.objects.create(name="Physics", code="PHY")
+        self.cards = []
+        for i, (math, physics) in enumerate([("80", "30"), ("60", "50"), ("20", "70")]):
+            student = Student.objects.create(name=f"Pupil {i}", email=f"pupil{i}@example.com", date_of_birth="2005-01-01")
+            card = ReportCard.objects.create(student=student, term="Term1", year=2024)
+            Mark.objects.create(report_card=card, subject=self.math, score=Decimal(math))
+            Mark.objects.create(report_card=card, subject=self.physics, score=Decimal(physics))
+            self.cards.append(card)
+        other = ReportCard.objects.create(student=self.cards[0].student, term="Term2", year=2024)
+        Mark.objects.create(report_card=other, subject=self.math, score=Decimal("100"))
+
+    def test_subject_statistics_in_one_aggregate_query(self):
+        # the archived year check and the statistics
+        with self.assertNumQueries(2):
+            stats = cohort_stats(2024, "term1")
+        math, physics = stats["subjects"]
+        self.assertEqual(math["subject_name"], "Math")
+        self.assertEqual((math["student_count"], math["mark_count"]), (3, 3))
+        self.assertAlmostEqual(float(math["average_score"]), 160 / 3, places=2)
+        self.assertEqual((math["min_score"], math["max_score"]), (Decimal("20"), Decimal("80")))
+        self.assertAlmostEqual(float(math["std_dev"]), 24.944, places=2)
+        self.assertAlmostEqual(math["pass_rate"], 2 / 3)
+        self.assertAlmostEqual(physics["pass_rate"], 2 / 3)
+
+        overall = stats["overall"]
+        self.assertEqual(overall["mark_count"], 6)
+        self.assertAlmostEqual(float(overall["average_score"]), 310 / 6, places=2)
+        self.assertEqual((overall["min_score"], overall["max_score"]), (Decimal("20"), Decimal("80")))
+        self.assertAlmostEqual(overall["pass_rate"], 4 / 6)
+
+    def test_statistics_for_whole_year(self):
+        math = cohort_stats(2024)["subjects"][0]
+        self.assertEqual((math["student_count"], math["mark_count"]), (3, 4))
+        self.assertEqual(math["max_score"], Decimal("100"))
+
+    def test_empty_cohort(self):
+        stats = cohort_stats(2030, "Term1")
+        self.assertEqual(stats["subjects"], [])
+        self.assertIsNone(stats["overall"]["average_score"])
+
+
+class CohortStatsViewTest(APITestCase):
+    def setUp(self):
+        user = User.objects.create_user(username="teacher", password="password")
+        self.client.credentials(HTTP_AUTHORIZATION="Token " + Token.objects.create(user=user).key)
+        self.math = Subject.objects.create(name="Math", code="MAT")
+        student = Student.objects.create(name="Pupil", email="pupil@example.com", date_of_birth="2005-01-01")
+        self.card = ReportCard.objects.create(student=student, term="Term1", year=2024)
+        self.mark = Mark.objects.create(report_card=self.card, subject=self.math, score=Decimal("80"))
+        self.url = reverse("report-card-stats")
+
+    def get_stats(self, query="?year=2024&term=Term1"):
+        return self.client.get(self.url + query)
+
+    def test_stats_require_numeric_year(self):
+        self.assertEqual(self.get_stats("").status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.get_stats("?year=abc").status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_stats_are_cached_per_term_and_year(self):
+        response = self.get_stats()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["subjects"][0]["mark_count"], 1)
+        self.assertIsNotNone(stats_cache.get(2024, "term1"))
+        # cache lookups only, the token is cached by now
+        with self.assertNumQueries(0):
+            self.get_stats()
+
+    def test_mark_writes_invalidate_stats(self):
+        self.get_stats()
+        self.mark.score = Decimal("20")
+        self.mark.save()
+        self.assertIsNone(stats_cache.get(2024, "Term1"))
+        self.assertEqual(self.get_stats().data["subjects"][0]["pass_rate"], 0)
+
+        self.get_stats()
+        self.mark.delete()
+        self.assertEqual(self.get_stats().data["subjects"], [])
+
+    def test_bulk_mark_writes_invalidate_stats(self):
+        self.get_stats()
+        physics = Subject.objects.create(name="Physics", code="PHY")
+        save_marks([Mark(report_card=self.card, subject=physics, score=Decimal("50"))], {(self.card.student_id, 2024)})
+        self.assertEqual(len(self.get_stats().data["subjects"]), 2)
+
+    def test_renamed_card_invalidates_stats(self):
+        self.get_stats()
+        card = ReportCard.objects.get(pk=self.card.pk)
+        card.term = "Term2"
+        card.save()
+        self.assertEqual(self.get_stats().data["subjects"], [])
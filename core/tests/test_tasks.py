@@ -0,0 +1,127 @@
+from decimal import Decimal
+from unittest import mock
+
+from celery.result import AsyncResult
+from django.core.cache import cache
+from django.test import TestCase
+
+from core.bulk import ingest_marks
+from core.cache import overview_cache
+from core.grading import default_grader
+from core.models import Student, Subject, ReportCard, Mark
+from core.overview import student_overview, student_overviews
+from core.tasks import (
+    calculate_student_overview, calculate_student_overviews, enqueue_student_overview,
+    overview_task_student, precompute_overviews, stamp_enqueued_at, task_histogram
+)
+
+
+class OverviewTaskTestMixin:
+    def setUp(self):
+        self.subjects = [Subject.objects.create(name=name, code=name[:3].upper()) for name in ("Math", "Science")]
+        self.students = []
+        for index in range(3):
+            student = Student.objects.create(
+                name=f"Student {index}", email=f"student{index}@example.com", date_of_birth="2005-01-01"
+            )
+            card = ReportCard.objects.create(student=student, term="Term1", year=2024)
+            for offset, subject in enumerate(self.subjects):
+                Mark.objects.create(report_card=card, subject=subject, score=Decimal(60 + index * 10 + offset))
+            self.students.append(student)
+        task_histogram.clear()
+
+
+class EnqueueStudentOverviewTest(OverviewTaskTestMixin, TestCase):
+    def test_identical_requests_share_one_task(self):
+        student = self.students[0].pk
+        pending = AsyncResult("overview-task", app=calculate_student_overview.app)
+        with mock.patch.object(calculate_student_overview, "apply_async", return_value=pending) as apply_async:
+            first = enqueue_student_overview(student, 2024)
+            second = enqueue_student_overview(student, 2024)
+            enqueue_student_overview(student, 2023)
+        self.assertEqual(apply_async.call_count, 2)
+        task_id = apply_async.call_args_list[0].kwargs["task_id"]
+        self.assertEqual(second.id, task_id)
+        self.assertEqual(overview_task_student(task_id), student)
+        self.assertIs(first, pending)
+
+    def test_mark_write_allows_a_new_task(self):
+        student = self.students[0]
+        with mock.patch.object(calculate_student_overview, "apply_async") as apply_async:
+            enqueue_student_overview(student.pk, 2024)
+            Mark.objects.filter(report_card__student=student).first().save()
+            enqueue_student_overview(student.pk, 2024)
+        self.assertEqual(apply_async.call_count, 2)
+
+    def test_failed_task_is_not_reused(self):
+        student = self.students[0].pk
+        with mock.patch("core.tasks.student_overview", side_effect=RuntimeError("boom")):
+            self.assertTrue(enqueue_student_overview(student, 2024).failed())
+        self.assertTrue(enqueue_student_overview(student, 2024).successful())
+
+
+class BatchedOverviewTest(OverviewTaskTestMixin, TestCase):
+    def test_matches_single_overviews(self):
+        ids = [student.pk for student in self.students]
+        default_grader()
+        # the archived year check, report cards, their marks and the overview totals
+        with self.assertNumQueries(4):
+            overviews = student_overviews(ids, 2024)
+        for student_id in ids:
+            self.assertEqual(overviews[student_id], student_overview(student_id, 2024))
+
+    def test_students_without_cards(self):
+        lonely = Student.objects.create(name="Lonely", email="lonely@example.com", date_of_birth="2005-01-01")
+        overview = student_overviews([lonely.pk], 2024)[lonely.pk]
+        self.assertEqual(overview["report_cards"], [])
+        self.assertIsNone(overview["overall_average"])
+
+    def test_task_caches_every_overview(self):
+        ids = [student.pk for student in self.students]
+        self.assertEqual(calculate_student_overviews(ids, 2024), 3)
+        for student_id in ids:
+            self.assertIsNotNone(overview_cache.get(student_id, 2024))
+
+
+class PrecomputeOverviewsTest(OverviewTaskTestMixin, TestCase):
+    def test_bulk_import_is_precomputed(self):
+        rows = []
+        for student in self.students[:2]:
+            card = ReportCard.objects.create(student=student, term="Term2", year=2024)
+            rows.append({"report_card": card.pk, "subject": self.subjects[0].pk, "score": "75"})
+        self.assertTrue(ingest_marks(rows).is_valid)
+        self.assertIsNone(overview_cache.get(self.students[0].pk, 2024))
+
+        self.assertEqual(precompute_overviews.delay(batch_size=1).get(), 2)
+        for student in self.students[:2]:
+            self.assertIsNotNone(overview_cache.get(student.pk, 2024))
+        # Only the students whose marks were imported
+        self.assertIsNone(overview_cache.get(self.students[2].pk, 2024))
+        # nothing flagged since the last run
+        self.assertEqual(precompute_overviews(), 0)
+
+    def test_flags_are_shared(self):
+        card = ReportCard.objects.first()
+        ingest_marks([{"report_card": card.pk, "subject": self.subjects[0].pk, "score": "1"}], upsert=True)
+        # Kept in the database, not in the memory of the process that imported the marks
+        cache.clear()
+        self.assertEqual(precompute_overviews(), 1)
+
+
+class TaskMetricsTest(OverviewTaskTestMixin, TestCase):
+    def test_runtime_is_recorded(self):
+        calculate_student_overview.delay(self.students[0].pk, 2024)
+        calculate_student_overview.delay(self.students[1].pk, 2024)
+        summary = task_histogram.summary()["core.tasks.calculate_student_overview"]
+        self.assertEqual(summary["count"], 2)
+        self.assertGreater(summary["runtime_ms"]["p50"], 0)
+        # eager tasks are never published
+        self.assertIsNone(summary["queue_ms"]["p50"])
+
+    def test_published_core_tasks_are_stamped(self):
+        headers = {}
+        stamp_enqueued_at(sender="core.tasks.calculate_student_overview", headers=headers)
+        self.assertIn("enqueued_at", headers)
+        other = {}
+        stamp_enqueued_at(sender="celery.backend_cleanup", headers=other)
+        self.assertEqual(other, {})
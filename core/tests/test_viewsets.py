@@ -1,10 +1,20 @@
+import json
+from unittest import mock
+
+from celery.result import AsyncResult
+from django.db.models import QuerySet
 from django.urls import reverse
 from rest_framework.test import APITestCase, APIClient
 from rest_framework.authtoken.models import Token
 from rest_framework import status
 from django.contrib.auth.models import User
 from decimal import Decimal
-from core.models import Student, Subject, ReportCard, Mark
+from core.archive import archive_year
+from core.authentication import lookup_token
+from core.bulk import DUPLICATE_MARK_MESSAGE, save_marks
+from core.grading import default_grader
+from core.models import Student, Subject, ReportCard, Mark, StudentYearOverview
+from core.tasks import calculate_student_overview, overview_task_id
 
 
 class BaseViewSetTest(APITestCase):
@@ -13,6 +23,10 @@ class BaseViewSetTest(APITestCase):
         self.token = Token.objects.create(user=self.user)
         self.client = APIClient()
         self.client.credentials(HTTP_AUTHORIZATION="Token " + self.token.key)
+        # The grading scale and validated tokens are cached
+        # across requests, load them before counting queries
+        default_grader()
+        lookup_token(self.token.key)
 
 
 class StudentViewSetTest(BaseViewSetTest):
@@ -55,6 +69,57 @@ class StudentViewSetTest(BaseViewSetTest):
         self.assertEqual(len(response.data["subject_averages"]), 2)
         self.assertAlmostEqual(float(response.data["overall_average"]), 85.0)
 
+    def test_avg_overview_invalid_year(self):
+        url = reverse("student-avg-overview", kwargs={"pk": self.student.id}) + "?year=last"
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_avg_overview_inline(self):
+        url = reverse("student-avg-overview", kwargs={"pk": self.student.id}) + "?year=2023&inline=true"
+        with mock.patch.object(calculate_student_overview, "apply_async") as apply_async:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["report_cards"], [])
+        apply_async.assert_not_called()
+
+    def test_avg_overview_served_from_cache(self):
+        url = reverse("student-avg-overview", kwargs={"pk": self.student.id}) + "?year=2023"
+        self.client.get(url)
+        with mock.patch.object(calculate_student_overview, "apply_async") as apply_async:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn("overall_average", response.data)
+        apply_async.assert_not_called()
+
+    def test_avg_overview_queued_and_polled(self):
+        url = reverse("student-avg-overview", kwargs={"pk": self.student.id}) + "?year=2023"
+        task_id = overview_task_id(self.student.id, 2023)
+        pending = AsyncResult(task_id, app=calculate_student_overview.app)
+        with mock.patch.object(calculate_student_overview, "apply_async", return_value=pending):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data["task_id"], task_id)
+
+        poll_url = reverse("student-avg-overview-result", kwargs={"pk": self.student.id, "task_id": task_id})
+        self.assertTrue(response["Location"].endswith(poll_url))
+        response = self.client.get(poll_url)
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data["status"], "PENDING")
+
+        overview = {"report_cards": [], "subject_averages": [], "overall_average": None}
+        calculate_student_overview.backend.store_result(task_id, overview, "SUCCESS")
+        response = self.client.get(poll_url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, overview)
+
+    def test_avg_overview_result_of_another_student(self):
+        other = Student.objects.create(name="Other", email="other@example.com", date_of_birth="2005-01-01")
+        task_id = overview_task_id(other.id, 2023)
+        calculate_student_overview.backend.store_result(task_id, {"report_cards": []}, "SUCCESS")
+        for task in (task_id, "overview-task"):
+            url = reverse("student-avg-overview-result", kwargs={"pk": self.student.id, "task_id": task})
+            self.assertEqual(self.client.get(url).status_code, status.HTTP_404_NOT_FOUND)
+
 
 class SubjectViewSetTest(BaseViewSetTest):
     def setUp(self):
@@ -92,6 +157,60 @@ class ReportCardViewSetTest(BaseViewSetTest):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertTrue(all(rc["student"] == self.student.id for rc in response.data))
 
+    def export(self, query):
+        response = self.client.get(reverse("report-card-export") + query)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response, b"".join(response.streaming_content).decode()
+
+    def test_export_ndjson(self):
+        subject = Subject.objects.create(name="Math", code="MAT")
+        Mark.objects.create(report_card=self.report_card, subject=subject, score=Decimal("80"))
+        ReportCard.objects.create(student=self.student, year="2024", term="Fall")
+
+        response, body = self.export("?format=ndjson&year=2023")
+        self.assertEqual(response["Content-Type"], "application/x-ndjson; charset=utf-8")
+        lines = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual(len(lines), 1)
+        self.assertEqual(lines[0]["id"], self.report_card.id)
+        self.assertEqual(lines[0]["marks"][0]["score"], "80.00")
+        self.assertEqual(lines[0]["student_detail"]["email"], "alice@example.com")
+
+    def test_export_csv(self):
+        subject = Subject.objects.create(name="Math", code="MAT")
+        Mark.objects.create(report_card=self.report_card, subject=subject, score=Decimal("80"))
+        ReportCard.objects.create(student=self.student, year="2024", term="Fall")
+
+        response, body = self.export("?format=csv")
+        self.assertEqual(response["Content-Type"], "text/csv; charset=utf-8")
+        rows = body.splitlines()
+        self.assertEqual(rows[0], "report_card_id,student_id,student_name,student_email,term,year,subject_code,subject_name,score")
+        self.assertEqual(rows[1], f"{self.report_card.id},{self.student.id},Alice,alice@example.com,Fall,2023,MAT,Math,80.00")
+        self.assertTrue(rows[2].endswith("Fall,2024,,,"))
+
+    def test_export_archived_year(self):
+        subject = Subject.objects.create(name="Math", code="MAT")
+        Mark.objects.create(report_card=self.report_card, subject=subject, score=Decimal("80"))
+        archive_year(2023)
+
+        _, body = self.export("?format=csv&year=2023")
+        rows = body.splitlines()
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[1], f"{self.report_card.id},{self.student.id},Alice,alice@example.com,Fall,2023,MAT,Math,80.00")
+
+        _, body = self.export(f"?format=ndjson&year=2023&student={self.student.id}")
+        lines = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual([line["id"] for line in lines], [self.report_card.id])
+        self.assertEqual(lines[0]["marks"][0]["subject"]["code"], "MAT")
+
+    def test_export_query_count_does_not_grow_with_cards(self):
+        subject = Subject.objects.create(name="Math", code="MAT")
+        for year in range(2000, 2010):
+            card = ReportCard.objects.create(student=self.student, year=year, term="Fall")
+            Mark.objects.create(report_card=card, subject=subject, score=Decimal("70"))
+        # one page of cards with their marks and subjects
+        with self.assertNumQueries(3):
+            self.export("?format=ndjson")
+
 
 class MarkViewSetTest(BaseViewSetTest):
     def setUp(self):
@@ -132,3 +251,201 @@ class MarkViewSetTest(BaseViewSetTest):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.mark.refresh_from_db()
         self.assertEqual(self.mark.score, Decimal(90))
+
+
+class BulkMarkViewSetTest(BaseViewSetTest):
+    def setUp(self):
+        super().setUp()
+        self.students = [
+            Student.objects.create(name=f"Pupil {i}", email=f"pupil{i}@example.com", date_of_birth="2005-01-01")
+            for i in range(3)
+        ]
+        self.cards = [ReportCard.objects.create(student=s, year=2024, term="Term1") for s in self.students]
+        self.math = Subject.objects.create(name="Math", code="MAT")
+        self.science = Subject.objects.create(name="Science", code="SCI")
+        self.url = reverse("mark-bulk")
+
+    def rows(self, subject, score="80"):
+        return [{"report_card": card.id, "subject": subject.id, "score": score} for card in self.cards]
+
+    def test_bulk_create_marks(self):
+        response = self.client.post(self.url, self.rows(self.math) + self.rows(self.science), format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data, {"created": 6, "updated": 0})
+        self.assertEqual(Mark.objects.count(), 6)
+        self.assertEqual(StudentYearOverview.objects.filter(year=2024).count(), 6)
+
+    def test_bulk_query_count_does_not_grow_with_rows(self):
+        rows = self.rows(self.math)
+        # three lookups, the insert, the overview rebuild, the cohorts to flag as stale and
+        # their upsert, the report cards' updated_at and the precompute flags, in savepoints
+        with self.assertNumQueries(15):
+            self.client.post(self.url, rows[:1], format="json")
+        Mark.objects.all().delete()
+        with self.assertNumQueries(15):
+            self.client.post(self.url, rows, format="json")
+
+    def test_bulk_reports_errors_per_row(self):
+        Mark.objects.create(report_card=self.cards[0], subject=self.math, score=Decimal("50"))
+        rows = self.rows(self.math)
+        rows[1]["subject"] = 9999
+        rows[2]["score"] = "abc"
+        response = self.client.post(self.url, rows, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data["errors"][0], {})
+        self.assertIn("score", response.data["errors"][2])
+
+        rows[2]["score"] = "60"
+        response = self.client.post(self.url, rows, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        errors = response.data["errors"]
+        self.assertIn("non_field_errors", errors[0])
+        self.assertIn("subject", errors[1])
+        self.assertEqual(errors[2], {})
+        self.assertEqual(Mark.objects.count(), 1)
+
+    def test_bulk_rejects_duplicates_within_payload(self):
+        rows = self.rows(self.math)
+        response = self.client.post(self.url, rows + rows[:1], format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("non_field_errors", response.data["errors"][3])
+
+    def test_bulk_upsert_replaces_existing_scores(self):
+        Mark.objects.create(report_card=self.cards[0], subject=self.math, score=Decimal("50"))
+        response = self.client.post(self.url + "?upsert=true", self.rows(self.math, "90"), format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data, {"created": 2, "updated": 1})
+        self.assertEqual(Mark.objects.get(report_card=self.cards[0]).score, Decimal("90"))
+        overview = StudentYearOverview.objects.get(student=self.students[0], subject=self.math)
+        self.assertEqual((overview.score_sum, overview.mark_count), (Decimal("90"), 1))
+
+    def race(self):
+        """
+        Patch save_marks so another request inserts the first mark of the
+        batch just before it, after the existing marks were looked up.
+        """
+        calls = []
+
+        def racing_save_marks(marks, *args, **kwargs):
+            if not calls:
+                first = marks[0]
+                Mark.objects.create(report_card_id=first.report_card_id, subject_id=first.subject_id, score=50)
+            calls.append(len(marks))
+            return save_marks(marks, *args, **kwargs)
+
+        return mock.patch("core.bulk.save_marks", racing_save_marks)
+
+    def test_bulk_reports_marks_inserted_concurrently(self):
+        with self.race():
+            response = self.client.post(self.url, self.rows(self.math), format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data["errors"], [{"non_field_errors": [DUPLICATE_MARK_MESSAGE]}, {}, {}])
+        self.assertEqual(Mark.objects.count(), 1)
+
+    def test_bulk_upsert_updates_marks_inserted_concurrently(self):
+        with self.race():
+            response = self.client.post(self.url + "?upsert=true", self.rows(self.math, "90"), format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data, {"created": 2, "updated": 1})
+        self.assertEqual(list(Mark.objects.values_list("score", flat=True).distinct()), [Decimal("90")])
+
+    def test_bulk_accepts_ndjson(self):
+        body = "\n".join(json.dumps(row) for row in self.rows(self.math)) + "\n"
+        response = self.client.post(self.url, body, content_type="application/x-ndjson")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Mark.objects.count(), 3)
+
+    def test_bulk_rejects_non_list_body(self):
+        response = self.client.post(self.url, {"report_card": 1}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class BulkReportCardViewSetTest(BaseViewSetTest):
+    def setUp(self):
+        super().setUp()
+        self.students = [
+            Student.objects.create(name=f"Pupil {i}", email=f"pupil{i}@example.com", date_of_birth="2005-01-01")
+            for i in range(4)
+        ]
+        self.url = reverse("report-card-bulk")
+
+    def payload(self, students, term="Term1"):
+        return {"term": term, "year": 2024, "students": [student.id for student in students]}
+
+    def test_bulk_create_report_cards(self):
+        response = self.client.post(self.url, self.payload(self.students), format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual((response.data["created"], response.data["existing"]), (4, 0))
+        cards = dict(ReportCard.objects.values_list("student_id", "id"))
+        self.assertEqual(
+            response.data["report_cards"],
+            [{"id": cards[student.id], "student": student.id} for student in self.students],
+        )
+
+    def test_bulk_keeps_existing_cards(self):
+        card = ReportCard.objects.create(student=self.students[0], term="term1", year=2024)
+        response = self.client.post(self.url, self.payload(self.students, term="TERM1"), format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual((response.data["created"], response.data["existing"]), (3, 1))
+        self.assertEqual(response.data["report_cards"][0], {"id": card.id, "student": self.students[0].id})
+        self.assertEqual(ReportCard.objects.count(), 4)
+
+    def test_bulk_retries_after_a_concurrent_insert(self):
+        bulk_create = QuerySet.bulk_create
+        calls = []
+
+        def racing_bulk_create(queryset, objs, *args, **kwargs):
+            calls.append(len(objs))
+            if len(calls) == 1:
+                # Fails as if another request had just created the first card
+                bulk_create(queryset, objs[:1])
+            return bulk_create(queryset, objs, *args, **kwargs)
+
+        with mock.patch.object(QuerySet, "bulk_create", racing_bulk_create):
+            response = self.client.post(self.url, self.payload(self.students), format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(calls, [4, 4])
+        self.assertEqual((response.data["created"], response.data["existing"]), (4, 0))
+        self.assertEqual(ReportCard.objects.count(), 4)
+
+    def test_bulk_query_count_does_not_grow_with_cohort(self):
+        # the archived year check, students lookup, existing cards, the insert
+        # and the created cards, in a savepoint
+        with self.assertNumQueries(7):
+            self.client.post(self.url, self.payload(self.students[:1]), format="json")
+        ReportCard.objects.all().delete()
+        with self.assertNumQueries(7):
+            self.client.post(self.url, self.payload(self.students), format="json")
+
+    def test_bulk_rejects_unknown_students(self):
+        payload = self.payload(self.students)
+        payload["students"].append(9999)
+        response = self.client.post(self.url, payload, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("students", response.data["errors"])
+        self.assertFalse(ReportCard.objects.exists())
+
+    def test_bulk_requires_students(self):
+        response = self.client.post(self.url, {"term": "Term1", "year": 2024, "students": []}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class FastReadViewSetTest(BaseViewSetTest):
+    def setUp(self):
+        super().setUp()
+        student = Student.objects.create(name="Mia", email="mia@example.com", date_of_birth="2001-01-01")
+        subject = Subject.objects.create(name="Math", code="MAT")
+        for term in ["Term1", "Term2", "Term3"]:
+            card = ReportCard.objects.create(student=student, term=term, year=2024)
+            Mark.objects.create(report_card=card, subject=subject, score=Decimal("70"))
+
+    def test_list_matches_retrieve_shape(self):
+        listed = self.client.get(reverse("report-card-list") + "?pagination=cursor").data["results"][0]
+        retrieved = self.client.get(reverse("report-card-detail", kwargs={"pk": listed["id"]})).data
+        self.assertEqual(listed, retrieved)
+
+    def test_list_marks_filtered(self):
+        card = ReportCard.objects.get(term="Term2")
+        response = self.client.get(reverse("mark-list") + f"?report_card={card.id}")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([mark["subject"]["code"] for mark in response.data], ["MAT"])
@@ -1,30 +1,190 @@
+from celery.result import AsyncResult
+from django.conf import settings
+from django.http import Http404, StreamingHttpResponse
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework import viewsets, permissions, filters
+from rest_framework import viewsets, permissions, filters, status
 from rest_framework.decorators import action
+from rest_framework.parsers import JSONParser
 from rest_framework.response import Response
+from rest_framework.reverse import reverse
 from rest_framework.views import APIView
-from rest_framework.authentication import TokenAuthentication
-from django.db.models import Avg, F
 
-from .models import Student, Subject, ReportCard, Mark
+from .archive import is_archived
+from .authentication import CachingTokenAuthentication, token_cache
+from .bulk import create_report_cards, ingest_marks
+from .cache import overview_cache, stats_cache
+from .conditional import not_modified, overview_etag, report_card_validators, set_validators
+from .db import begin_request, end_request, routing_state
+from .export import iter_csv, iter_ndjson
+from .fast_serializers import ArchivedReportCardSerializer, FastMarkSerializer, FastReportCardSerializer
+from .fieldsets import Field, Fieldset
+from .filters import ArchivedMarkFilter, ArchivedReportCardFilter, MarkFilter, ReportCardFilter
+from .models import ArchivedMark, ArchivedReportCard, Student, Subject, ReportCard, Mark, Ranking
+from .pagination import TRUE_VALUES
+from .parsers import NDJSONParser
+from .profiling import route_histogram
+from .rankings import attach_rankings
+from .renderers import CSVRenderer, NDJSONRenderer
+from .search import FullTextSearchFilter
 from .serializers import (
     StudentModelSerializer, SubjectModelSerializer, ReportCardSerializer,
-    MarkSerializer, AddMarkSerializer
+    MarkSerializer, AddMarkSerializer, BulkMarkSerializer, BulkReportCardSerializer
 )
-from .tasks import calculate_student_overview
+from .stats import cohort_stats
+from .tasks import calculate_student_overview, enqueue_student_overview, overview_task_student, task_histogram
 
 
 class DefaultAuthMixin:
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachingTokenAuthentication]
     permission_classes = [permissions.IsAuthenticated]
 
 
-class StudentModelViewSet(DefaultAuthMixin, viewsets.ModelViewSet):
+class ReadReplicaMixin:
+    """
+    Route the reads of ``replica_actions`` to the read replicas (see core.db).
+    """
+    replica_actions = ("list", "retrieve", "avg_overview")
+
+    def dispatch(self, request, *args, **kwargs):
+        token = routing_state.set(None)
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        finally:
+            routing_state.reset(token)
+
+    def initial(self, request, *args, **kwargs):
+        # Authenticated first, so tokens and users are always read from the primary
+        super().initial(request, *args, **kwargs)
+        begin_request(request, self.action in self.replica_actions)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        end_request(request)
+        return super().finalize_response(request, response, *args, **kwargs)
+
+
+class ArchiveRoutingMixin:
+    """
+    Serve list, retrieve and export requests for an archived ?year= from the
+    archive tables (see core.archive), with ``archive_filterset_class`` and
+    the fast serializer ``archive_serializer_class``. A retrieve without a
+    year falls back to the archive when the id is not in the hot table.
+    Used with FastReadMixin.
+    """
+    archive_queryset = None
+    archive_filterset_class = None
+    archive_serializer_class = None
+    archived = False
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if self.action in ("list", "retrieve", "export"):
+            try:
+                if is_archived(request.query_params.get("year")):
+                    self.use_archive()
+            except ValueError:
+                pass  # rejected by the year filter
+
+    def use_archive(self):
+        self.archived = True
+        self.filterset_class = self.archive_filterset_class
+        self.fast_serializer_class = self.archive_serializer_class
+
+    def get_queryset(self):
+        if self.archived:
+            return self.archive_queryset.all()
+        return super().get_queryset()
+
+    def retrieve(self, request, *args, **kwargs):
+        if not self.archived:
+            try:
+                return super().retrieve(request, *args, **kwargs)
+            except Http404:
+                if not self.archive_queryset.filter(pk=kwargs["pk"]).exists():
+                    raise
+                self.use_archive()
+        serializer = self.get_fast_serializer()
+        rows = serializer.to_representation(serializer.rows(self.get_queryset().filter(pk=kwargs["pk"])))
+        if not rows:
+            raise Http404
+        return Response(rows[0])
+
+
+class FastReadMixin:
+    """
+    Serve list requests through ``fast_serializer_class`` when the viewset
+    sets one, building the response from ``.values()`` rows rather than
+    model instances and DRF field serializers.
+    """
+    fast_serializer_class = None
+
+    def use_fast_read(self):
+        return self.fast_serializer_class is not None
+
+    def get_fast_serializer(self):
+        return self.fast_serializer_class()
+
+    def list(self, request, *args, **kwargs):
+        if not self.use_fast_read():
+            return super().list(request, *args, **kwargs)
+        serializer = self.get_fast_serializer()
+        rows = serializer.rows(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(serializer.to_representation(page))
+        return Response(serializer.to_representation(rows))
+
+
+class SparseFieldsetMixin:
+    """
+    ?fields= and ?expand= on list and retrieve responses (see core.fieldsets).
+    ``sparse_fields`` maps the response fields to what they are rendered
+    from; the fields left out are dropped from the serializer and from the
+    columns and relations the queryset loads.
+    """
+    sparse_fields = {}
+    sparse_actions = ("list", "retrieve")
+
+    def get_fieldset(self):
+        if not hasattr(self, "_fieldset"):
+            self._fieldset = None
+            if self.action in self.sparse_actions:
+                self._fieldset = Fieldset.from_request(self.request, self.sparse_fields)
+        return self._fieldset
+
+    def get_sparse_columns(self):
+        """
+        Columns to load whatever fields are picked.
+        """
+        return ()
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        fieldset = self.get_fieldset()
+        if fieldset is None:
+            return queryset
+        return fieldset.prune(queryset, *self.get_sparse_columns())
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context["fieldset"] = self.get_fieldset()
+        return context
+
+    def get_fast_serializer(self):
+        return self.fast_serializer_class(fieldset=self.get_fieldset())
+
+
+class StudentModelViewSet(DefaultAuthMixin, ReadReplicaMixin, SparseFieldsetMixin, viewsets.ModelViewSet):
     queryset = Student.objects.all()
     serializer_class = StudentModelSerializer
+    sparse_fields = {
+        "id": Field("id"),
+        "name": Field("name"),
+        "email": Field("email"),
+        "date_of_birth": Field("date_of_birth"),
+    }
     filter_backends = (
         DjangoFilterBackend,
-        filters.SearchFilter,
+        FullTextSearchFilter,
     )
     search_fields = ["name", "email"]
 
@@ -33,64 +193,330 @@ class StudentModelViewSet(DefaultAuthMixin, viewsets.ModelViewSet):
         """
         Retrieve all report cards for a student in a given year,
         with average score per subject and overall average for the year.
-        ?year=<year>
+        ?year=<year>&inline=<true|false>
+
+        A fresh cached overview is returned straight away. Otherwise the
+        calculation is queued and a task id is returned (202) that can be
+        polled on avg-overview/<task_id>/. Pass inline=true to compute the
+        overview within the request instead.
+
+        Overviews carry an ETag; If-None-Match with the current one is
+        answered with 304 without loading the student.
         """
         year = request.GET.get("year")
         if not year:
-            from rest_framework import status
             return Response({"message": "Year is required to filter data!!"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            year = int(year)
+        except ValueError:
+            return Response({"message": "Year must be a number!!"}, status=status.HTTP_400_BAD_REQUEST)
+        # Checked before the student is even loaded: the ETag only needs one aggregate query
+        etag = overview_etag(pk, year)
+        not_modified_response = not_modified(request, etag)
+        if not_modified_response is not None:
+            return not_modified_response
         student = self.get_object()
-        overview_dict = calculate_student_overview.delay(student.pk, year)
-        qs = ReportCard.objects.filter(student=student, year=year).prefetch_related("marks__subject")
-        cards_serializer = ReportCardSerializer(qs, many=True)
-
-        marks_qs = Mark.objects.filter(report_card__student=student, report_card__year=year)
-        subject_aggregate = (
-            marks_qs
-            .annotate(subject_name=F("subject__name"))
-            .values("subject_name")
-            .annotate(average_score=Avg("score")))
-        overall_average = marks_qs.aggregate(overall_average=Avg("score"))["overall_average"]
 
-        return Response({
-            "report_cards": cards_serializer.data,
-            "subject_averages": list(subject_aggregate),
-            "overall_average": overall_average
-        })
+        if request.GET.get("inline", "").lower() in TRUE_VALUES:
+            return set_validators(Response(calculate_student_overview(student.pk, year)), etag)
 
+        overview = overview_cache.get(student.pk, year)
+        if overview is not None:
+            return set_validators(Response(overview), etag)
 
-class SubjectModelViewSet(DefaultAuthMixin, viewsets.ModelViewSet):
+        result = enqueue_student_overview(student.pk, year)
+        return self._overview_result_response(request, student, result)
+
+    @action(
+        detail=True,
+        methods=["GET"],
+        url_name="avg-overview-result",
+        url_path=r"avg-overview/(?P<task_id>[\w-]+)",
+    )
+    def avg_overview_result(self, request, pk=None, task_id=None):
+        """
+        Poll a queued overview calculation and return the overview once it has finished.
+        Only tasks queued for this student can be polled on its URL.
+        """
+        student = self.get_object()
+        if overview_task_student(task_id) != student.pk:
+            raise Http404
+        result = AsyncResult(task_id, app=calculate_student_overview.app)
+        return self._overview_result_response(request, student, result)
+
+    def _overview_result_response(self, request, student, result):
+        if result.successful():
+            return Response(result.result)
+        if result.failed():
+            return Response(
+                {"task_id": result.id, "status": result.status, "message": "Overview calculation failed!!"},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )
+        location = reverse(
+            "student-avg-overview-result",
+            kwargs={"pk": student.pk, "task_id": result.id},
+            request=request,
+        )
+        return Response(
+            {"task_id": result.id, "status": result.status},
+            status=status.HTTP_202_ACCEPTED,
+            headers={"Location": location},
+        )
+
+
+class SubjectModelViewSet(DefaultAuthMixin, ReadReplicaMixin, viewsets.ModelViewSet):
     queryset = Subject.objects.all()
     serializer_class = SubjectModelSerializer
     filter_backends = (
         DjangoFilterBackend,
-        filters.SearchFilter,
+        FullTextSearchFilter,
     )
     search_fields = ["name", "code"]
 
 
-class ReportCardModelViewSet(DefaultAuthMixin, viewsets.ModelViewSet):
+class ReportCardModelViewSet(
+    DefaultAuthMixin, ReadReplicaMixin, SparseFieldsetMixin, ArchiveRoutingMixin, FastReadMixin,
+    viewsets.ModelViewSet,
+):
     queryset = ReportCard.objects.all().select_related("student").prefetch_related("marks__subject")
     serializer_class = ReportCardSerializer
+    fast_serializer_class = FastReportCardSerializer
+    sparse_fields = {
+        "id": Field("id"),
+        "student": Field("student"),
+        "term": Field("term"),
+        "year": Field("year"),
+        "marks": Field(prefetch_related=("marks__subject",), expandable=True),
+        "student_detail": Field("student", select_related=("student",), expandable=True),
+    }
+    archive_queryset = ArchivedReportCard.objects.all()
+    archive_filterset_class = ArchivedReportCardFilter
+    archive_serializer_class = ArchivedReportCardSerializer
     filter_backends = (
         DjangoFilterBackend,
         filters.SearchFilter,
     )
-    filterset_fields = ["student"]
+    filterset_class = ReportCardFilter
     search_fields = ["term"]
 
+    def get_serializer_class(self):
+        if self.action == "bulk":
+            return BulkReportCardSerializer
+        return ReportCardSerializer
+
+    def include_rankings(self):
+        """
+        ?rankings=true adds each card's rank within its cohort to list and
+        retrieve responses. Archived years have no rankings. Rankings are
+        refreshed by a task queued on writes, so they can briefly lag behind.
+        """
+        return (
+            self.action in ("list", "retrieve")
+            and not self.archived
+            and self.request.query_params.get("rankings", "").lower() in TRUE_VALUES
+        )
+
+    def use_fast_read(self):
+        return super().use_fast_read() and not self.include_rankings()
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context["include_rankings"] = self.include_rankings()
+        return context
+
+    def retrieve(self, request, *args, **kwargs):
+        """
+        Report cards carry an ETag and Last-Modified from their updated_at, so
+        If-None-Match/If-Modified-Since are answered with 304 after reading
+        only that. Archived cards and rankings, which change with the rest of
+        the cohort, are always sent in full.
+        """
+        if self.archived or self.include_rankings():
+            return super().retrieve(request, *args, **kwargs)
+        fieldset = self.get_fieldset()
+        try:
+            etag, last_modified = report_card_validators(
+                int(kwargs["pk"]), fieldset.variant() if fieldset else ""
+            )
+        except ValueError:
+            etag = None
+        if etag is None:
+            return super().retrieve(request, *args, **kwargs)
+        response = not_modified(request, etag, last_modified)
+        if response is not None:
+            return response
+        response = super().retrieve(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            set_validators(response, etag, last_modified)
+        return response
+
+    def get_serializer(self, *args, **kwargs):
+        if args and self.include_rankings():
+            cards = attach_rankings(args[0] if kwargs.get("many") else [args[0]])
+            args = (cards if kwargs.get("many") else cards[0], *args[1:])
+        return super().get_serializer(*args, **kwargs)
 
-class MarkModelViewSet(DefaultAuthMixin, viewsets.ModelViewSet):
+    @action(detail=False, methods=["GET"])
+    def leaderboard(self, request):
+        """
+        Report cards of a cohort in rank order, overall or for one subject.
+        ?year=<year>&term=<term>&subject=<id>
+        """
+        year = request.GET.get("year")
+        term = request.GET.get("term")
+        if not year or not term:
+            return Response({"message": "Year and term are required!!"}, status=status.HTTP_400_BAD_REQUEST)
+        subject = request.GET.get("subject")
+        try:
+            year = int(year)
+            subject = int(subject) if subject else None
+        except ValueError:
+            return Response({"message": "Year and subject must be numbers!!"}, status=status.HTTP_400_BAD_REQUEST)
+
+        rankings = (
+            Ranking.objects
+            .filter(cohort__year=year, cohort__term=term.lower(), subject_id=subject)
+            .order_by("rank", "id")
+            .values(
+                "rank", "dense_rank", "percentile", "score", "cohort_size", "report_card_id",
+                "report_card__student_id", "report_card__student__name",
+            )
+        )
+        page = self.paginate_queryset(rankings)
+        rows = [
+            {
+                "rank": row["rank"],
+                "dense_rank": row["dense_rank"],
+                "percentile": row["percentile"],
+                "score": row["score"],
+                "cohort_size": row["cohort_size"],
+                "report_card": row["report_card_id"],
+                "student": {"id": row["report_card__student_id"], "name": row["report_card__student__name"]},
+            }
+            for row in (page if page is not None else rankings)
+        ]
+        if page is not None:
+            return self.get_paginated_response(rows)
+        return Response(rows)
+
+    @action(detail=False, methods=["POST"])
+    def bulk(self, request):
+        """
+        Create one term's report cards for a cohort of students in one transaction.
+        Body: {"term": <term>, "year": <year>, "students": [<id>, ...]}
+        Students that already have a card for the term keep it.
+        """
+        result = create_report_cards(request.data)
+        if not result.is_valid:
+            return Response({"errors": result.errors}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(
+            {"created": result.created, "existing": result.existing, "report_cards": result.report_cards},
+            status=status.HTTP_201_CREATED,
+        )
+
+    @action(detail=False, methods=["GET"])
+    def stats(self, request):
+        """
+        Per-subject average, min, max, standard deviation and pass rate of
+        every student's marks for a year, optionally limited to one term.
+        ?year=<year>&term=<term>
+        """
+        year = request.GET.get("year")
+        if not year:
+            return Response({"message": "Year is required to filter data!!"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            year = int(year)
+        except ValueError:
+            return Response({"message": "Year must be a number!!"}, status=status.HTTP_400_BAD_REQUEST)
+        term = request.GET.get("term") or None
+
+        stats = stats_cache.get(year, term)
+        if stats is None:
+            generation = stats_cache.generation(year)
+            stats = cohort_stats(year, term)
+            stats_cache.set(year, term, stats, generation)
+        return Response(stats)
+
+    @action(detail=False, methods=["GET"], renderer_classes=[NDJSONRenderer, CSVRenderer])
+    def export(self, request):
+        """
+        Stream every report card as NDJSON (one card per line) or CSV (one mark per row).
+        An archived ?year= is read from the archive tables.
+        ?format=<ndjson|csv>&year=<year>&student=<id>
+        """
+        queryset = self.filter_queryset(self.get_queryset())
+        year = request.GET.get("year")
+        if year:
+            try:
+                queryset = queryset.filter(year=int(year))
+            except ValueError:
+                return Response({"message": "Year must be a number!!"}, status=status.HTTP_400_BAD_REQUEST)
+
+        renderer = request.accepted_renderer
+        rows = iter_csv(queryset) if renderer.format == "csv" else iter_ndjson(queryset)
+        response = StreamingHttpResponse(rows, content_type=f"{renderer.media_type}; charset={renderer.charset}")
+        response["Content-Disposition"] = f'attachment; filename="report-cards.{renderer.format}"'
+        return response
+
+
+class MarkModelViewSet(
+    DefaultAuthMixin, ReadReplicaMixin, SparseFieldsetMixin, ArchiveRoutingMixin, FastReadMixin,
+    viewsets.ModelViewSet,
+):
     queryset = Mark.objects.all().select_related("subject", "report_card")
     serializer_class = AddMarkSerializer
+    fast_serializer_class = FastMarkSerializer
+    sparse_fields = {
+        "id": Field("id"),
+        "score": Field("score"),
+        "subject": Field("subject", select_related=("subject",), expandable=True),
+        "grade": Field("score"),
+        "grade_point": Field("score"),
+    }
+    archive_queryset = ArchivedMark.objects.all()
+    archive_filterset_class = ArchivedMarkFilter
+    archive_serializer_class = FastMarkSerializer
     filter_backends = (
         DjangoFilterBackend,
         filters.SearchFilter,
     )
-    filterset_fields = ["report_card", "subject"]
+    filterset_class = MarkFilter
     search_fields = []
 
     def get_serializer_class(self):
         if self.action in ["list", "retrieve"]:
             return MarkSerializer
+        if self.action == "bulk":
+            return BulkMarkSerializer
         return AddMarkSerializer
+
+    @action(detail=False, methods=["POST"], parser_classes=[JSONParser, NDJSONParser])
+    def bulk(self, request):
+        """
+        Create many marks in one transaction from a JSON list or NDJSON body
+        of {report_card, subject, score} rows.
+        ?upsert=<true|false> replaces the score of marks that already exist.
+        """
+        upsert = request.GET.get("upsert", "").lower() in TRUE_VALUES
+        result = ingest_marks(request.data, upsert=upsert)
+        if not result.is_valid:
+            return Response({"errors": result.errors}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({"created": result.created, "updated": result.updated}, status=status.HTTP_201_CREATED)
+
+
+class MetricsView(DefaultAuthMixin, APIView):
+    """
+    p50/p95/p99 of the wall time, database time, query count, view and
+    render time of every API route recorded by ProfilingMiddleware in this
+    process and of the run time and queue latency of the tasks it ran,
+    along with the hit rates of the in-process caches.
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return Response({
+            "profiling": settings.PROFILING_ENABLED,
+            "routes": route_histogram.summary(),
+            "tasks": task_histogram.summary(),
+            "caches": {"overview": overview_cache.stats(), "tokens": token_cache.stats()},
+        })
@@ -12,5 +12,8 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "reportcard.settings")
+# Async views run their queries in threads that don't get the request
+# lifecycle's connection cleanup, so persistent connections would leak
+os.environ.setdefault("DB_CONN_MAX_AGE", "0")
 
 application = get_asgi_application()
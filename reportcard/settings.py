@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -40,10 +41,12 @@ INSTALLED_APPS = [
 
     "rest_framework",
     "rest_framework.authtoken",
+    "django_filters",
     "core"
 ]
 
 MIDDLEWARE = [
+    "core.profiling.ProfilingMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -81,9 +84,38 @@ DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": BASE_DIR / "db.sqlite3",
+        # Keep connections open between requests, checking them before reuse
+        "CONN_MAX_AGE": int(os.environ.get("DB_CONN_MAX_AGE", 60)),
+        "CONN_HEALTH_CHECKS": True,
     }
 }
 
+# Read replicas: comma separated SQLite files kept in sync with the primary
+# (e.g. by Litestream), added as the aliases replica1, replica2, ...
+# See core.db.ReplicaRouter.
+DATABASE_REPLICAS = []
+for index, name in enumerate(filter(None, os.environ.get("DB_REPLICAS", "").split(",")), start=1):
+    DATABASES[f"replica{index}"] = {
+        **DATABASES["default"],
+        "NAME": name,
+        "TEST": {"MIRROR": "default"},
+    }
+    DATABASE_REPLICAS.append(f"replica{index}")
+DATABASE_ROUTERS = ["core.db.ReplicaRouter"]
+# How long a user who wrote something keeps reading from the primary
+REPLICA_STICKY_SECONDS = 10
+
+# Applied to every new SQLite connection (see core.db.configure_sqlite). WAL
+# lets readers run alongside the writer; synchronous=NORMAL is durable in WAL mode
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "busy_timeout": 5000,
+    "cache_size": -20000,
+    "temp_store": "MEMORY",
+    "mmap_size": 134217728,
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -106,12 +138,12 @@ AUTH_PASSWORD_VALIDATORS = [
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework.authentication.TokenAuthentication",
+        "core.authentication.CachingTokenAuthentication",
     ],
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.IsAuthenticated",
     ],
-    "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.LimitOffsetPagination",
+    "DEFAULT_PAGINATION_CLASS": "core.pagination.HybridPagination",
 }
 
 # Internationalization
@@ -136,5 +168,79 @@ STATIC_URL = "static/"
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
-CELERY_BROKER_URL = "redis://localhost:6379/0"
-CELERY_RESULT_BACKEND = "redis://localhost:6379/0"
+# Cache shared by the web and Celery workers (overviews, cohort statistics,
+# grading bands, queued overview tasks...). Defaults to the Redis server of
+# the Celery broker; CACHE_URL=locmem:// keeps it in the memory of a single
+# process, e.g. for a development server run with CELERY_TASK_ALWAYS_EAGER=1.
+CACHE_URL = os.environ.get("CACHE_URL", "redis://localhost:6379/1")
+CACHE_MAX_ENTRIES = 10000
+if CACHE_URL == "locmem://":
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "OPTIONS": {"MAX_ENTRIES": CACHE_MAX_ENTRIES},
+        },
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": CACHE_URL,
+        },
+    }
+
+CELERY_BROKER_URL = os.environ.get("CELERY_BROKER_URL", "redis://localhost:6379/0")
+CELERY_RESULT_BACKEND = os.environ.get("CELERY_RESULT_BACKEND", "redis://localhost:6379/0")
+CELERY_TASK_ALWAYS_EAGER = os.environ.get("CELERY_TASK_ALWAYS_EAGER", "") == "1"
+CELERY_TASK_STORE_EAGER_RESULT = True
+CELERY_RESULT_EXPIRES = 3600
+CELERY_BEAT_SCHEDULE = {
+    # Warms the overviews of the students and years that received bulk mark imports
+    "precompute-overviews": {
+        "task": "core.tasks.precompute_overviews",
+        "schedule": 300.0,
+    },
+    # Catches cohorts whose refresh queued by a write was lost
+    "refresh-stale-rankings": {
+        "task": "core.tasks.refresh_stale_rankings",
+        "schedule": 300.0,
+    },
+}
+
+# Student overview cache (see core.cache.OverviewCache)
+OVERVIEW_CACHE_ALIAS = "default"
+OVERVIEW_CACHE_TIMEOUT = 300
+OVERVIEW_CACHE_MAX_ENTRIES = CACHE_MAX_ENTRIES
+# How long a queued overview task answers for its (student, year) instead of a new one
+OVERVIEW_TASK_DEDUP_TIMEOUT = 300
+# Students per calculate_student_overviews task queued by precompute_overviews
+OVERVIEW_PRECOMPUTE_BATCH_SIZE = 500
+
+# Cohort statistics (see core.stats and core.cache.CohortStatsCache)
+REPORT_CARD_PASS_MARK = 40
+COHORT_STATS_CACHE_TIMEOUT = 300
+
+# Seconds the bands of the default grading scale are cached (see core.grading)
+GRADING_CACHE_TIMEOUT = 300
+
+# Validated API tokens (see core.authentication.TokenCache), shared between
+# workers through TOKEN_CACHE_ALIAS. Revoked tokens are refused by every
+# worker on their next request. With TOKEN_CACHE_ALIAS = None tokens are
+# only cached in process memory, for at most TOKEN_CACHE_LOCAL_TIMEOUT seconds.
+TOKEN_CACHE_ALIAS = "default"
+TOKEN_CACHE_TIMEOUT = 60
+TOKEN_CACHE_LOCAL_TIMEOUT = 5
+TOKEN_CACHE_MAX_ENTRIES = 10000
+
+# Request profiling (see core.profiling). Off unless PROFILING_ENABLED=1; when
+# on, API responses carry a Server-Timing header and /api/_metrics/ reports
+# latency percentiles over the last PROFILING_MAX_SAMPLES requests per route.
+PROFILING_ENABLED = os.environ.get("PROFILING_ENABLED", "") == "1"
+PROFILING_MAX_SAMPLES = 1000
+
+# Marks per page of the async mark list (see core.async_views) without ?limit=
+ASYNC_PAGE_SIZE = 100
+
+# Answer ?search= on students and subjects from the SQLite FTS5 indexes
+# (see core.search). Other databases always use the LIKE search.
+FULL_TEXT_SEARCH_ENABLED = True